@@ -0,0 +1,179 @@
+"""
+
+Benchmarks of the simulation hot paths, with regression tracking against a stored baseline.
+
+Usage: blackjack-benchmark [--output results.json] [--baseline baseline.json] [--tolerance 0.1] [--quick]
+
+Every result is a throughput (rounds or calls per second), so that higher is always better.
+
+"""
+import argparse
+import itertools
+import json
+import platform
+import sys
+import time
+import timeit
+
+import numpy as np
+
+from blackjack_engine.simulation import BlackjackSimulation
+from blackjack_engine.simulation.hand import Hand
+from blackjack_engine.simulation.rules import BlackJackRules
+from blackjack_engine.simulation.shoe import Shoe
+from blackjack_engine.strategy import BasicStrategy, RandomPlay, ConstantBetting, HiLowBetting
+
+
+playing_strategies = {'random': RandomPlay, 'basic': BasicStrategy}
+betting_strategies = {'constant': ConstantBetting, 'hilo': HiLowBetting}
+
+
+def simulation_benchmark(nb_decks, nb_players, playing, betting, nb_rounds=20000, repeat=3, seed=0):
+    """ Rounds per second of a BlackjackSimulation (best of 'repeat' runs). """
+    best_time = float('inf')
+    for _ in range(repeat):
+        simulation = BlackjackSimulation(nb_decks=nb_decks, seed=seed)
+        for i in range(nb_players):
+            simulation.register_player(f"player_{i}", betting_strategies[betting](), playing_strategies[playing]())
+        for history in simulation.players_history.values():
+            history.reserve(nb_rounds)
+        simulation.shoe.shuffle()
+        # same loop as BlackjackSimulation.run, without the progress bar
+        start = time.perf_counter()
+        for _ in range(nb_rounds):
+            simulation.play_round()
+        best_time = min(best_time, time.perf_counter() - start)
+    return nb_rounds / best_time
+
+
+def simulation_benchmarks(nb_decks=(1, 2, 6, 8), nb_players=(1, 3, 5, 7), nb_rounds=20000, repeat=3):
+    """ Rounds per second of each standard configuration, by name. """
+    results = {}
+    for decks, players, playing, betting in itertools.product(nb_decks, nb_players, playing_strategies,
+                                                              betting_strategies):
+        name = f"simulation/decks={decks}/players={players}/{playing}/{betting}"
+        results[name] = simulation_benchmark(decks, players, playing, betting, nb_rounds, repeat)
+    return results
+
+
+def micro_benchmarks(number=100000, repeat=3):
+    """ Calls per second of each hot function, by name. """
+    shoe = Shoe(nb_decks=6, penetration=1, seed=0)
+    counted_shoe = Shoe(nb_decks=6, penetration=1, seed=0, counting_systems=['hi-lo'])
+    rules = BlackJackRules()
+    basic_strategy, hi_low_betting = BasicStrategy(), HiLowBetting()
+    hand, dealer_hand = Hand([9, 5]), Hand([9, 7])
+    available_actions = rules.available_actions(hand, None)
+    cards = [5, 0, 3]
+
+    def add_cards():
+        new_hand = Hand([])
+        for card in cards:
+            new_hand.add_card(card)
+
+    functions = {
+        'shoe.deal_card': shoe.deal_card,
+        'shoe.deal_card(hi-lo)': counted_shoe.deal_card,
+        'shoe.shuffle': shoe.shuffle,
+        'hand.__init__': lambda: Hand([9, 5]),
+        'hand.add_card': add_cards,
+        'hand.compute_value': hand.compute_value,
+        'rules.available_actions': lambda: rules.available_actions(hand, None),
+        'rules.available_mask': lambda: rules.available_mask(hand),
+        'rules.evaluate_hand': lambda: rules.evaluate_hand(hand, dealer_hand),
+        'basic_strategy.declare_action': lambda: basic_strategy.declare_action(hand, 9, None, available_actions),
+        'hi_low_betting.declare_bet': lambda: hi_low_betting.declare_bet(shoe.delt_cards, shoe.remaining_cards),
+        'hi_low_betting.declare_bet(true_count)': lambda: hi_low_betting.declare_bet(
+            counted_shoe.delt_cards, counted_shoe.remaining_cards, true_count=counted_shoe.true_count('hi-lo')),
+    }
+    results = {}
+    for name, function in functions.items():
+        # shuffling is much slower than the other functions
+        calls = number // 100 if name == 'shoe.shuffle' else number
+        best_time = min(timeit.repeat(function, number=calls, repeat=repeat))
+        results[f"micro/{name}"] = calls / best_time
+    return results
+
+
+def run_benchmarks(quick=False):
+    """ Runs all the benchmarks, and returns their results with a description of the environment. """
+    if quick:
+        results = simulation_benchmarks(nb_decks=(6,), nb_players=(1, 7), nb_rounds=5000, repeat=1)
+        results.update(micro_benchmarks(number=20000, repeat=1))
+    else:
+        results = simulation_benchmarks()
+        results.update(micro_benchmarks())
+    return {
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+        },
+        'results': results,
+    }
+
+
+def compare(results, baseline, tolerance=0.1):
+    """
+
+    Compares benchmark results with a baseline.
+
+    Parameters
+    ----------
+
+        results, baseline: dict
+            Benchmark results, as returned by run_benchmarks (or loaded from their JSON file).
+
+        tolerance: float
+            Relative slowdown allowed before a benchmark is considered a regression.
+
+    Returns
+    -------
+
+        comparison: dict<str, float>
+            Ratio of the new throughput over the baseline's, for each benchmark found in both.
+
+        regressions: list of str
+            Names of the benchmarks slower than the baseline by more than the tolerance.
+
+    """
+    comparison = {name: value / baseline['results'][name] for name, value in results['results'].items()
+                  if name in baseline['results']}
+    regressions = [name for name, ratio in comparison.items() if ratio < 1 - tolerance]
+    return comparison, regressions
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Benchmarks of the blackjack engine's hot paths.")
+    parser.add_argument('--output', help="JSON file the results are written to.")
+    parser.add_argument('--baseline', help="JSON file of previous results to compare with.")
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help="Relative slowdown allowed before a benchmark is reported as a regression.")
+    parser.add_argument('--quick', action='store_true', help="Runs a reduced set of benchmarks.")
+    args = parser.parse_args(args)
+
+    results = run_benchmarks(args.quick)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+    if args.baseline is None:
+        for name, value in results['results'].items():
+            print(f"{name:<55} {value:>14,.0f}/s")
+        return 0
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    comparison, regressions = compare(results, baseline, args.tolerance)
+    for name, value in results['results'].items():
+        ratio = f"x{comparison[name]:.2f}" if name in comparison else "new"
+        flag = "  REGRESSION" if name in regressions else ""
+        print(f"{name:<55} {value:>14,.0f}/s  {ratio}{flag}")
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) slower than the baseline by more than {args.tolerance:.0%}.")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1 +1,2 @@
 from .game import BlackjackSimulation
+from .batch import BatchSimulation
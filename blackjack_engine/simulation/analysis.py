@@ -0,0 +1,238 @@
+from functools import lru_cache
+
+import numpy as np
+
+from blackjack_engine.simulation.rules import BlackJackRules, SURRENDERED, BLACKJACK as BLACKJACK_STATE, double_rules
+
+
+# final outcomes of the dealer's hand, in the order of the dealer's distributions
+dealer_outcomes = ['17', '18', '19', '20', '21', 'bust', 'blackjack']
+BUST, BLACKJACK = 5, 6
+
+
+def value_classes(composition):
+    """
+
+    Fold a composition indexed by rank (Ace, 2, ..., 10, J, Q, K) into the 10 classes of card values
+    (Ace, 2, ..., 9, ten-valued cards), as a tuple.
+
+    """
+    composition = [int(count) for count in composition]
+    if len(composition) == 13:
+        composition = composition[:9] + [sum(composition[9:])]
+    return tuple(composition)
+
+
+def _remove(composition, card_class):
+    return composition[:card_class] + (composition[card_class] - 1,) + composition[card_class + 1:]
+
+
+class CompositionAnalyzer:
+    """
+
+    Exact expected values of the player's actions, given the composition of the cards left in the shoe.
+
+    Without dealer_peek, the dealer's blackjack beats every player's hand that is not a blackjack (including doubled
+    and split hands). With dealer_peek, the values are those of the player's decisions, which are only taken once
+    the dealer has no blackjack: his hole card is drawn without the cards which would give him one (the player's
+    draws are not conditioned on it, which is exact up to a single card of the composition).
+
+    The hit, stand and double values are exact for the given composition: every card drawn by the player is removed
+    from the shoe before the dealer plays. Split values are computed for a single split (no re-split, even if
+    max_hands allows more), each hand being played optimally as if the other hand did not exist, and doubled only on
+    the totals allowed by double_on. Re-splitting aces and early surrender with a dealer's peek are not supported.
+
+    The dealer's final-total distributions only depend on the composition and the dealer's hand, and are cached
+    with a bounded LRU eviction, so that repeated analyses of similar shoes reuse them.
+
+    Parameters
+    ----------
+
+        game_rules: BlackJackRules
+            Rules of the game (hit_soft_17, double_after_split, double_on, dealer_peek, blackjack_payout, the surrender
+            payouts and the available actions are used).
+
+        cache_size: int
+            Maximum number of dealer distributions (and player values) kept in cache.
+
+    """
+    def __init__(self, game_rules=None, cache_size=2 ** 18):
+        self.game_rules = game_rules if game_rules is not None else BlackJackRules()
+        if self.game_rules.resplit_aces and self.game_rules.max_hands > 2:
+            raise ValueError("Re-splitting aces is not supported by the analyzer, which only models a single split.")
+        if self.game_rules.surrender == 'early' and self.game_rules.dealer_peek:
+            raise ValueError("Early surrenders, declared before the dealer's peek, are not supported by the analyzer.")
+        self._double_values = double_rules[self.game_rules.double_on]
+        self._dealer_distribution = lru_cache(maxsize=cache_size)(self._compute_dealer_distribution)
+        self._best_value = lru_cache(maxsize=cache_size)(self._compute_best_value)
+        # gains of a surrendered hand against a dealer's hand which is not a blackjack, and against a blackjack
+        self._surrender_payouts = (float(self.game_rules.payouts[SURRENDERED, 0]),
+                                   float(self.game_rules.payouts[SURRENDERED, BLACKJACK_STATE]))
+
+    def dealer_distribution(self, composition, dealer_cards):
+        """
+
+        Probabilities of the dealer's final outcomes (given that he has no blackjack if he peeks, and only holds his
+        visible card).
+
+        Parameters
+        ----------
+
+            composition: array of size 13 (or 10)
+                Number of cards of each rank that can still be drawn by the dealer.
+
+            dealer_cards: list of int
+                Ranks of the cards already hold by the dealer (usually his visible card).
+
+        Returns
+        -------
+
+            distribution: array of size 7
+                Probabilities of the outcomes listed in 'dealer_outcomes' (17, 18, 19, 20, 21, bust, blackjack).
+
+        """
+        hard, has_ace = _hand_state(dealer_cards)
+        return self._dealer_distribution(value_classes(composition), hard, has_ace, min(len(dealer_cards), 3))
+
+    def expected_values(self, player_hand, dealer_card, composition):
+        """
+
+        Expected gains for a unit bet of each action available to the player.
+
+        Parameters
+        ----------
+
+            player_hand: Hand
+                Player's current hand.
+
+            dealer_card: int
+                Rank of the dealer's visible card.
+
+            composition: array of size 13 (or 10)
+                Number of cards of each rank that are not visible to the player: cards remaining in the shoe plus
+                the dealer's hole card.
+
+        Returns
+        -------
+
+            expected_values: dict<str, float>
+                Expected gains of each available action, among 'stand', 'hit', 'double', 'split' and 'surrender'.
+
+        """
+        composition = value_classes(composition)
+        up_card = _card_class(dealer_card)
+        hard, has_ace = _hand_state(player_hand.cards)
+        nb_cards = min(len(player_hand.cards), 3)
+        is_split = player_hand.nb_hands > 1
+        expected_values = {}
+        # with 21 (or more) no action is available, and the value of the hand is returned as 'stand'
+        for action in self.game_rules.available_actions(player_hand, None) or ['stand']:
+            if action == 'stand':
+                expected_values[action] = self._stand_value(composition, hard, has_ace, nb_cards, is_split, up_card)
+            elif action == 'hit':
+                expected_values[action] = self._hit_value(composition, hard, has_ace, up_card)
+            elif action == 'double':
+                expected_values[action] = self._double_value(composition, hard, has_ace, up_card)
+            elif action == 'split':
+                expected_values[action] = self._split_value(composition, _card_class(player_hand.cards[0]), up_card)
+            elif action == 'surrender':
+                expected_values[action] = self._surrender_value(composition, up_card)
+        return expected_values
+
+    def best_action(self, player_hand, dealer_card, composition):
+        """ Action with the highest expected value, and its expected value. """
+        expected_values = self.expected_values(player_hand, dealer_card, composition)
+        action = max(expected_values, key=expected_values.get)
+        return action, expected_values[action]
+
+    def cache_info(self):
+        """ Statistics of the dealer distributions cache. """
+        return self._dealer_distribution.cache_info()
+
+    def _compute_dealer_distribution(self, composition, hard, has_ace, nb_cards):
+        is_soft = has_ace and hard <= 11
+        value = hard + 10 if is_soft else hard
+        distribution = np.zeros(7)
+        if nb_cards == 2 and value == 21:
+            distribution[BLACKJACK] = 1
+        elif value > 21:
+            distribution[BUST] = 1
+        elif value >= 18 or (value == 17 and not (is_soft and self.game_rules.hit_soft_17)):
+            distribution[value - 17] = 1
+        else:
+            draws = [(card_class, count) for card_class, count in enumerate(composition) if count]
+            if nb_cards == 1 and self.game_rules.dealer_peek and (hard == 1 or hard == 10):
+                # the dealer peeked: his hole card does not complete a blackjack
+                draws = [(card_class, count) for card_class, count in draws if card_class + hard != 10] or draws
+            nb_remaining = sum(count for _, count in draws)
+            for card_class, count in draws:
+                distribution += count / nb_remaining * self._dealer_distribution(
+                    _remove(composition, card_class), hard + card_class + 1, has_ace or card_class == 0,
+                    min(nb_cards + 1, 3))
+        return distribution
+
+    def _stand_value(self, composition, hard, has_ace, nb_cards, is_split, up_card):
+        value = hard + 10 if has_ace and hard <= 11 else hard
+        if value > 21:
+            return -1.
+        dealer = self._dealer_distribution(composition, up_card + 1, up_card == 0, 1)
+        if nb_cards == 2 and value == 21 and not is_split:
+            return self.game_rules.blackjack_payout * (1 - float(dealer[BLACKJACK]))
+        gains = dealer[BUST] - dealer[BLACKJACK]
+        for final_value in range(17, 22):
+            gains += np.sign(value - final_value) * dealer[final_value - 17]
+        return float(gains)
+
+    def _surrender_value(self, composition, up_card):
+        # the refund may depend on the dealer having a blackjack (late surrender without peek)
+        dealer = self._dealer_distribution(composition, up_card + 1, up_card == 0, 1)
+        refunded, against_blackjack = self._surrender_payouts
+        return float(refunded + (against_blackjack - refunded) * dealer[BLACKJACK])
+
+    def _draws(self, composition):
+        """ (probability, card class, composition after drawing the card) for each card that can be drawn. """
+        nb_remaining = sum(composition)
+        return [(count / nb_remaining, card_class, _remove(composition, card_class))
+                for card_class, count in enumerate(composition) if count]
+
+    def _hit_value(self, composition, hard, has_ace, up_card):
+        return sum(probability * self._best_value(drawn, hard + card_class + 1, has_ace or card_class == 0, up_card)
+                   for probability, card_class, drawn in self._draws(composition))
+
+    def _double_value(self, composition, hard, has_ace, up_card):
+        return 2 * sum(probability * self._stand_value(drawn, hard + card_class + 1, has_ace or card_class == 0, 3,
+                                                       False, up_card)
+                       for probability, card_class, drawn in self._draws(composition))
+
+    def _compute_best_value(self, composition, hard, has_ace, up_card):
+        """ Value of a hand of 3+ cards played optimally (stand or hit). """
+        value = hard + 10 if has_ace and hard <= 11 else hard
+        stand = self._stand_value(composition, hard, has_ace, 3, False, up_card)
+        if value >= 21:
+            return stand
+        return max(stand, self._hit_value(composition, hard, has_ace, up_card))
+
+    def _split_value(self, composition, card_class, up_card):
+        """ Twice the value of one hand starting with the split card, played optimally without re-split. """
+        hand_value = 0.
+        for probability, drawn_class, drawn in self._draws(composition):
+            hard, has_ace = card_class + drawn_class + 2, card_class == 0 or drawn_class == 0
+            values = [self._stand_value(drawn, hard, has_ace, 2, True, up_card)]
+            if card_class != 0:
+                # after splitting aces, a single card is delt for each ace
+                if hard + 10 * (has_ace and hard <= 11) < 21:
+                    values.append(self._hit_value(drawn, hard, has_ace, up_card))
+                if self.game_rules.double_after_split and hard + 10 * (has_ace and hard <= 11) in self._double_values:
+                    values.append(self._double_value(drawn, hard, has_ace, up_card))
+            hand_value += probability * max(values)
+        return 2 * hand_value
+
+
+def _card_class(card):
+    return min(int(card), 9)
+
+
+def _hand_state(cards):
+    """ Hard total (Aces counted as 1) and presence of an Ace of a list of card ranks. """
+    classes = [_card_class(card) for card in cards]
+    return sum(classes) + len(classes), 0 in classes
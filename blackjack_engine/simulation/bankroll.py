@@ -0,0 +1,276 @@
+"""
+
+Bankroll analysis of a player's stream of bets and gains: risk of ruin, maximum drawdown, time to double the
+bankroll and N0, computed on a recorded history (or live, as rounds are played) and on bootstrap trajectories
+resampled from a single stream.
+
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from blackjack_engine.simulation.history import PlayerHistory
+from blackjack_engine.simulation.stats import PlayerStatistics
+
+
+def load_stream(source):
+    """
+
+    Bets and gains of each round of a stream.
+
+    Parameters
+    ----------
+
+        source: PlayerHistory, dict, structured array or str
+            History of a player (or any mapping / structured array with 'bets' and 'gains' columns), or the path of
+            a .npy file of records (see PlayerHistory.to_records), which is memory-mapped, or of a .npz file with
+            'bets' and 'gains' arrays.
+
+    Returns
+    -------
+
+        bets, gains: arrays
+            Total amount bet and won during each round.
+
+    """
+    if isinstance(source, str):
+        if source.endswith('.npz'):
+            with np.load(source) as arrays:
+                return arrays['bets'], arrays['gains']
+        source = np.load(source, mmap_mode='r')
+    return source['bets'], source['gains']
+
+
+class BankrollTracker:
+    """
+
+    Bankroll trajectories updated by chunks of rounds.
+
+    Each update processes a whole chunk of rounds (of every trajectory) with a few array operations: cumulated
+    capital, running peak and first passages below 0 (ruin) and above twice the bankroll (doubling). Only the state
+    at the end of the chunk is kept, so that streams larger than the memory can be processed chunk by chunk, or a
+    simulation's history followed while it is played (see 'update_from').
+
+    A trajectory is ruined as soon as its capital is not positive anymore, and doubles the bankroll if its capital
+    reaches twice the bankroll before any ruin. Rounds keep being accumulated after a ruin (for the drawdowns).
+
+    Parameters
+    ----------
+
+        bankroll: float
+            Initial capital of each trajectory.
+
+        nb_trajectories: int
+            Number of trajectories, updated with gains of shape (nb_rounds, nb_trajectories). A single trajectory
+            is updated with gains of shape (nb_rounds,).
+
+    Attributes
+    ----------
+
+        nb_rounds: int
+            Number of rounds processed in each trajectory.
+
+        capital, peak, max_drawdown: arrays of size nb_trajectories
+            Current capital, highest capital reached (including the initial bankroll) and largest loss from a peak.
+
+        ruin_round, double_round: arrays of size nb_trajectories
+            Number of rounds played when the trajectory got ruined / doubled the bankroll, -1 if it did not.
+
+        statistics: PlayerStatistics
+            Statistics of all the rounds processed, over all the trajectories.
+
+    """
+    def __init__(self, bankroll, nb_trajectories=1):
+        self.bankroll = bankroll
+        self.nb_trajectories = nb_trajectories
+        self.nb_rounds = 0
+        self.capital = np.full(nb_trajectories, float(bankroll))
+        self.peak = self.capital.copy()
+        self.max_drawdown = np.zeros(nb_trajectories)
+        self.ruin_round = np.full(nb_trajectories, -1)
+        self.double_round = np.full(nb_trajectories, -1)
+        self.statistics = PlayerStatistics()
+
+    def update(self, bets, gains):
+        """ Processes a chunk of rounds, with bets and gains of shape (nb_rounds,) or (nb_rounds, nb_trajectories). """
+        bets, gains = np.asarray(bets, dtype=float), np.asarray(gains, dtype=float)
+        if not len(gains):
+            return
+        self.statistics.merge(PlayerStatistics.from_arrays(bets.reshape(-1), gains.reshape(-1)))
+        gains = gains.reshape(len(gains), -1)
+        capital = self.capital + np.cumsum(gains, axis=0)
+        peak = np.maximum(self.peak, np.maximum.accumulate(capital, axis=0))
+        self.max_drawdown = np.maximum(self.max_drawdown, (peak - capital).max(axis=0))
+        ruin_idx = _first_passage(capital <= 0)
+        double_idx = _first_passage(capital >= 2 * self.bankroll)
+        not_ruined = self.ruin_round < 0
+        doubled = not_ruined & (self.double_round < 0) & (double_idx < ruin_idx)
+        self.double_round[doubled] = self.nb_rounds + double_idx[doubled] + 1
+        ruined = not_ruined & (ruin_idx < len(gains))
+        self.ruin_round[ruined] = self.nb_rounds + ruin_idx[ruined] + 1
+        self.capital, self.peak = capital[-1], peak[-1]
+        self.nb_rounds += len(gains)
+
+    def update_from(self, history, chunk_size=2 ** 20):
+        """ Processes the rounds of a single trajectory's history recorded since the last update. """
+        bets, gains = load_stream(history)
+        for start in range(self.nb_rounds, len(gains), chunk_size):
+            self.update(bets[start:start + chunk_size], gains[start:start + chunk_size])
+
+    def merge(self, other):
+        """ Adds the trajectories of another tracker, with the same bankroll and number of rounds. """
+        assert other.bankroll == self.bankroll and other.nb_rounds == self.nb_rounds, \
+            "Trackers must have the same bankroll and number of rounds."
+        for attribute in ['capital', 'peak', 'max_drawdown', 'ruin_round', 'double_round']:
+            setattr(self, attribute, np.concatenate([getattr(self, attribute), getattr(other, attribute)]))
+        self.nb_trajectories += other.nb_trajectories
+        self.statistics.merge(other.statistics)
+
+    @property
+    def risk_of_ruin(self):
+        """ Fraction of the trajectories which got ruined. """
+        return float(np.mean(self.ruin_round >= 0))
+
+    @property
+    def double_probability(self):
+        """ Fraction of the trajectories which doubled the bankroll before any ruin. """
+        return float(np.mean(self.double_round >= 0))
+
+    @property
+    def time_to_double(self):
+        """ Number of rounds played when each trajectory doubled the bankroll (NaN if it did not). """
+        return np.where(self.double_round >= 0, self.double_round, np.nan)
+
+    def summary(self):
+        """ Main bankroll metrics, as a dict (medians and 95th percentiles over the trajectories). """
+        doubled = self.double_round[self.double_round >= 0]
+        return {
+            'nb_rounds': self.nb_rounds,
+            'nb_trajectories': self.nb_trajectories,
+            'bankroll': self.bankroll,
+            'risk_of_ruin': self.risk_of_ruin,
+            'diffusion_risk_of_ruin': self.statistics.risk_of_ruin(self.bankroll),
+            'max_drawdown': float(np.median(self.max_drawdown)),
+            'max_drawdown_95': float(np.percentile(self.max_drawdown, 95)),
+            'double_probability': self.double_probability,
+            'time_to_double': float(np.median(doubled)) if len(doubled) else np.nan,
+            'n0': self.statistics.n0,
+            'ev': self.statistics.ev,
+        }
+
+    def __repr__(self):
+        return (f"BankrollTracker(bankroll={self.bankroll}, nb_trajectories={self.nb_trajectories}, "
+                f"nb_rounds={self.nb_rounds}, risk_of_ruin={self.risk_of_ruin:.4f})")
+
+
+def analyze_bankroll(source, bankroll, chunk_size=2 ** 20):
+    """
+
+    Bankroll metrics of a recorded stream, processed by chunks.
+
+    Parameters
+    ----------
+
+        source: PlayerHistory, dict, structured array or str
+            Stream of bets and gains, see load_stream.
+
+        bankroll: float
+            Initial capital.
+
+        chunk_size: int
+            Number of rounds processed at once.
+
+    Returns
+    -------
+
+        tracker: BankrollTracker
+            Tracker of the stream's single trajectory.
+
+    """
+    tracker = BankrollTracker(bankroll)
+    tracker.update_from(source, chunk_size)
+    return tracker
+
+
+def bootstrap_bankroll(source, bankroll, nb_trajectories=1000, nb_rounds=None, block_size=1, seed=None,
+                       chunk_size=2 ** 12, nb_workers=1):
+    """
+
+    Bankroll metrics of trajectories resampled from a single recorded stream.
+
+    Each trajectory is a moving block bootstrap of the stream: blocks of block_size consecutive rounds, starting at
+    uniformly drawn rounds, are concatenated. Blocks keep the correlation between the rounds of a shoe (e.g. the bets
+    of a counting strategy), which is lost with single rounds. Trajectories are processed together, chunk_size rounds
+    at a time, and split across processes if nb_workers > 1.
+
+    Parameters
+    ----------
+
+        source: PlayerHistory, dict, structured array or str
+            Stream of bets and gains, see load_stream. Paths are loaded by each worker instead of being copied.
+
+        bankroll: float
+            Initial capital of each trajectory.
+
+        nb_trajectories: int
+            Number of trajectories.
+
+        nb_rounds: int or None
+            Number of rounds of each trajectory (the length of the stream if None).
+
+        block_size: int
+            Number of consecutive rounds of each block.
+
+        seed: int, numpy.random.SeedSequence, numpy.random.Generator or None
+            Seed of the resampling. Results are reproducible for a given seed and number of workers.
+
+        chunk_size: int
+            Number of rounds processed at once (rounded to a multiple of block_size).
+
+        nb_workers: int or None
+            Number of processes (all CPU cores if None).
+
+    Returns
+    -------
+
+        tracker: BankrollTracker
+            Tracker of all the trajectories.
+
+    """
+    if nb_workers is None:
+        nb_workers = os.cpu_count()
+    if nb_rounds is None:
+        nb_rounds = len(load_stream(source)[1])
+    rng = np.random.default_rng(seed)
+    if nb_workers == 1:
+        return _bootstrap_worker(source, bankroll, nb_trajectories, nb_rounds, block_size, rng, chunk_size)
+    if isinstance(source, PlayerHistory):
+        source = {'bets': source['bets'], 'gains': source['gains']}
+    shards = [nb_trajectories // nb_workers + (i < nb_trajectories % nb_workers) for i in range(nb_workers)]
+    with ProcessPoolExecutor(max_workers=nb_workers) as executor:
+        trackers = list(executor.map(_bootstrap_worker, [source] * nb_workers, [bankroll] * nb_workers, shards,
+                                     [nb_rounds] * nb_workers, [block_size] * nb_workers, rng.spawn(nb_workers),
+                                     [chunk_size] * nb_workers))
+    tracker = trackers[0]
+    for other in trackers[1:]:
+        tracker.merge(other)
+    return tracker
+
+
+def _bootstrap_worker(source, bankroll, nb_trajectories, nb_rounds, block_size, rng, chunk_size):
+    bets, gains = load_stream(source)
+    assert len(gains) >= block_size, "The stream must be longer than a block."
+    tracker = BankrollTracker(bankroll, nb_trajectories)
+    nb_blocks = max(chunk_size // block_size, 1)
+    offsets = np.arange(block_size)[None, :, None]
+    while tracker.nb_rounds < nb_rounds:
+        starts = rng.integers(0, len(gains) - block_size + 1, size=(nb_blocks, 1, nb_trajectories))
+        rounds = (starts + offsets).reshape(-1, nb_trajectories)[:nb_rounds - tracker.nb_rounds]
+        tracker.update(bets[rounds], gains[rounds])
+    return tracker
+
+
+def _first_passage(crossed):
+    """ Index of the first True of each column, or the number of rows if there is none. """
+    return np.where(crossed.any(axis=0), crossed.argmax(axis=0), len(crossed))
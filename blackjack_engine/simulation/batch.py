@@ -0,0 +1,257 @@
+import numpy as np
+from tqdm import trange
+
+from blackjack_engine.strategy import BasePlayingStrategy
+from blackjack_engine.strategy import BaseBettingStrategy
+from blackjack_engine.strategy.tables import tabulate_strategy, HIT, DOUBLE, SPLIT, NO_PAIR
+
+from blackjack_engine.simulation.cards import hard_values as _hard_values
+from blackjack_engine.simulation.rules import BlackJackRules, BUST, BLACKJACK
+
+
+# value of each card, indexed by rank, the Ace being counted as 1
+hard_values = np.array(_hard_values, dtype=np.int16)
+
+
+class BatchSimulation:
+    """
+
+    Vectorized simulation, playing many independent shoes in lockstep.
+
+    Each shoe has its own table with all the registered players. Hand totals, dealer draws and payouts are computed
+    with array operations over all the shoes at once, so Python overhead is paid once per round for the whole batch
+    instead of once per card.
+
+    Playing strategies must be table-driven (see BasePlayingStrategy.table_driven): they are queried once on every
+    reachable decision when registered, and their answers are then read from a table. Betting strategies are called
+    through 'declare_bets', with the cards delt and remaining in every shoe.
+
+    Attributes
+    ----------
+
+        cards_order: array of shape (nb_shoes, nb_decks * 52)
+            Card ranks of each shoe, in dealing order.
+
+        nb_cards_delt: array of shape (nb_shoes,)
+            Number of cards delt from each shoe since its last shuffling.
+
+        delt_cards: array of shape (nb_shoes, 13)
+            Number of cards delt for each value (Ace, 2, ...) in each shoe.
+
+        game_rules: BlackJackRules
+            Defines the rules of the game.
+
+        players_history: dict
+            Bets and earnings history of each player, as arrays.
+
+    Parameters
+    ----------
+
+        nb_shoes: int
+            Number of shoes played in parallel.
+
+        nb_decks, penetration, max_hands, double_after_split, hit_soft_17, blackjack_payout:
+            See BlackjackSimulation.
+
+        seed: int, numpy.random.SeedSequence, numpy.random.Generator or None
+            Seed of the random generator used to shuffle the shoes (or the generator itself).
+
+    """
+    def __init__(self, nb_shoes=10000, nb_decks=4, penetration=0.75, max_hands=3, double_after_split=True,
+                 hit_soft_17=True, blackjack_payout=1.5, seed=None):
+        assert 0 <= penetration <= 1, "penetration must be between 0 and 1."
+        self.game_rules = BlackJackRules(max_hands, double_after_split, hit_soft_17, blackjack_payout)
+        self.rng = np.random.default_rng(seed)
+        self.nb_shoes = nb_shoes
+        self.nb_decks = nb_decks
+        deck = np.repeat(np.arange(13, dtype=np.int8), 4 * nb_decks)
+        self.cards_order = np.tile(deck, (nb_shoes, 1))
+        self.max_cards_delt = penetration * deck.shape[0]
+        self.nb_cards_delt = np.zeros(nb_shoes, dtype=np.int64)
+        self.delt_cards = np.zeros((nb_shoes, 13), dtype=np.int64)
+        self.players = {}
+        self.players_history = {}
+        self._tables = {}
+
+    @property
+    def remaining_cards(self):
+        return 4 * self.nb_decks - self.delt_cards
+
+    def register_player(self, name, betting_strategy, playing_strategy):
+        """ Adds a new player to every table. """
+        assert isinstance(betting_strategy, BaseBettingStrategy)
+        assert isinstance(playing_strategy, BasePlayingStrategy)
+        if not playing_strategy.table_driven:
+            raise ValueError(f"{type(playing_strategy).__name__} is not table-driven and cannot be batched.")
+        self.players[name] = (betting_strategy, playing_strategy)
+        self._tables[name] = tabulate_strategy(playing_strategy)
+        self.players_history[name] = {'bets': np.zeros(0), 'gains': np.zeros(0)}
+
+    def run(self, nb_rounds):
+        """ Runs the simulation until (at least) nb_rounds rounds were played in total, over all the shoes. """
+        nb_steps = -(-nb_rounds // self.nb_shoes)
+        bets = np.zeros((len(self.players), nb_steps, self.nb_shoes))
+        gains = np.zeros((len(self.players), nb_steps, self.nb_shoes))
+        self.shuffle()
+        for step in trange(nb_steps):
+            bets[:, step], gains[:, step] = self.play_round()
+        for i, name in enumerate(self.players):
+            self.players_history[name] = {'bets': bets[i].reshape(-1)[:nb_rounds],
+                                          'gains': gains[i].reshape(-1)[:nb_rounds]}
+        return self.players_history
+
+    def shuffle(self, rows=None):
+        """ Re-shuffle all cards into the given shoes (all shoes if rows is None). """
+        if rows is None:
+            self.rng.permuted(self.cards_order, axis=1, out=self.cards_order)
+            rows = slice(None)
+        else:
+            self.cards_order[rows] = self.rng.permuted(self.cards_order[rows], axis=1)
+        self.nb_cards_delt[rows] = 0
+        self.delt_cards[rows] = 0
+
+    def deal_cards(self, rows):
+        """ Deal one card from each of the given shoes, and return their ranks. """
+        exhausted = self.nb_cards_delt[rows] >= self.cards_order.shape[1]
+        if exhausted.any():
+            self.shuffle(rows[exhausted])
+        position = self.nb_cards_delt[rows]
+        cards = self.cards_order[rows, position]
+        self.nb_cards_delt[rows] = position + 1
+        self.delt_cards[rows, cards] += 1
+        return cards
+
+    def play_round(self):
+        """
+
+        Play one round in every shoe.
+
+        Returns
+        -------
+
+            bets, gains: arrays of shape (nb_players, nb_shoes)
+                Total amount bet and won by each player in each shoe.
+
+        """
+        nb_shoes, nb_players, max_hands = self.nb_shoes, len(self.players), self.game_rules.max_hands
+        all_rows = np.arange(nb_shoes)
+        shape = (nb_shoes, nb_players, max_hands)
+        hands = {
+            'hard': np.zeros(shape, dtype=np.int16),
+            'aces': np.zeros(shape, dtype=bool),
+            'nb_cards': np.zeros(shape, dtype=np.int16),
+            'first': np.zeros(shape, dtype=np.int8),
+            'second': np.zeros(shape, dtype=np.int8),
+            'multiplier': np.ones(shape),
+        }
+        nb_hands = np.ones((nb_shoes, nb_players), dtype=np.int16)
+
+        # betting round
+        bets = np.empty((nb_shoes, nb_players))
+        remaining_cards = self.remaining_cards
+        for p, (betting_strategy, _) in enumerate(self.players.values()):
+            bets[:, p] = betting_strategy.declare_bets(self.delt_cards, remaining_cards)
+
+        # deal two cards to each player, then to the dealer
+        for p in range(nb_players):
+            first, second = self.deal_cards(all_rows), self.deal_cards(all_rows)
+            self._set_hand(hands, all_rows, p, 0, first, second)
+        dealer_card, dealer_hole_card = self.deal_cards(all_rows), self.deal_cards(all_rows)
+        dealer_hard = hard_values[dealer_card] + hard_values[dealer_hole_card]
+        dealer_aces = (dealer_card == 0) | (dealer_hole_card == 0)
+
+        # players' turns
+        for p, table in enumerate(self._tables.values()):
+            for h in range(max_hands):
+                self._play_hand(hands, nb_hands, table, dealer_card, p, h)
+
+        # dealer's turn
+        dealer_nb_cards = np.full(nb_shoes, 2)
+        rows = all_rows
+        while rows.size:
+            is_soft = dealer_aces[rows] & (dealer_hard[rows] <= 11)
+            value = dealer_hard[rows] + 10 * is_soft
+            hit = (value < 17) | (self.game_rules.hit_soft_17 & is_soft & (value == 17))
+            rows = rows[hit]
+            if rows.size:
+                card = self.deal_cards(rows)
+                dealer_hard[rows] += hard_values[card]
+                dealer_aces[rows] |= card == 0
+                dealer_nb_cards[rows] += 1
+
+        # evaluation phase: final states of the hands, then their payouts read in the rules' table
+        dealer_soft = dealer_aces & (dealer_hard <= 11)
+        dealer_value = dealer_hard + 10 * dealer_soft
+        dealer_state = _final_states(dealer_value, (dealer_nb_cards == 2) & (dealer_value == 21))
+        player_soft = hands['aces'] & (hands['hard'] <= 11)
+        player_value = hands['hard'] + 10 * player_soft
+        player_blackjack = (nb_hands[..., None] == 1) & (hands['nb_cards'] == 2) & (player_value == 21)
+        outcome = self.game_rules.payouts[_final_states(player_value, player_blackjack), dealer_state[:, None, None]]
+        hand_bets = bets[..., None] * hands['multiplier'] * (np.arange(max_hands) < nb_hands[..., None])
+        round_bets = hand_bets.sum(axis=-1)
+        round_gains = (hand_bets * outcome).sum(axis=-1)
+
+        # re-shuffle the shoes that reached the penetration
+        to_shuffle = np.flatnonzero(self.nb_cards_delt >= self.max_cards_delt)
+        if to_shuffle.size:
+            self.shuffle(to_shuffle)
+        return round_bets.T, round_gains.T
+
+    def _play_hand(self, hands, nb_hands, table, dealer_card, p, h):
+        """ Play the h-th hand of the p-th player in all shoes, until no action is available. """
+        rows = np.flatnonzero(nb_hands[:, p] > h)
+        while rows.size:
+            hard, first, second = hands['hard'][rows, p, h], hands['first'][rows, p, h], hands['second'][rows, p, h]
+            is_soft = hands['aces'][rows, p, h] & (hard <= 11)
+            value = hard + 10 * is_soft
+            split_hands = nb_hands[rows, p]
+
+            # no action after reaching 21, nor after splitting aces
+            playable = (value < 21) & ~((split_hands > 1) & (first == 0))
+            rows, first, second, is_soft, value, split_hands = \
+                rows[playable], first[playable], second[playable], is_soft[playable], value[playable], \
+                split_hands[playable]
+            if not rows.size:
+                break
+
+            two_cards = hands['nb_cards'][rows, p, h] == 2
+            is_pair = two_cards & (first == second)
+            can_double = two_cards & ((split_hands == 1) | self.game_rules.double_after_split)
+            can_split = is_pair & (split_hands < self.game_rules.max_hands)
+            mask = can_double + 2 * can_split
+            action = table[np.where(is_pair, first, NO_PAIR), is_soft.astype(np.int8), value, dealer_card[rows], mask]
+
+            # hit / double down -> add a card to the hand
+            draw = rows[(action == HIT) | (action == DOUBLE)]
+            if draw.size:
+                card = self.deal_cards(draw)
+                hands['hard'][draw, p, h] += hard_values[card]
+                hands['aces'][draw, p, h] |= card == 0
+                hands['nb_cards'][draw, p, h] += 1
+            hands['multiplier'][rows[action == DOUBLE], p, h] *= 2
+
+            # split -> shift the next hands, and deal one card for each of the 2 new hands
+            split = rows[action == SPLIT]
+            if split.size:
+                for array in hands.values():
+                    array[split, p, h + 2:] = array[split, p, h + 1:-1]
+                card = first[action == SPLIT]
+                self._set_hand(hands, split, p, h, card, self.deal_cards(split))
+                self._set_hand(hands, split, p, h + 1, card, self.deal_cards(split))
+                nb_hands[split, p] += 1
+
+            rows = rows[(action == HIT) | (action == SPLIT)]
+
+    @staticmethod
+    def _set_hand(hands, rows, p, h, first, second):
+        hands['hard'][rows, p, h] = hard_values[first] + hard_values[second]
+        hands['aces'][rows, p, h] = (first == 0) | (second == 0)
+        hands['nb_cards'][rows, p, h] = 2
+        hands['first'][rows, p, h] = first
+        hands['second'][rows, p, h] = second
+        hands['multiplier'][rows, p, h] = 1
+
+
+def _final_states(value, blackjack):
+    """ Final states of hands (see rules.hand_state), given their values and whether they are blackjacks. """
+    return np.where(blackjack, BLACKJACK, np.where(value > 21, BUST, value))
@@ -0,0 +1,86 @@
+import numpy as np
+
+
+cards_names = ['A', '2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K']
+
+# value of each card, indexed by rank, the Ace being counted as 1
+hard_values = (1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10)
+
+# value of each card, indexed by name, the Ace being counted as 11
+card_values = {'A': 11, '2': 2, '3': 3, '4': 4, '5': 5, '6': 6, '7': 7,
+               '8': 8, '9': 9, '10': 10, 'J': 10, 'Q': 10, 'K': 10}
+
+
+class Card(int):
+    """
+
+    A card, represented by its rank: 0 for an Ace, 1 for a 2, ..., 9 for a 10, 10 for a Jack, ..., 12 for a King.
+
+    Cards behave as integers, but for compatibility they can also be compared with their names ('A', '2', ..., 'K'),
+    and are printed with their names.
+
+    """
+    __slots__ = ()
+
+    def __eq__(self, other):
+        if isinstance(other, str):
+            return cards_names[self] == other
+        return int.__eq__(self, other)
+
+    def __ne__(self, other):
+        if isinstance(other, str):
+            return cards_names[self] != other
+        return int.__ne__(self, other)
+
+    __hash__ = int.__hash__
+
+    def __repr__(self):
+        return cards_names[self]
+
+    __str__ = __repr__
+
+
+# the 13 cards, indexed by rank
+CARDS = tuple(Card(rank) for rank in range(13))
+
+
+def to_card(card):
+    """ Card corresponding to a rank or to a name. """
+    if isinstance(card, str):
+        return CARDS[cards_names.index(card)]
+    return CARDS[card]
+
+
+class CardCounts(np.ndarray):
+    """
+
+    Number of cards of each rank, as an array of size 13.
+
+    For compatibility, counts can also be read by card name (counts['A'], counts['10'], ...), and iterated as a dict
+    with 'keys', 'values' and 'items'. Arithmetic on counts returns plain arrays and scalars.
+
+    """
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        inputs = [x.view(np.ndarray) if isinstance(x, CardCounts) else x for x in inputs]
+        if 'out' in kwargs:
+            kwargs['out'] = tuple(x.view(np.ndarray) if isinstance(x, CardCounts) else x for x in kwargs['out'])
+        return getattr(ufunc, method)(*inputs, **kwargs)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            key = cards_names.index(key)
+        return super().__getitem__(key)
+
+    def __setitem__(self, key, value):
+        if isinstance(key, str):
+            key = cards_names.index(key)
+        super().__setitem__(key, value)
+
+    def keys(self):
+        return list(cards_names)
+
+    def values(self):
+        return self.view(np.ndarray).tolist()
+
+    def items(self):
+        return list(zip(cards_names, self.values()))
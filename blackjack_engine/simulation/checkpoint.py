@@ -0,0 +1,59 @@
+"""
+
+Checkpoints of long runs, written in the background so that the rounds keep being played while they are saved.
+
+"""
+import os
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+
+
+class CheckpointWriter:
+    """
+
+    Writes checkpoints to a file from a background thread, one at a time.
+
+    Each checkpoint is pickled to a temporary file which then replaces the previous checkpoint atomically, so that
+    the file always holds a complete checkpoint, even if the process is killed while writing. A checkpoint must not
+    be modified once submitted (see BlackjackSimulation.checkpoint, which copies the state of a run).
+
+    Parameters
+    ----------
+
+        path: str
+            Path of the checkpoint file.
+
+    """
+    def __init__(self, path):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._pending = None
+
+    def write(self, checkpoint):
+        """ Writes a checkpoint in the background, after the previous one (at most one write is pending). """
+        self.wait()
+        self._pending = self._executor.submit(write_checkpoint, self.path, checkpoint)
+
+    def wait(self):
+        """ Waits until the pending write is done, and raises its error if it failed. """
+        if self._pending is not None:
+            pending, self._pending = self._pending, None
+            pending.result()
+
+    def close(self):
+        self.wait()
+        self._executor.shutdown()
+
+
+def write_checkpoint(path, checkpoint):
+    """ Pickles a checkpoint to a file, replacing the previous one atomically. """
+    temporary_path = path + '.tmp'
+    with open(temporary_path, 'wb') as file:
+        pickle.dump(checkpoint, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary_path, path)
+
+
+def load_checkpoint(path):
+    """ Reads a checkpoint written by write_checkpoint. """
+    with open(path, 'rb') as file:
+        return pickle.load(file)
@@ -0,0 +1,76 @@
+from blackjack_engine.simulation.cards import cards_names
+
+
+class CountingSystem:
+    """
+
+    Card counting system: each card delt adds the weight of its rank to the running count.
+
+    Parameters
+    ----------
+
+        name: str
+            Name of the system, used to read its counts on a Shoe.
+
+        weights: dict<str, float> or list of float
+            Weight of each rank, by card name ('A', '2', ..., 'K') or as a list indexed by rank. Missing names weigh 0.
+
+        initial_count: float
+            Running count of a full single-deck shoe, unbalanced systems usually start from a negative count.
+
+        initial_count_per_deck: float
+            Added to the initial running count for each deck in addition to the first one.
+
+    """
+    def __init__(self, name, weights, initial_count=0., initial_count_per_deck=0.):
+        if isinstance(weights, dict):
+            for card in weights:
+                if card not in cards_names:
+                    raise ValueError(f"Unknown card '{card}', expected one of {cards_names}.")
+            weights = [weights.get(card, 0) for card in cards_names]
+        if len(weights) != 13:
+            raise ValueError("A counting system must have one weight per rank (Ace, 2, ..., King).")
+        self.name = name
+        self.weights = tuple(float(weight) for weight in weights)
+        self.initial_count = initial_count
+        self.initial_count_per_deck = initial_count_per_deck
+
+    @property
+    def is_balanced(self):
+        """ Whether the running count of a full shoe is 0 once all cards have been delt. """
+        return sum(self.weights) == 0
+
+    def initial_running_count(self, nb_decks):
+        """ Running count of a freshly shuffled shoe. """
+        return float(self.initial_count + self.initial_count_per_deck * (nb_decks - 1))
+
+    def running_count(self, cards_delt, nb_decks):
+        """ Running count computed from scratch, given the number of cards delt for each rank. """
+        return self.initial_running_count(nb_decks) + sum(
+            weight * int(count) for weight, count in zip(self.weights, cards_delt))
+
+    def __repr__(self):
+        return f"CountingSystem(name='{self.name}', weights={dict(zip(cards_names, self.weights))})"
+
+
+_tens = ['10', 'J', 'Q', 'K']
+
+HI_LO = CountingSystem('hi-lo', {'2': 1, '3': 1, '4': 1, '5': 1, '6': 1, 'A': -1, **{card: -1 for card in _tens}})
+KO = CountingSystem('ko', {'2': 1, '3': 1, '4': 1, '5': 1, '6': 1, '7': 1, 'A': -1, **{card: -1 for card in _tens}},
+                    initial_count_per_deck=-4)
+OMEGA_II = CountingSystem('omega-ii', {'2': 1, '3': 1, '4': 2, '5': 2, '6': 2, '7': 1, '9': -1,
+                                       **{card: -2 for card in _tens}})
+ZEN = CountingSystem('zen', {'2': 1, '3': 1, '4': 2, '5': 2, '6': 2, '7': 1, 'A': -1,
+                             **{card: -2 for card in _tens}})
+
+# counting systems available by name
+counting_systems = {system.name: system for system in [HI_LO, KO, OMEGA_II, ZEN]}
+
+
+def to_counting_system(system):
+    """ Returns the CountingSystem corresponding to a name, or the system itself. """
+    if isinstance(system, CountingSystem):
+        return system
+    if system not in counting_systems:
+        raise ValueError(f"Unknown counting system '{system}', expected one of {list(counting_systems)}.")
+    return counting_systems[system]
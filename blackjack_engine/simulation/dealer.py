@@ -0,0 +1,139 @@
+from functools import lru_cache
+
+import numpy as np
+
+from blackjack_engine.simulation.analysis import CompositionAnalyzer, dealer_outcomes, value_classes, BUST, BLACKJACK
+from blackjack_engine.simulation.rules import BlackJackRules
+
+
+class DealerOutcomeCache:
+    """
+
+    Cache of the probabilities of the dealer's final outcomes given his up-card and the composition of the shoe,
+    meant to be shared by composition-aware strategies across decisions and rounds.
+
+    Small shoes (at most 'exact_max_cards' cards) get exact distributions, accounting for the cards removed by each
+    of the dealer's draws. In larger shoes, where a few draws barely change the composition, the proportion of each
+    card value is rounded to a multiple of 1 / resolution and the distribution is computed for these proportions,
+    so that the many compositions of a large shoe fall into a limited number of buckets. In both cases, the
+    distributions are kept in a bounded LRU cache.
+
+    Parameters
+    ----------
+
+        game_rules: BlackJackRules
+            Rules of the game (only hit_soft_17 is used).
+
+        exact_max_cards: int
+            Largest number of cards for which distributions are computed on the exact composition.
+
+        resolution: int
+            Number of quantization levels of the proportion of each card value, for larger shoes. Finer buckets are
+            more accurate, coarser buckets are reused more often.
+
+        cache_size: int
+            Maximum number of distributions kept in cache.
+
+    """
+    _shared = {}
+
+    def __init__(self, game_rules=None, exact_max_cards=52, resolution=400, cache_size=2 ** 16):
+        self.game_rules = game_rules if game_rules is not None else BlackJackRules()
+        self.exact_max_cards = exact_max_cards
+        self.resolution = resolution
+        # the dealer's distributions only depend on hit_soft_17 (and on the peek, which the cache does not model)
+        self._analyzer = CompositionAnalyzer(BlackJackRules(hit_soft_17=self.game_rules.hit_soft_17),
+                                             cache_size=cache_size)
+        self._distribution = lru_cache(maxsize=cache_size)(self._compute_distribution)
+
+    @classmethod
+    def shared(cls, game_rules=None):
+        """ Cache shared by every caller using the same hit_soft_17 rule. """
+        hit_soft_17 = game_rules.hit_soft_17 if game_rules is not None else BlackJackRules().hit_soft_17
+        if hit_soft_17 not in cls._shared:
+            cls._shared[hit_soft_17] = cls(BlackJackRules(hit_soft_17=hit_soft_17))
+        return cls._shared[hit_soft_17]
+
+    def distribution(self, up_card, composition):
+        """
+
+        Probabilities of the dealer's final outcomes.
+
+        Parameters
+        ----------
+
+            up_card: int or Card
+                Rank of the dealer's visible card.
+
+            composition: array of size 13 (or 10)
+                Number of cards of each rank the dealer can draw from, e.g. the shoe's remaining cards.
+
+        Returns
+        -------
+
+            distribution: read-only array of size 7
+                Probabilities of the outcomes listed in 'dealer_outcomes' (17, 18, 19, 20, 21, bust, blackjack).
+
+        """
+        return self._distribution(min(int(up_card), 9), *self.composition_key(composition))
+
+    def outcomes(self, up_card, composition):
+        """ Same as 'distribution', as a dict indexed by outcome. """
+        return dict(zip(dealer_outcomes, self.distribution(up_card, composition).tolist()))
+
+    def composition_key(self, composition):
+        """
+
+        Key of a composition in the cache: its number of cards of each value and True for small shoes, or the
+        rounded proportions of each value (in 1 / resolution) and False for larger shoes.
+
+        """
+        composition = value_classes(composition)
+        nb_cards = sum(composition)
+        if nb_cards <= self.exact_max_cards:
+            return composition, True
+        return tuple(int(count * self.resolution / nb_cards + 0.5) for count in composition), False
+
+    def cache_info(self):
+        """ Statistics of the distributions cache. """
+        return self._distribution.cache_info()
+
+    def _compute_distribution(self, up_card, composition, exact):
+        if exact:
+            distribution = np.array(self._analyzer.dealer_distribution(composition, [up_card]))
+        else:
+            total = sum(composition)
+            distribution = self._proportions_distribution([count / total for count in composition], up_card)
+        distribution.setflags(write=False)
+        return distribution
+
+    def _proportions_distribution(self, probabilities, up_card):
+        """ Distribution when each card value is drawn with fixed probabilities (no removal). """
+        hit_soft_17 = self.game_rules.hit_soft_17
+        distribution = [0.] * 7
+        draws = [(card_class, card_probability) for card_class, card_probability in enumerate(probabilities)
+                 if card_probability]
+        # probability of reaching each state (hard total, has an Ace, number of cards up to 3) of the dealer's hand,
+        # visited by increasing hard total since each draw increases it
+        states = [[[0.] * 4 for _ in range(2)] for _ in range(28)]
+        states[up_card + 1][up_card == 0][1] = 1.
+        for hard in range(1, 28):
+            for has_ace in range(2):
+                is_soft = has_ace and hard <= 11
+                value = hard + 10 if is_soft else hard
+                for nb_cards in range(1, 4):
+                    probability = states[hard][has_ace][nb_cards]
+                    if not probability:
+                        continue
+                    if nb_cards == 2 and value == 21:
+                        distribution[BLACKJACK] += probability
+                    elif value > 21:
+                        distribution[BUST] += probability
+                    elif value >= 18 or (value == 17 and not (is_soft and hit_soft_17)):
+                        distribution[value - 17] += probability
+                    else:
+                        next_cards = min(nb_cards + 1, 3)
+                        for card_class, card_probability in draws:
+                            states[hard + card_class + 1][has_ace or card_class == 0][next_cards] += \
+                                probability * card_probability
+        return np.array(distribution)
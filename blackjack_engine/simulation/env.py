@@ -0,0 +1,370 @@
+"""
+
+Vectorized environment for reinforcement learning: many tables stepped in lockstep, whose decisions are the actions
+passed to 'step' instead of a playing strategy's.
+
+"""
+import numpy as np
+
+from blackjack_engine.strategy.actions import HIT, DOUBLE, SPLIT, SURRENDER, NO_ACTION, actions_names
+
+from blackjack_engine.simulation.batch import hard_values, _final_states
+from blackjack_engine.simulation.counts import to_counting_system
+from blackjack_engine.simulation.rules import BlackJackRules, SURRENDERED
+
+
+class VectorEnv:
+    """
+
+    Reinforcement learning environment playing nb_tables tables in lockstep, each with a single seat betting one unit
+    per round.
+
+    Each table deals its own shoe and plays its rounds as BlackjackSimulation (the same cards give the same hands,
+    except that splits are limited to max_hands hands in total, whatever the order in which they were split).
+    A step plays one action on the current hand of every table. Once the last hand of a table's round is over, the
+    dealer plays, the round is settled and the next round is dealt right away (auto-reset), after re-shuffling the
+    shoe if it reached the penetration: the observation returned for this table is then the first decision of the
+    new round. Rounds without any decision (player's blackjacks, or dealer's blackjacks revealed by his peek) are
+    settled while dealing, and their gains are added to the rewards of the step.
+
+    The state of every table is held in arrays, so that a step costs a fixed number of array operations whatever the
+    number of tables. The arrays returned by 'reset' and 'step' are preallocated and overwritten by the next step.
+
+    Parameters
+    ----------
+
+        nb_tables: int
+            Number of tables stepped at once.
+
+        nb_decks, penetration, max_hands, double_after_split, hit_soft_17, blackjack_payout, surrender, dealer_peek,
+        resplit_aces, double_on:
+            See BlackjackSimulation. Insurance is never offered, and early surrenders are not supported with a peek.
+
+        counting_systems: list of str or CountingSystem
+            Counting systems whose true counts are observed.
+
+        seed: int, numpy.random.SeedSequence, numpy.random.Generator or None
+            Seed of the random generator used to shuffle the shoes (or the generator itself).
+
+    Attributes
+    ----------
+
+        observations: float32 array of shape (nb_tables, 4 + len(counting_systems))
+            Current decision of each table: value of the hand, whether it is soft, rank of the paired cards (-1 if
+            the hand is not a pair), rank of the dealer's visible card and true count of each counting system (see
+            'observation_names').
+
+        masks: int8 array of shape (nb_tables,)
+            Available actions bitmask of the current decision of each table (see BlackJackRules.available_mask).
+
+        rewards: array of shape (nb_tables,)
+            Gains of the rounds settled during the last step (or reset), for a unit bet.
+
+        dones: bool array of shape (nb_tables,)
+            Whether a round was settled during the last step, i.e. the observation is the one of a new round.
+
+        infos: dict<str, array>
+            Number of rounds settled ('nb_rounds') and whether the shoe was re-shuffled ('shuffled') at each table
+            during the last step (or reset).
+
+        nb_rounds_played: int
+            Number of rounds settled since the last reset, over all the tables.
+
+        cards_order, nb_cards_delt, delt_cards:
+            Shoes of the tables, see BatchSimulation.
+
+        game_rules: BlackJackRules
+            Defines the rules of the game.
+
+    """
+    def __init__(self, nb_tables=1024, nb_decks=4, penetration=0.75, max_hands=3, double_after_split=True,
+                 hit_soft_17=True, blackjack_payout=1.5, surrender='none', dealer_peek=False, resplit_aces=False,
+                 double_on='any', counting_systems=('hi-lo',), seed=None):
+        assert 0 <= penetration <= 1, "penetration must be between 0 and 1."
+        self.game_rules = BlackJackRules(max_hands, double_after_split, hit_soft_17, blackjack_payout,
+                                         surrender=surrender, dealer_peek=dealer_peek, resplit_aces=resplit_aces,
+                                         double_on=double_on)
+        if dealer_peek and surrender == 'early':
+            raise ValueError("Early surrenders are declared before the dealer's peek, and are not supported by "
+                             "VectorEnv.")
+        self.rng = np.random.default_rng(seed)
+        self.nb_tables = nb_tables
+        self.nb_decks = nb_decks
+        deck = np.repeat(np.arange(13, dtype=np.int8), 4 * nb_decks)
+        self.cards_order = np.tile(deck, (nb_tables, 1))
+        self.max_cards_delt = penetration * deck.shape[0]
+        self.nb_cards_delt = np.zeros(nb_tables, dtype=np.int64)
+        self.delt_cards = np.zeros((nb_tables, 13), dtype=np.int64)
+        systems = [to_counting_system(system) for system in counting_systems]
+        self.observation_names = ['value', 'soft', 'pair', 'dealer_card'] + \
+                                 [f"true_count_{system.name}" for system in systems]
+        self._count_weights = np.array([system.weights for system in systems]).reshape(-1, 13).T
+        self._initial_counts = np.array([system.initial_running_count(nb_decks) for system in systems])
+
+        # hands of each table, the first nb_hands being in play
+        shape = (nb_tables, max_hands)
+        self._hands = {
+            'hard': np.zeros(shape, dtype=np.int16),
+            'aces': np.zeros(shape, dtype=bool),
+            'nb_cards': np.zeros(shape, dtype=np.int16),
+            'first': np.zeros(shape, dtype=np.int8),
+            'second': np.zeros(shape, dtype=np.int8),
+            'last_action': np.full(shape, NO_ACTION, dtype=np.int8),
+            'surrendered': np.zeros(shape, dtype=bool),
+            'multiplier': np.ones(shape),
+        }
+        # flat views of the hands, indexed by table * max_hands + hand
+        self._flat_hands = {name: array.reshape(-1) for name, array in self._hands.items()}
+        self._nb_hands = np.ones(nb_tables, dtype=np.int64)
+        self._hand_idx = np.zeros(nb_tables, dtype=np.int64)
+        self._dealer_card = np.zeros(nb_tables, dtype=np.int8)
+        self._dealer_hole_card = np.zeros(nb_tables, dtype=np.int8)
+        self._all_tables = np.arange(nb_tables)
+        self._available_masks = self.game_rules.available_masks.reshape(-1)
+
+        # outputs, and their values accumulated during a step
+        self.observations = np.zeros((nb_tables, len(self.observation_names)), dtype=np.float32)
+        self.masks = np.zeros(nb_tables, dtype=np.int8)
+        self.rewards = np.zeros(nb_tables)
+        self.dones = np.zeros(nb_tables, dtype=bool)
+        self.infos = {'nb_rounds': np.zeros(nb_tables, dtype=np.int64), 'shuffled': np.zeros(nb_tables, dtype=bool)}
+        self.nb_rounds_played = 0
+        self._rewards = np.zeros(nb_tables)
+        self._nb_rounds = np.zeros(nb_tables, dtype=np.int64)
+        self._shuffled = np.zeros(nb_tables, dtype=bool)
+
+    def reset(self, seed=None, shuffle=True):
+        """
+
+        Deals a new round at every table.
+
+        Parameters
+        ----------
+
+            seed: int, numpy.random.SeedSequence, numpy.random.Generator or None
+                If given, the random generator is re-seeded.
+
+            shuffle: bool
+                If True, the shoes are re-shuffled. Otherwise, they are delt from their current position (e.g. after
+                setting cards_order).
+
+        Returns
+        -------
+
+            observations, masks: arrays
+                First decision of each table, see the attributes of the same names.
+
+        """
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+        if shuffle:
+            self.shuffle()
+        self.nb_rounds_played = 0
+        self._start_rounds(self._all_tables)
+        self._update_outputs()
+        return self.observations, self.masks
+
+    def step(self, actions):
+        """
+
+        Plays an action on the current hand of every table.
+
+        Parameters
+        ----------
+
+            actions: array of int of shape (nb_tables,)
+                Code of the action of each table (see strategy.actions), which must be available in 'masks'.
+
+        Returns
+        -------
+
+            observations, masks, rewards, dones, infos:
+                See the attributes of the same names.
+
+        """
+        actions = np.asarray(actions)
+        if actions.shape != (self.nb_tables,):
+            raise ValueError(f"Expected one action per table, got actions of shape {actions.shape}.")
+        if ((actions < 0) | (actions >= len(actions_names))).any() or not (self.masks >> actions & 1).all():
+            raise ValueError("Some actions are not available, see 'masks'.")
+        hands = self._flat_hands
+        current = self._all_tables * self.game_rules.max_hands + self._hand_idx
+
+        # hit / double down -> add a card to the hand
+        drawing = np.flatnonzero((actions == HIT) | (actions == DOUBLE))
+        if drawing.size:
+            card = self.deal_cards(drawing)
+            idx = current[drawing]
+            hands['hard'][idx] += hard_values[card]
+            hands['aces'][idx] |= card == 0
+            hands['nb_cards'][idx] += 1
+        hands['multiplier'][current[actions == DOUBLE]] *= 2
+        hands['surrendered'][current[actions == SURRENDER]] = True
+        hands['last_action'][current] = actions
+
+        # split -> insert a new hand after the current one, and deal one card for each of the 2 hands
+        splitting = np.flatnonzero(actions == SPLIT)
+        if splitting.size:
+            self._split(splitting)
+
+        # tables whose round is over are settled, and start a new round
+        over = self._advance(self._all_tables)
+        if over.size:
+            self._end_rounds(over)
+            self._start_rounds(over)
+        self._update_outputs()
+        return self.observations, self.masks, self.rewards, self.dones, self.infos
+
+    def shuffle(self, rows=None):
+        """ Re-shuffle all cards into the shoes of the given tables (all tables if rows is None). """
+        if rows is None:
+            self.rng.permuted(self.cards_order, axis=1, out=self.cards_order)
+            rows = slice(None)
+        else:
+            self.cards_order[rows] = self.rng.permuted(self.cards_order[rows], axis=1)
+        self.nb_cards_delt[rows] = 0
+        self.delt_cards[rows] = 0
+        self._shuffled[rows] = True
+
+    def deal_cards(self, rows):
+        """ Deal one card from the shoe of each of the given tables, and return their ranks. """
+        exhausted = self.nb_cards_delt[rows] >= self.cards_order.shape[1]
+        if exhausted.any():
+            self.shuffle(rows[exhausted])
+        position = self.nb_cards_delt[rows]
+        cards = self.cards_order[rows, position]
+        self.nb_cards_delt[rows] = position + 1
+        self.delt_cards[rows, cards] += 1
+        return cards
+
+    def _start_rounds(self, rows):
+        """ Deals a new round at the given tables, settling at once the rounds without any decision. """
+        while rows.size:
+            player_first, player_second = self.deal_cards(rows), self.deal_cards(rows)
+            dealer_card, dealer_hole_card = self.deal_cards(rows), self.deal_cards(rows)
+            self._dealer_card[rows], self._dealer_hole_card[rows] = dealer_card, dealer_hole_card
+            self._nb_hands[rows] = 1
+            self._hand_idx[rows] = 0
+            self._set_hands(rows * self.game_rules.max_hands, player_first, player_second)
+            if self.game_rules.dealer_peek:
+                # a dealer's blackjack ends the round before the player's turn
+                peeked = (hard_values[dealer_card] + hard_values[dealer_hole_card] == 11) & \
+                         ((dealer_card == 0) | (dealer_hole_card == 0))
+                over = np.concatenate([rows[peeked], self._advance(rows[~peeked])])
+            else:
+                over = self._advance(rows)
+            if over.size:
+                self._end_rounds(over)
+            rows = over
+
+    def _advance(self, rows):
+        """ Moves the given tables to their next hand with available actions, returns those whose round is over. """
+        over = []
+        while rows.size:
+            rows = rows[self._hand_features(rows)[3] == 0]
+            self._hand_idx[rows] += 1
+            finished = self._hand_idx[rows] >= self._nb_hands[rows]
+            over.append(rows[finished])
+            rows = rows[~finished]
+        return np.concatenate(over) if over else rows
+
+    def _split(self, rows):
+        """ Splits the current hand of the given tables. """
+        max_hands = self.game_rules.max_hands
+        hand_idx = self._hand_idx[rows]
+        # the next hands are shifted to make room for the new hand
+        for h in range(max_hands - 1, 1, -1):
+            shifted = rows[h > hand_idx + 1]
+            for array in self._hands.values():
+                array[shifted, h] = array[shifted, h - 1]
+        current = rows * max_hands + hand_idx
+        card = self._flat_hands['first'][current]
+        self._set_hands(current, card, self.deal_cards(rows), last_action=SPLIT)
+        self._set_hands(current + 1, card, self.deal_cards(rows))
+        self._nb_hands[rows] += 1
+
+    def _set_hands(self, idx, first, second, last_action=NO_ACTION):
+        hands = self._flat_hands
+        hands['hard'][idx] = hard_values[first] + hard_values[second]
+        hands['aces'][idx] = (first == 0) | (second == 0)
+        hands['nb_cards'][idx] = 2
+        hands['first'][idx] = first
+        hands['second'][idx] = second
+        hands['last_action'][idx] = last_action
+        hands['surrendered'][idx] = False
+        hands['multiplier'][idx] = 1
+
+    def _hand_features(self, rows):
+        """ Value, softness, pair's rank (-1 if none) and available actions bitmask of the tables' current hands. """
+        hands = self._flat_hands
+        idx = rows * self.game_rules.max_hands + self._hand_idx[rows]
+        hard, first, nb_hands = hands['hard'][idx], hands['first'][idx], self._nb_hands[rows]
+        soft = hands['aces'][idx] & (hard <= 11)
+        value = hard + 10 * soft
+        two_cards = hands['nb_cards'][idx] == 2
+        is_pair = two_cards & (first == hands['second'][idx])
+        # same index as in BlackJackRules.available_mask, in the flattened table
+        nb_hands_states, nb_last_actions = self.game_rules.available_masks.shape[4:]
+        index = ((np.minimum(value, 21) * 2 + two_cards) * 2 + is_pair) * 2 + ((nb_hands > 1) & (first == 0))
+        index = (index * nb_hands_states + np.minimum(nb_hands, nb_hands_states) - 1) * nb_last_actions
+        masks = self._available_masks[index + hands['last_action'][idx] + 1]
+        return value, soft, np.where(is_pair, first, -1), masks
+
+    def _end_rounds(self, rows):
+        """ Plays the dealer's turn at the given tables, and settles their hands. """
+        rules = self.game_rules
+        dealer_card, dealer_hole_card = self._dealer_card[rows], self._dealer_hole_card[rows]
+        dealer_hard = hard_values[dealer_card] + hard_values[dealer_hole_card]
+        dealer_aces = (dealer_card == 0) | (dealer_hole_card == 0)
+        dealer_nb_cards = np.full(len(rows), 2)
+        drawing = np.arange(len(rows))
+        while drawing.size:
+            is_soft = dealer_aces[drawing] & (dealer_hard[drawing] <= 11)
+            value = dealer_hard[drawing] + 10 * is_soft
+            drawing = drawing[(value < 17) | (rules.hit_soft_17 & is_soft & (value == 17))]
+            if drawing.size:
+                card = self.deal_cards(rows[drawing])
+                dealer_hard[drawing] += hard_values[card]
+                dealer_aces[drawing] |= card == 0
+                dealer_nb_cards[drawing] += 1
+
+        # final states of the hands, then their payouts read in the rules' table
+        dealer_value = dealer_hard + 10 * (dealer_aces & (dealer_hard <= 11))
+        dealer_state = _final_states(dealer_value, (dealer_nb_cards == 2) & (dealer_value == 21))
+        hands = self._hands
+        hard = hands['hard'][rows]
+        value = hard + 10 * (hands['aces'][rows] & (hard <= 11))
+        nb_hands = self._nb_hands[rows, None]
+        blackjack = (nb_hands == 1) & (hands['nb_cards'][rows] == 2) & (value == 21)
+        states = np.where(hands['surrendered'][rows], SURRENDERED, _final_states(value, blackjack))
+        outcome = rules.payouts[states, dealer_state[:, None]] * (np.arange(rules.max_hands) < nb_hands)
+        self._rewards[rows] += (hands['multiplier'][rows] * outcome).sum(axis=1)
+        self._nb_rounds[rows] += 1
+        self.nb_rounds_played += len(rows)
+
+        # re-shuffle the shoes that reached the penetration
+        to_shuffle = rows[self.nb_cards_delt[rows] >= self.max_cards_delt]
+        if to_shuffle.size:
+            self.shuffle(to_shuffle)
+
+    def _update_outputs(self):
+        """ Writes the current decisions, and the rewards accumulated since the last update, in the outputs. """
+        value, soft, pair, masks = self._hand_features(self._all_tables)
+        observations = self.observations
+        observations[:, 0] = value
+        observations[:, 1] = soft
+        observations[:, 2] = pair
+        observations[:, 3] = self._dealer_card
+        if self._count_weights.size:
+            running_counts = self._initial_counts + self.delt_cards @ self._count_weights
+            # at least one card remains, once the last card of a shoe is delt in the middle of a round
+            remaining_decks = np.maximum(self.cards_order.shape[1] - self.nb_cards_delt, 1) / 52
+            observations[:, 4:] = running_counts / remaining_decks[:, None]
+        self.masks[:] = masks
+        self.rewards[:] = self._rewards
+        np.greater(self._nb_rounds, 0, out=self.dones)
+        self.infos['nb_rounds'][:] = self._nb_rounds
+        self.infos['shuffled'][:] = self._shuffled
+        self._rewards.fill(0)
+        self._nb_rounds.fill(0)
+        self._shuffled.fill(False)
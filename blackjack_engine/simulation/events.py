@@ -0,0 +1,126 @@
+import json
+from abc import ABC, abstractmethod
+from collections import deque
+
+
+class BaseEventSink(ABC):
+    """
+
+    Receives the events of the rounds played by a simulation running with an event sink (see BlackjackSimulation.run).
+
+    Each event is a dict with at least the keys 'event' (its type) and 'round' (index of the round in the run):
+
+        * bet: 'player', 'bet'
+        * deal: 'player' ('dealer' for the dealer), 'cards' (only the visible card for the dealer)
+        * insurance: 'player', 'bet'
+        * even_money: 'player'
+        * peek: 'cards' (dealer's cards, only sent when the dealer's peek reveals a blackjack)
+        * action: 'player', 'hand' (index of the hand), 'cards', 'action'
+        * split: 'player', 'hands' (cards of each hand of the player)
+        * dealer_draw: 'card', 'cards'
+        * payout: 'player', 'hand', 'cards', 'dealer_cards', 'bet', 'gains'
+        * insurance_payout: 'player', 'bet', 'gains'
+        * shuffle
+
+    Cards are given by name ('A', '2', ..., 'K').
+
+    """
+    @abstractmethod
+    def emit(self, event):
+        pass
+
+    def close(self):
+        """ Releases the resources of the sink, called at the end of each run. """
+        pass
+
+
+class PrintSink(BaseEventSink):
+    """ Prints the events in a human-readable form (used by verbose runs). """
+    def emit(self, event):
+        print(format_event(event))
+
+
+class JSONLinesSink(BaseEventSink):
+    """
+
+    Writes each event as a line of JSON.
+
+    Parameters
+    ----------
+
+        path: str
+            Path of the file, events are appended to it.
+
+    """
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def emit(self, event):
+        if self._file is None:
+            self._file = open(self.path, 'a')
+        self._file.write(json.dumps(event) + '\n')
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class RingBufferSink(BaseEventSink):
+    """
+
+    Keeps the last events in memory.
+
+    Parameters
+    ----------
+
+        capacity: int
+            Maximum number of events kept, the oldest ones being dropped first.
+
+    """
+    def __init__(self, capacity=10000):
+        self.events = deque(maxlen=capacity)
+
+    def emit(self, event):
+        self.events.append(event)
+
+    def clear(self):
+        self.events.clear()
+
+    def __iter__(self):
+        return iter(self.events)
+
+    def __len__(self):
+        return len(self.events)
+
+
+def format_event(event):
+    """ Human-readable description of an event. """
+    kind = event['event']
+    if kind == 'bet':
+        return f"[round {event['round']}] {event['player']} bets {event['bet']}"
+    elif kind == 'deal':
+        if event['player'] == 'dealer':
+            return f"[round {event['round']}] Dealer's hand: [{event['cards'][0]}] + one card face down"
+        return f"[round {event['round']}] {event['player']}'s hand: {event['cards']}"
+    elif kind == 'insurance':
+        return f"  {event['player']} takes insurance ({event['bet']})"
+    elif kind == 'even_money':
+        return f"  {event['player']} takes even money"
+    elif kind == 'peek':
+        return f"  Dealer peeks and has a blackjack: {event['cards']}"
+    elif kind == 'action':
+        return f"  {event['player']} (hand n°{event['hand'] + 1}: {event['cards']}) -> {event['action']}"
+    elif kind == 'split':
+        return f"  {event['player']} splits: {event['hands']}"
+    elif kind == 'dealer_draw':
+        return f"  Dealer draws {event['card']}: {event['cards']}"
+    elif kind == 'payout':
+        return (f"  {event['player']} (bet={event['bet']}) {event['cards']} vs dealer's {event['dealer_cards']} -> "
+                f"gains={event['gains']}")
+    elif kind == 'insurance_payout':
+        return f"  {event['player']} (insurance={event['bet']}) -> gains={event['gains']}"
+    elif kind == 'shuffle':
+        return "Reshuffling the shoe."
+    return str(event)
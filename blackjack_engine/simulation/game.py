@@ -1,12 +1,33 @@
 
-from tqdm import trange
+import copy
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+
+import numpy as np
 
 from blackjack_engine.strategy import BasePlayingStrategy
 from blackjack_engine.strategy import BaseBettingStrategy
+from blackjack_engine.strategy.actions import HIT, DOUBLE, SPLIT, SURRENDER, NO_ACTION, actions_names, \
+    action_codes, bitmasks_actions
 
 from blackjack_engine.simulation.shoe import Shoe
-from blackjack_engine.simulation.rules import BlackJackRules
+from blackjack_engine.simulation.streams import StreamShoe
+from blackjack_engine.simulation.rules import BlackJackRules, SURRENDERED, EVEN_MONEY
 from blackjack_engine.simulation.hand import Hand
+from blackjack_engine.simulation.history import PlayerHistory
+from blackjack_engine.simulation.stats import PlayerStatistics
+from blackjack_engine.simulation.events import PrintSink
+from blackjack_engine.simulation.profiling import PhaseProfiler
+from blackjack_engine.simulation.checkpoint import CheckpointWriter, load_checkpoint
+from blackjack_engine.simulation.telemetry import Telemetry, TqdmReporter
+
+
+# attributes of a simulation saved in its checkpoints, in addition to the players' history (the others are rebuilt, or
+# only hold the state of a round)
+checkpoint_attributes = ['rng', 'shoe', 'players', 'players_statistics', 'history_columns', 'aggregate',
+                         'nb_rounds_played', '_history_statistics']
 
 
 class Player:
@@ -34,12 +55,30 @@ class Player:
         self.playing_strategy = playing_strategy
         self.hands = []
 
-    def declare_bet(self, cards_delt, remaining_cards):
-        return self.betting_strategy.declare_bet(cards_delt, remaining_cards)
+    def declare_bet(self, cards_delt, remaining_cards, **counts):
+        return self.betting_strategy.declare_bet(cards_delt, remaining_cards, **counts)
+
+    def declare_action(self, hand_idx, dealer_card, remaining_cards, available_actions, **counts):
+        player_hand = self.hands[hand_idx]
+        return self.playing_strategy.declare_action(player_hand, dealer_card, remaining_cards, available_actions,
+                                                    **counts)
+
+    def declare_insurance(self, remaining_cards, **counts):
+        return self.playing_strategy.declare_insurance(self.hands[0], remaining_cards, **counts)
 
-    def declare_action(self, hand_idx, dealer_card, remaining_cards, available_actions):
+    def declare_action_code(self, hand_idx, dealer_card, remaining_cards, available_mask, **counts):
+        """ Same as declare_action, with the available actions as a bitmask, returning the code of the action. """
         player_hand = self.hands[hand_idx]
-        return self.playing_strategy.declare_action(player_hand, dealer_card, remaining_cards, available_actions)
+        playing_strategy = self.playing_strategy
+        if playing_strategy.uses_action_codes:
+            return playing_strategy.declare_action_code(player_hand, dealer_card, remaining_cards, available_mask,
+                                                        **counts)
+        # actions names are only built for the strategies which use them
+        available_actions = bitmasks_actions[available_mask]
+        action = playing_strategy.declare_action(player_hand, dealer_card, remaining_cards, available_actions,
+                                                 **counts)
+        assert action in available_actions
+        return action_codes[action]
 
 
 class BlackjackSimulation:
@@ -60,8 +99,20 @@ class BlackjackSimulation:
         game_rules: BlackJackRules
             Defines the rules of the game.
 
-        players_history: list of dict
-            Bets and earnings history of each player
+        players_history: dict<str, PlayerHistory>
+            Bets and earnings history of each player, stored in preallocated numpy arrays.
+
+        players_statistics: dict<str, PlayerStatistics>
+            Online statistics of each player, updated instead of the history when running in aggregate mode.
+
+        nb_rounds_played: int
+            Number of rounds played during the last run (fewer than requested if it reached its precision).
+
+        profiler: PhaseProfiler or None
+            Time spent in each phase of the rounds during the last run, if it was profiled.
+
+        rng: numpy.random.Generator
+            Random generator of the simulation.
 
     Parameters
     ----------
@@ -82,135 +133,768 @@ class BlackjackSimulation:
         hit_soft_17: bool
             If True, the dealer hits when holding a soft 17.
 
+        blackjack_payout: float
+            Gains of a blackjack for a unit bet: 1.5 for 3:2 tables, 1.2 for 6:5 tables.
+
+        surrender, dealer_peek, insurance, resplit_aces, double_on:
+            Optional rules, see BlackJackRules. By default, there is no surrender, no insurance, no hole card and
+            any two cards can be doubled.
+
+        seed: int, numpy.random.SeedSequence, numpy.random.Generator or None
+            Seed of the random generator shuffling the shoe (or the generator itself). Parallel runs spawn the
+            generators of their workers from it.
+
+        history_columns: list of str
+            Columns recorded in the players' history in addition to bets and gains, among 'true_count' (hi-low true
+            count when the bet is declared), 'nb_hands' (number of hands after splits) and 'doubled'.
+
+        shoe: Shoe or None
+            Shoe to play with, e.g. a StreamShoe dealing pregenerated shoes, instead of a new shoe of nb_decks decks
+            shuffled by the simulation's generator.
+
     """
-    def __init__(self, nb_decks=4, penetration=0.75, max_hands=3, double_after_split=True, hit_soft_17=True):
-        self.game_rules = BlackJackRules(max_hands, double_after_split, hit_soft_17)
-        self.shoe = Shoe(nb_decks=nb_decks, penetration=penetration)
+    def __init__(self, nb_decks=4, penetration=0.75, max_hands=3, double_after_split=True, hit_soft_17=True,
+                 blackjack_payout=1.5, surrender='none', dealer_peek=False, insurance=False, resplit_aces=False,
+                 double_on='any', seed=None, history_columns=(), shoe=None):
+        self.game_rules = BlackJackRules(max_hands, double_after_split, hit_soft_17, blackjack_payout,
+                                         surrender=surrender, dealer_peek=dealer_peek, insurance=insurance,
+                                         resplit_aces=resplit_aces, double_on=double_on)
+        self.rng = np.random.default_rng(seed)
+        self.shoe = shoe if shoe is not None else Shoe(nb_decks=nb_decks, penetration=penetration, seed=self.rng)
         self.dealer_hand = Hand([])
         self.players = {}
         self.players_history = {}
-        self.verbose = False
+        self.players_statistics = {}
+        self.history_columns = list(history_columns)
+        self.aggregate = False
+        self.event_sink = None
+        self.profiler = None
+        self.nb_rounds_played = 0
+        self._initial_state = None
+        self._run_parameters = None
+        self._resume_state = None
+        self._history_statistics = {}
+        self._insurance_bets = {}
+        self._group_seats()
 
     def register_player(self, name, betting_strategy, playing_strategy):
-        """ Adds a new player to the table. """
+        """
+
+        Adds a new player to the table.
+
+        Seats registered with the same strategy object share its calls: if the strategy overrides 'declare_bets'
+        (or is a table-driven playing strategy without counting system overriding 'declare_actions'), the bets (or
+        the first actions) of all these seats are declared with a single call per round.
+
+        """
         player = Player(betting_strategy, playing_strategy)
+        for strategy in [betting_strategy, playing_strategy]:
+            if strategy.counting_system is not None:
+                self.shoe.add_counting_system(strategy.counting_system)
         self.players[name] = player
-        self.players_history[name] = {'bets': [], 'gains': []}
+        self.players_history[name] = PlayerHistory(self.history_columns)
+        self.players_statistics[name] = PlayerStatistics()
+        self._group_seats()
+
+    def _group_seats(self):
+        """ Groups the seats sharing a strategy with a batched method, and lists the seats played one by one. """
+        betting_groups, playing_groups = {}, {}
+        for name, player in self.players.items():
+            betting_strategy, playing_strategy = player.betting_strategy, player.playing_strategy
+            if _overrides(betting_strategy, 'declare_bets', BaseBettingStrategy):
+                betting_groups.setdefault(id(betting_strategy), (betting_strategy, []))[1].append(name)
+            # the first actions of the seats are declared before any of them plays, which only gives the same
+            # actions if they do not depend on the cards drawn by the previous seats
+            if playing_strategy.table_driven and playing_strategy.counting_system is None and \
+                    _overrides(playing_strategy, 'declare_actions', BasePlayingStrategy):
+                playing_groups.setdefault(id(playing_strategy), (playing_strategy, []))[1].append(name)
+        self._betting_batches = [group for group in betting_groups.values() if len(group[1]) > 1]
+        self._playing_batches = [group for group in playing_groups.values() if len(group[1]) > 1]
+        batched_bets = {name for _, names in self._betting_batches for name in names}
+        self._single_bettors = [(name, player) for name, player in self.players.items() if name not in batched_bets]
+
+    def run(self, nb_rounds, verbose=False, nb_workers=1, aggregate=False, precision=None, confidence=0.95,
+            check_every=10000, event_sink=None, profile=False, checkpoint=None, checkpoint_every=100000,
+            telemetry=None):
+        """
+
+        Runs the simulation for a specified number of hands.
+
+        Parameters
+        ----------
+
+            nb_rounds: int
+                Number of rounds to play (maximum number of rounds if a precision is given).
+
+            verbose: bool
+                If True, prints the details of each round (same as event_sink=PrintSink()).
+
+            nb_workers: int or None
+                Number of processes the rounds are split across (all CPU cores if None). Each worker plays with its
+                own copy of the players, and a shoe and strategies seeded from a spawn of the simulation's generator:
+                results are reproducible for a given seed and number of workers. Strategies must be picklable.
+
+            aggregate: bool
+                If True, no round is stored in the players' history: only online statistics (EV, variance,
+                win / loss / push / blackjack / bust counts, ...) are accumulated, in constant memory.
+
+            precision: float or None
+                If given, the run stops early once the confidence interval of every player's EV (for a unit bet) is
+                narrower than +/- precision, e.g. 0.0005 for +/- 0.05%. The number of rounds actually played is
+                stored in 'nb_rounds_played'.
+
+            confidence: float
+                Confidence level of the intervals checked against the precision.
+
+            check_every: int
+                Number of rounds between two checks of the precision (per worker in parallel runs).
+
+            event_sink: BaseEventSink or None
+                If given, the events of each round (bets, deals, actions, splits, dealer draws and payouts) are sent
+                to it, e.g. a JSONLinesSink or a RingBufferSink. Without a sink (and verbose=False), rounds are
+                played by methods which do not trace anything, so that tracing costs nothing when disabled.
+
+            profile: bool
+                If True, the wall time and number of calls of each phase of the rounds (betting round, deal, turn of
+                each player and calls to his strategies, dealer's turn, evaluation of the gains and shuffles) are
+                accumulated in 'profiler', and printed at the end of the run. Phases are only instrumented during
+                profiled runs.
+
+            checkpoint: str or None
+                If given, path of a file where the state of the run (shoe, random generators, strategies, history
+                or statistics so far) is saved every checkpoint_every rounds, and at the end of the run. Checkpoints
+                are written by a background thread while the next rounds are played. An interrupted run is continued
+                with 'from_checkpoint' and 'resume', with the same results as if it had not been interrupted. Only
+                runs on a single worker, without events nor profiling, can be checkpointed.
 
-    def run(self, nb_rounds, verbose=False):
-        """ Runs the simulation for a specified number of hands. """
-        self.verbose = verbose
+            checkpoint_every: int
+                Number of rounds between two checkpoints.
+
+            telemetry: Telemetry or None
+                Receives the progress of the run (rounds per second, cards delt, shuffles, running EV of each player
+                and ETA) every telemetry.every rounds, e.g. to write a JSON status file or serve it over HTTP. By
+                default, a progress bar is displayed (unless verbose). Rounds are played by chunks between two
+                updates, so the round loop pays nothing for the progress.
+
+        Returns
+        -------
+
+            players_history: dict<str, PlayerHistory>
+                History of each player, or their PlayerStatistics in aggregate mode.
+
+        """
+        if nb_workers is None:
+            nb_workers = os.cpu_count()
+        self.aggregate = aggregate
+        self._history_statistics = {name: PlayerStatistics() for name in self.players}
+        if verbose and event_sink is None:
+            event_sink = PrintSink()
+        if checkpoint is not None and (nb_workers > 1 or event_sink is not None or profile):
+            raise ValueError("Only runs on a single worker, without events nor profiling, can be checkpointed.")
+        if checkpoint is not None and isinstance(self.shoe, StreamShoe) and self.shoe.path is None:
+            raise ValueError("Checkpoints only save the position in a stream, whose shoe must read a stream file.")
+        if nb_workers > 1:
+            if event_sink is not None or profile:
+                raise ValueError("Events can only be traced and profiled when running on a single worker.")
+            if type(self.shoe) is not Shoe:
+                raise ValueError("Parallel runs deal new shoes in each worker, and cannot use a custom shoe.")
+            return self.run_parallel(nb_rounds, nb_workers, precision, confidence, check_every, telemetry)
+        if not aggregate:
+            for history in self.players_history.values():
+                history.reserve(nb_rounds)
         self.shoe.shuffle()
-        _range = range if verbose else trange
-        for _ in _range(nb_rounds):
-            self.play_round()
-        return self.players_history
+        self._initial_state = copy.deepcopy((self.shoe, self.players))
+        self.nb_rounds_played = 0
+        self._run_parameters = {'nb_rounds': nb_rounds, 'precision': precision, 'confidence': confidence,
+                                'check_every': check_every, 'checkpoint': checkpoint,
+                                'checkpoint_every': checkpoint_every}
+        return self._play_rounds(verbose, event_sink, profile, telemetry)
+
+    def _play_rounds(self, verbose=False, event_sink=None, profile=False, telemetry=None):
+        """ Plays the rounds of the current run, from nb_rounds_played on (see run). """
+        parameters = self._run_parameters
+        nb_rounds, precision, confidence = parameters['nb_rounds'], parameters['precision'], parameters['confidence']
+        check_every, checkpoint_every = parameters['check_every'], parameters['checkpoint_every']
+        checkpoint = parameters['checkpoint']
+        writer = CheckpointWriter(checkpoint) if checkpoint is not None else None
+        # the fast path is chosen once for the whole run
+        self.event_sink = event_sink
+        play_round = self.play_round if event_sink is None else self.play_traced_round
+        self.profiler = PhaseProfiler() if profile else None
+        if profile:
+            self._instrument_phases()
+        if telemetry is None:
+            telemetry = Telemetry([] if verbose else [TqdmReporter()])
+        telemetry.start(self, nb_rounds)
+        # rounds are played by chunks, up to the next precision check, checkpoint or telemetry update
+        periods = [telemetry.every] + ([check_every] if precision is not None else []) + \
+                  ([checkpoint_every] if writer is not None else [])
+        try:
+            while self.nb_rounds_played < nb_rounds:
+                chunk_end = min(nb_rounds, *[(self.nb_rounds_played // period + 1) * period for period in periods])
+                for _ in range(chunk_end - self.nb_rounds_played):
+                    play_round()
+                    self.nb_rounds_played += 1
+                if precision is not None and chunk_end % check_every == 0:
+                    if self.precision_reached(precision, confidence):
+                        break
+                if writer is not None and chunk_end % checkpoint_every == 0:
+                    writer.write(self.checkpoint())
+                if chunk_end % telemetry.every == 0 and chunk_end < nb_rounds:
+                    telemetry.update(self)
+            if writer is not None:
+                writer.write(self.checkpoint(finished=True))
+            telemetry.update(self, finished=True)
+        finally:
+            telemetry.close()
+            self.event_sink = None
+            if event_sink is not None:
+                event_sink.close()
+            if profile:
+                self._remove_instrumentation()
+            if writer is not None:
+                writer.close()
+        if profile:
+            print(self.profiler)
+        return self.players_statistics if self.aggregate else self.players_history
+
+    def checkpoint(self, finished=False):
+        """
+
+        State of the current run between two rounds, as written to its checkpoint file.
+
+        The state is copied, except the history already recorded which is shared with the simulation (see
+        PlayerHistory.snapshot), so that it can be written while the run goes on.
+
+        """
+        state = copy.deepcopy({attribute: getattr(self, attribute) for attribute in checkpoint_attributes})
+        state['players_history'] = {name: history.snapshot() for name, history in self.players_history.items()}
+        # the rules and the initial state are never modified during the run
+        state['game_rules'], state['_initial_state'] = self.game_rules, self._initial_state
+        # strategies relying on the global random generators are resumed exactly as well
+        global_random_state = (random.getstate(), np.random.get_state())
+        return {'simulation': state, 'run_parameters': self._run_parameters, 'finished': finished,
+                'global_random_state': global_random_state}
+
+    @classmethod
+    def from_checkpoint(cls, path):
+        """
+
+        Simulation in the state saved in a checkpoint file by 'run', to be continued with 'resume'.
+
+        """
+        checkpoint = load_checkpoint(path)
+        simulation = cls()
+        simulation.__dict__.update(checkpoint['simulation'])
+        simulation._group_seats()
+        simulation._run_parameters = checkpoint['run_parameters']
+        simulation._resume_state = (checkpoint['finished'], checkpoint['global_random_state'])
+        return simulation
+
+    def resume(self, telemetry=None):
+        """
+
+        Plays the remaining rounds of a run loaded with 'from_checkpoint', with the same parameters, and keeps
+        writing its checkpoints to the same file. Its progress is sent to telemetry, see run.
+
+        Returns
+        -------
+
+            players_history: dict<str, PlayerHistory>
+                History of each player over the whole run, or their PlayerStatistics in aggregate mode.
+
+        """
+        assert self._resume_state is not None, "resume can only be called on a simulation loaded from_checkpoint."
+        finished, global_random_state = self._resume_state
+        self._resume_state = None
+        if not finished:
+            random.setstate(global_random_state[0])
+            np.random.set_state(global_random_state[1])
+            if not self.aggregate:
+                for history in self.players_history.values():
+                    history.reserve(self._run_parameters['nb_rounds'] - self.nb_rounds_played)
+            self._play_rounds(telemetry=telemetry)
+        return self.players_statistics if self.aggregate else self.players_history
+
+    def _instrument_phases(self):
+        """ Replaces the phases' methods by timed wrappers, until _remove_instrumentation is called. """
+        profiler = self.profiler
+        for method, phase in [('betting_round', 'betting_round'), ('deal_cards', 'deal_cards'),
+                              ('check_hole_card', 'check_hole_card'), ('dealer_turn', 'dealer_turn'),
+                              ('traced_dealer_turn', 'dealer_turn'), ('evaluate_gains', 'evaluate_gains')]:
+            setattr(self, method, profiler.wrap(phase, getattr(self, method)))
+        for method in ['player_turn', 'traced_player_turn']:
+            setattr(self, method, profiler.wrap(lambda name, *args: f"player_turn/{name}", getattr(self, method)))
+        self.shoe.shuffle = profiler.wrap('shoe.shuffle', self.shoe.shuffle)
+        for name, player in self.players.items():
+            player.declare_bet = profiler.wrap(f"declare_bet/{name}", player.declare_bet)
+            player.declare_action_code = profiler.wrap(f"declare_action/{name}", player.declare_action_code)
+        profiler.start()
+
+    def _remove_instrumentation(self):
+        self.profiler.stop()
+        for method in ['betting_round', 'deal_cards', 'check_hole_card', 'dealer_turn', 'traced_dealer_turn',
+                       'evaluate_gains', 'player_turn', 'traced_player_turn']:
+            del self.__dict__[method]
+        del self.shoe.__dict__['shuffle']
+        for player in self.players.values():
+            del player.__dict__['declare_bet'], player.__dict__['declare_action_code']
+
+    def run_parallel(self, nb_rounds, nb_workers, precision=None, confidence=0.95, check_every=10000,
+                     telemetry=None):
+        """
+
+        Shards the rounds across a process pool, and merges each worker's results in a fixed order.
+
+        If a precision is given, the rounds are played by waves of check_every rounds per worker, and the run stops
+        after the first wave reaching the precision. The telemetry, if any, is updated after each wave.
+
+        """
+        wave_size = nb_rounds if precision is None else check_every * nb_workers
+        # only the rules, shoe and players are sent to the workers, not the history played so far
+        table = (self.game_rules, self.shoe, self.players, self.history_columns, self.aggregate)
+        self.nb_rounds_played = 0
+        if telemetry is None:
+            telemetry = Telemetry()
+        telemetry.start(self, nb_rounds, parallel=True)
+        with ProcessPoolExecutor(max_workers=nb_workers) as executor:
+            while self.nb_rounds_played < nb_rounds:
+                size = min(wave_size, nb_rounds - self.nb_rounds_played)
+                shards = [size // nb_workers + (i < size % nb_workers) for i in range(nb_workers)]
+                seeds = self.rng.spawn(nb_workers)
+                results = list(executor.map(_run_worker, [table] * nb_workers, shards, seeds))
+                for result in results:
+                    for name in self.players:
+                        if self.aggregate:
+                            self.players_statistics[name].merge(result[name])
+                        else:
+                            self.players_history[name].extend(result[name])
+                self.nb_rounds_played += size
+                if precision is not None and self.precision_reached(precision, confidence):
+                    break
+                if self.nb_rounds_played < nb_rounds:
+                    telemetry.update(self, parallel=True)
+        telemetry.update(self, finished=True, parallel=True)
+        telemetry.close()
+        return self.players_statistics if self.aggregate else self.players_history
+
+    def precision_reached(self, precision, confidence=0.95):
+        """ Whether the confidence interval of every player's EV is narrower than +/- precision. """
+        if self.aggregate:
+            statistics = self.players_statistics
+        else:
+            # the statistics of the history are updated with the rounds played since the last check
+            statistics = self._history_statistics
+            for name, history in self.players_history.items():
+                checked = statistics[name].nb_rounds
+                statistics[name].merge(PlayerStatistics.from_arrays(history['bets'][checked:],
+                                                                    history['gains'][checked:]))
+        z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        return all(z * player_statistics.ev_standard_error <= precision for player_statistics in statistics.values())
+
+    def replay_round(self, round_idx, verbose=True, event_sink=None):
+        """
+
+        Replays exactly the round n°round_idx of the last (non-parallel) run, without altering the simulation.
+
+        The shoe and the players (including the state of their random generators) are restored as they were at the
+        start of the run, and the previous rounds are played again silently. The events of the replayed round are
+        printed if verbose, or sent to event_sink if given.
+
+        Returns
+        -------
+
+            bets, gains: dict<str, float>
+                Amount bet and won by each player during the round.
+
+        """
+        assert self._initial_state is not None, "replay_round can only be called after run."
+        replay = copy.copy(self)
+        replay.shoe, replay.players = copy.deepcopy(self._initial_state)
+        replay._group_seats()
+        replay.players_history = {name: PlayerHistory(self.history_columns) for name in self.players}
+        replay.aggregate = False
+        for replay.nb_rounds_played in range(round_idx):
+            replay.play_round()
+        replay.nb_rounds_played = round_idx
+        replay.event_sink = event_sink if event_sink is not None else PrintSink() if verbose else None
+        if replay.event_sink is None:
+            replay.play_round()
+        else:
+            replay.play_traced_round()
+            replay.event_sink.close()
+        bets = {name: history['bets'][-1] for name, history in replay.players_history.items()}
+        gains = {name: history['gains'][-1] for name, history in replay.players_history.items()}
+        return bets, gains
 
     def play_round(self):
-        self.info("~~~~~~~  |  New Round  |  ~~~~~~~", newlines=3, tabs=2)
+        if self.start_round():
+            first_decisions = self.first_decisions() if self._playing_batches else {}
+            for name, player in self.players.items():
+                self.player_turn(name, player, first_decisions.get(name))
+            self.dealer_turn()
+        self.end_round()
+
+    def start_round(self):
+        """
+
+        First steps of a round, before the players' turns: bets, deal, and the dealer's check of his hole card.
+
+        Returns
+        -------
+
+            players_play: bool
+                False if a dealer's blackjack revealed by his peek ends the round before the players' turns.
+
+        """
+        bets = self.betting_round()
+        if self.history_columns:
+            self._round_bets, self._round_true_count = bets, self.hi_low_true_count()
+        self.deal_cards(bets)
+        return not (self.game_rules.hole_card_checks and self.check_hole_card())
+
+    def end_round(self):
+        """ Last steps of a round, after the dealer's turn: gains of the players, and shuffle if needed. """
+        self.evaluate_gains()
+        if self.shoe.needs_shuffling():
+            self.shoe.shuffle()
+
+    def play_traced_round(self):
+        """ Same as play_round, sending the events of the round to self.event_sink. """
+        emit, round_idx = self.event_sink.emit, self.nb_rounds_played
         bets = self.betting_round()
-        self.info("Players' bets:", newlines=1)
+        if self.history_columns:
+            self._round_bets, self._round_true_count = bets, self.hi_low_true_count()
         for name, bet in bets.items():
-            pass
-            self.info(name, ": ", bet, tabs=1)
+            emit({'event': 'bet', 'round': round_idx, 'player': name, 'bet': float(bet)})
         self.deal_cards(bets)
-        self.info(f"Dealer's hand: [{self.dealer_hand.cards[0]}] + one card face down", newlines=1)
         for name, player in self.players.items():
-            self.player_turn(name, player)
-        self.dealer_turn()
+            emit({'event': 'deal', 'round': round_idx, 'player': name, 'cards': _names(player.hands[0].cards)})
+        emit({'event': 'deal', 'round': round_idx, 'player': 'dealer', 'cards': [str(self.dealer_hand.cards[0])]})
+        if not (self.game_rules.hole_card_checks and self.traced_check_hole_card()):
+            for name, player in self.players.items():
+                self.traced_player_turn(name, player)
+            self.traced_dealer_turn()
         self.evaluate_gains()
+        for name, player in self.players.items():
+            for hand_idx, player_hand in enumerate(player.hands):
+                gains = player_hand.bet * self.game_rules.evaluate_hand(player_hand, self.dealer_hand)
+                emit({'event': 'payout', 'round': round_idx, 'player': name, 'hand': hand_idx,
+                      'cards': _names(player_hand.cards), 'dealer_cards': _names(self.dealer_hand.cards),
+                      'bet': float(player_hand.bet), 'gains': float(gains)})
+            if name in self._insurance_bets:
+                insurance_bet = self._insurance_bets[name]
+                emit({'event': 'insurance_payout', 'round': round_idx, 'player': name, 'bet': float(insurance_bet),
+                      'gains': float(insurance_bet * self.game_rules.evaluate_insurance(self.dealer_hand))})
         if self.shoe.needs_shuffling():
-            self.info('Reshuffling the shoe.', newlines=1)
+            emit({'event': 'shuffle', 'round': round_idx})
             self.shoe.shuffle()
 
     def betting_round(self):
-        bets = {}
-        for name, player in self.players.items():
-            bets[name] = player.declare_bet(self.shoe.delt_cards, self.shoe.remaining_cards)
+        if not self._betting_batches:
+            bets = {}
+        else:
+            # seats sharing a batched strategy bet with a single call, bets are kept in the order of the seats
+            bets = dict.fromkeys(self.players)
+            for betting_strategy, names in self._betting_batches:
+                bets.update(zip(names, self.declare_bets(betting_strategy, len(names)).tolist()))
+        for name, player in self._single_bettors:
+            counting_system = player.betting_strategy.counting_system
+            if counting_system is None:
+                bets[name] = player.declare_bet(self.shoe.delt_cards, self.shoe.remaining_cards)
+            else:
+                bets[name] = player.declare_bet(self.shoe.delt_cards, self.shoe.remaining_cards,
+                                                true_count=self.shoe.true_count(counting_system))
         return bets
 
+    def declare_bets(self, betting_strategy, nb_seats):
+        """ Bets of nb_seats seats sharing a betting strategy, declared with a single call. """
+        # every seat sees the same shoe: its counts are repeated once per seat (indexing is faster than broadcast_to)
+        seats = np.zeros(nb_seats, dtype=np.intp)
+        cards_delt = self.shoe.delt_cards.view(np.ndarray)[seats]
+        remaining_cards = self.shoe.remaining_cards.view(np.ndarray)[seats]
+        counting_system = betting_strategy.counting_system
+        if counting_system is None:
+            return betting_strategy.declare_bets(cards_delt, remaining_cards)
+        true_count = np.full(nb_seats, self.shoe.true_count(counting_system))
+        return betting_strategy.declare_bets(cards_delt, remaining_cards, true_count=true_count)
+
     def deal_cards(self, bets):
+        # same order as dealing the cards one by one: two cards for each player, then two for the dealer
+        cards = self.shoe.deal_cards(2 * len(self.players) + 2)
+        for i, (name, player) in enumerate(self.players.items()):
+            player.hands = [Hand(cards=cards[2 * i:2 * i + 2], bet=bets[name])]
+        self.dealer_hand = Hand(cards=cards[-2:])
+
+    def check_hole_card(self):
+        """
+
+        Offers insurance (or even money) when the dealer shows an Ace, and lets him peek at his hole card.
+
+        Returns
+        -------
+
+            revealed: bool
+                True if the dealer peeked and has a blackjack, which ends the round before the players' turns (only
+                early surrenders are still allowed).
+
+        """
+        rules = self.game_rules
+        self._insurance_bets = {}
+        if rules.insurance and int(self.dealer_hand.cards[0]) == 0:
+            self._insurance_bets = self.insurance_round()
+        if not (rules.dealer_peek and self.dealer_hand.is_blackjack):
+            return False
+        if rules.surrender == 'early':
+            self.early_surrenders()
+        return True
+
+    def traced_check_hole_card(self):
+        """ Same as check_hole_card, sending the insurances, even money, early surrenders and peek to the sink. """
+        emit, round_idx = self.event_sink.emit, self.nb_rounds_played
+        revealed = self.check_hole_card()
         for name, player in self.players.items():
-            player.hands = [
-                Hand(
-                    cards=[self.shoe.deal_card(), self.shoe.deal_card()],
-                    bet=bets[name])
-            ]
-        self.dealer_hand = Hand(cards=[self.shoe.deal_card(), self.shoe.deal_card()])
-
-    def player_turn(self, name, player):
-        self.info("--- Player's turn: ", name, " ---", newlines=1)
+            player_hand = player.hands[0]
+            if name in self._insurance_bets:
+                emit({'event': 'insurance', 'round': round_idx, 'player': name,
+                      'bet': float(self._insurance_bets[name])})
+            elif player_hand.final_state == EVEN_MONEY:
+                emit({'event': 'even_money', 'round': round_idx, 'player': name})
+            elif player_hand.final_state == SURRENDERED:
+                emit({'event': 'action', 'round': round_idx, 'player': name, 'hand': 0,
+                      'cards': _names(player_hand.cards), 'action': 'surrender'})
+        if revealed:
+            emit({'event': 'peek', 'round': round_idx, 'cards': _names(self.dealer_hand.cards)})
+        return revealed
+
+    def insurance_round(self):
+        """ Insurance decisions of the players, returns the insurance bet of each insured player. """
+        remaining_cards = self.shoe.remaining_cards
+        insurance_bets = {}
+        for name, player in self.players.items():
+            counting_system = player.playing_strategy.counting_system
+            if counting_system is None:
+                insured = player.declare_insurance(remaining_cards)
+            else:
+                insured = player.declare_insurance(remaining_cards, true_count=self.shoe.true_count(counting_system))
+            if insured:
+                player_hand = player.hands[0]
+                if player_hand.is_blackjack:
+                    # even money: the blackjack is paid 1:1 whatever the dealer's hand
+                    player_hand.final_state = EVEN_MONEY
+                else:
+                    insurance_bets[name] = player_hand.bet / 2
+        return insurance_bets
+
+    def early_surrenders(self):
+        """ First decisions of the players, before a dealer's blackjack is revealed: only surrenders are played. """
+        dealer_card = self.dealer_hand.visible_card
+        remaining_cards = self.shoe.remaining_cards
+        available_mask = self.game_rules.available_mask
+        for player in self.players.values():
+            player_hand = player.hands[0]
+            mask = available_mask(player_hand, NO_ACTION)
+            if not mask >> SURRENDER & 1 or player_hand.final_state is not None:
+                continue
+            counting_system = player.playing_strategy.counting_system
+            if counting_system is None:
+                action = player.declare_action_code(0, dealer_card, remaining_cards, mask)
+            else:
+                action = player.declare_action_code(0, dealer_card, remaining_cards, mask,
+                                                    true_count=self.shoe.true_count(counting_system))
+            if action == SURRENDER:
+                player_hand.final_state = SURRENDERED
+
+    def first_decisions(self):
+        """
+
+        First decisions of the seats sharing a batched playing strategy, declared with a single call per strategy.
+
+        Returns
+        -------
+
+            first_decisions: dict<str, tuple>
+                Available actions bitmask and declared action code of each of these seats whose first hand is not
+                over yet.
+
+        """
         dealer_card = self.dealer_hand.visible_card
         remaining_cards = self.shoe.remaining_cards
+        available_mask = self.game_rules.available_mask
+        first_decisions = {}
+        for playing_strategy, names in self._playing_batches:
+            seats, player_hands, masks = [], [], []
+            for name in names:
+                player_hand = self.players[name].hands[0]
+                mask = available_mask(player_hand)
+                if mask:
+                    seats.append(name)
+                    player_hands.append(player_hand)
+                    masks.append(mask)
+            actions = playing_strategy.declare_actions(player_hands, dealer_card, remaining_cards,
+                                                       [bitmasks_actions[mask] for mask in masks])
+            first_decisions.update(zip(seats, zip(masks, [action_codes[action] for action in actions])))
+        return first_decisions
+
+    def player_turn(self, name, player, first_decision=None):
+        """
+
+        Plays the hands of a player.
+
+        Parameters
+        ----------
+
+            first_decision: tuple or None
+                Available actions bitmask and action code already declared for the first decision of the player's
+                first hand (see first_decisions).
+
+        """
+        dealer_card = self.dealer_hand.visible_card
+        shoe = self.shoe
+        counting_system = player.playing_strategy.counting_system
+        available_mask = self.game_rules.available_mask
+        apply_action = self.apply_action
+        hand_idx = 0
+
+        while hand_idx < len(player.hands):
+
+            player_hand = player.hands[hand_idx]
+            if first_decision is None:
+                mask = available_mask(player_hand, NO_ACTION)
+            else:
+                mask = first_decision[0]
+
+            while mask:
+
+                if first_decision is not None:
+                    action, first_decision = first_decision[1], None
+                elif counting_system is None:
+                    # the remaining cards are read for each decision, as the hand's cards are delt during the turn
+                    action = player.declare_action_code(hand_idx, dealer_card, shoe.remaining_cards, mask)
+                else:
+                    action = player.declare_action_code(hand_idx, dealer_card, shoe.remaining_cards, mask,
+                                                        true_count=shoe.true_count(counting_system))
+                assert mask >> action & 1
+                player_hand = apply_action(player, hand_idx, action)
+                mask = available_mask(player_hand, action)
+            hand_idx += 1
+
+    def apply_action(self, player, hand_idx, action):
+        """
+
+        Plays an action on one of the hands of a player, whoever declared it (see player_turn).
+
+        Returns
+        -------
+
+            player_hand: Hand
+                Hand n°hand_idx after the action, on which the next available actions are evaluated (the first of the
+                two hands after a split).
+
+        """
+        player_hand = player.hands[hand_idx]
+        if action == HIT:
+            # hit -> add a card to the hand
+            player_hand.add_card(self.shoe.deal_card())
+        elif action == DOUBLE:
+            # double -> double bet amount & deal a card
+            player_hand.bet *= 2
+            player_hand.add_card(self.shoe.deal_card())
+        elif action == SPLIT:
+            # split -> create 2 new hands and deal one card for each.
+            card, bet, nb_hands = player_hand.cards[0], player_hand.bet, len(player.hands)
+            player_hand = Hand(cards=[card, self.shoe.deal_card()], bet=bet, nb_hands=nb_hands+1)
+            new_player_hand = Hand(cards=[card, self.shoe.deal_card()], bet=bet, nb_hands=nb_hands+1)
+            player.hands[hand_idx] = player_hand
+            player.hands.insert(hand_idx+1, new_player_hand)
+        elif action == SURRENDER:
+            # surrender -> the hand ends, and part of the bet is refunded
+            player_hand.final_state = SURRENDERED
+        return player_hand
+
+    def traced_player_turn(self, name, player):
+        """ Same as player_turn, sending the actions and splits to self.event_sink. """
+        emit, round_idx = self.event_sink.emit, self.nb_rounds_played
+        dealer_card = self.dealer_hand.visible_card
+        shoe = self.shoe
+        counting_system = player.playing_strategy.counting_system
+        available_mask = self.game_rules.available_mask
         hand_idx = 0
 
         while hand_idx < len(player.hands):
 
-            action = None
             player_hand = player.hands[hand_idx]
-            nb_hands = len(player.hands)
-            available_actions = self.game_rules.available_actions(player_hand, action)
-
-            self.info('Playing hand n°', hand_idx+1, ": ", player_hand, newlines=1)
-            self.info('Available actions: ', available_actions, newlines=1, tabs=1)
-
-            while available_actions:
-
-                action = player.declare_action(hand_idx, dealer_card, remaining_cards, available_actions)
-                self.info('Chosen action: ', action, tabs=1)
-                assert action in available_actions
-
-                if action == 'hit':
-                    # hit -> add a card to the hand
-                    player_hand.add_card(self.shoe.deal_card())
-
-                elif action == 'double':
-                    # double -> double bet amount & deal a card
-                    player_hand.bet *= 2
-                    player_hand.add_card(self.shoe.deal_card())
-
-                elif action == 'split':
-                    # split -> create 2 new hands and deal one card for each.
-                    card = player_hand.cards[0]
-                    bet = player_hand.bet
-                    player_hand = Hand(cards=[card, self.shoe.deal_card()], bet=bet, nb_hands=nb_hands+1)
-                    new_player_hand = Hand(cards=[card, self.shoe.deal_card()], bet=bet, nb_hands=nb_hands+1)
-                    player.hands[hand_idx] = player_hand
-                    player.hands.insert(hand_idx+1, new_player_hand)
-                    self.info("New hands: ", player.hands, tabs=1)
-
-                nb_hands = len(player.hands)
-                available_actions = self.game_rules.available_actions(player_hand, action)
-                if available_actions:
-                    self.info('Current hand: ', player_hand, tabs=1)
-                    self.info('Available actions: ', available_actions, newlines=1, tabs=1)
+            mask = available_mask(player_hand, NO_ACTION)
+
+            while mask:
+
+                if counting_system is None:
+                    action = player.declare_action_code(hand_idx, dealer_card, shoe.remaining_cards, mask)
                 else:
-                    self.info('Final hand: ', player_hand, tabs=1)
+                    action = player.declare_action_code(hand_idx, dealer_card, shoe.remaining_cards, mask,
+                                                        true_count=shoe.true_count(counting_system))
+                emit({'event': 'action', 'round': round_idx, 'player': name, 'hand': hand_idx,
+                      'cards': _names(player_hand.cards), 'action': actions_names[action]})
+                assert mask >> action & 1
+                player_hand = self.apply_action(player, hand_idx, action)
+                if action == SPLIT:
+                    emit({'event': 'split', 'round': round_idx, 'player': name,
+                          'hands': [_names(hand.cards) for hand in player.hands]})
+                mask = available_mask(player_hand, action)
             hand_idx += 1
 
     def dealer_turn(self):
-        self.info("--- Dealer's turn ---", newlines=1)
-        self.info("Returning face down card: ", self.dealer_hand, newlines=1, tabs=1)
-        action = None
-        while action != 'stand':
-            action = self.game_rules.dealer_action(self.dealer_hand)
-            self.info('Chosen Action: ', action, newlines=1, tabs=1)
-            if action == 'hit':
-                self.dealer_hand.add_card(self.shoe.deal_card())
-                self.info('Current hand: ', self.dealer_hand, tabs=1)
-            else:
-                self.info('Final hand: ', self.dealer_hand, tabs=1)
+        while self.game_rules.dealer_action(self.dealer_hand) == 'hit':
+            self.dealer_hand.add_card(self.shoe.deal_card())
 
-    def evaluate_gains(self):
-        self.info("--- Evaluation phase ---", newlines=1)
-        for name, player in self.players.items():
-            self.info('Player: ', name, newlines=1, tabs=1)
-            bet, gains = self.evaluate_hands(player.hands)
-            self.players_history[name]["bets"].append(bet)
-            self.players_history[name]["gains"].append(gains)
-            self.info('Total gains of ', name,  ": ", gains, tabs=1)
+    def traced_dealer_turn(self):
+        """ Same as dealer_turn, sending the dealer's draws to self.event_sink. """
+        while self.game_rules.dealer_action(self.dealer_hand) == 'hit':
+            card = self.shoe.deal_card()
+            self.dealer_hand.add_card(card)
+            self.event_sink.emit({'event': 'dealer_draw', 'round': self.nb_rounds_played, 'card': str(card),
+                                  'cards': _names(self.dealer_hand.cards)})
 
-    def evaluate_hands(self, player_hands):
+    def evaluate_gains(self):
+        # all the hands of the round are settled at once against the dealer's hand
+        players_results = self.game_rules.settle([player.hands for player in self.players.values()],
+                                                 self.dealer_hand)
+        insurance_bets = self._insurance_bets
+        for (name, player), results in zip(self.players.items(), players_results):
+            hands = player.hands
+            if len(hands) == 1:
+                # same as evaluate_hands, for the usual single hand
+                bet = hands[0].bet
+                gains = bet * results[0]
+            else:
+                bet, gains = self.evaluate_hands(hands, results)
+            if insurance_bets and name in insurance_bets:
+                # the insurance bet is added to the bets of the round
+                insurance_bet = insurance_bets[name]
+                bet += insurance_bet
+                gains += insurance_bet * self.game_rules.evaluate_insurance(self.dealer_hand)
+            if self.aggregate:
+                self.players_statistics[name].append(bet, gains, hands, results)
+            elif self.history_columns:
+                self.players_history[name].append(bet, gains, **self.extra_columns(name, player))
+            else:
+                self.players_history[name].append(bet, gains)
+
+    def extra_columns(self, name, player):
+        """ Values of the extra history columns of a player, for the current round. """
+        values = {'true_count': self._round_true_count,
+                  'nb_hands': len(player.hands),
+                  'doubled': any(hand.bet != self._round_bets[name] for hand in player.hands)}
+        return {column: values[column] for column in self.history_columns}
+
+    def hi_low_true_count(self):
+        """ Hi-low running count of the shoe, divided by the number of remaining decks. """
+        if 'hi-lo' not in self.shoe.counting_systems:
+            # only tracked once needed, so that the shoe counts nothing when no strategy or history reads a count
+            self.shoe.add_counting_system('hi-lo')
+        return self.shoe.true_count('hi-lo')
+
+    def evaluate_hands(self, player_hands, results=None):
         """
 
         Compute the total gains for all hands hold by one player.
@@ -221,18 +905,54 @@ class BlackjackSimulation:
             player_hands: list of Hand
                 cards hold by the player.
 
+            results: list of float or None
+                Gains of each hand for a unit bet, as returned by BlackJackRules.settle. Evaluated if None.
+
         """
+        if results is None:
+            results = self.game_rules.settle([player_hands], self.dealer_hand)[0]
         player_gains, player_bet = 0, 0
-        for player_hand in player_hands:
-            gains = player_hand.bet * self.game_rules.evaluate_hand(player_hand, self.dealer_hand)
+        for player_hand, result in zip(player_hands, results):
+            gains = player_hand.bet * result
             player_bet += player_hand.bet
             player_gains += gains
-            self.info("(bet=", player_hand.bet, ") ", player_hand, " vs dealer's ",
-                      self.dealer_hand, " -> gains=", gains, tabs=2)
         return player_bet, player_gains
 
-    def info(self, *messages, newlines=0, tabs=0):
-        if self.verbose:
-            # the message is reconstructed here to avoid string operations when self.verbose=False
-            message = ''.join([str(m) for m in messages])
-            print(newlines * '\n' + tabs * '  ' + message)
+
+def _names(cards):
+    return [str(card) for card in cards]
+
+
+def _overrides(strategy, method, base_class):
+    """ Whether a strategy implements its own version of a method of its base class. """
+    return getattr(type(strategy), method) is not getattr(base_class, method)
+
+
+def _run_worker(table, nb_rounds, rng):
+    """ Plays nb_rounds on a new table with the same rules and players, seeded from the given generator. """
+    rules, shoe, players, history_columns, aggregate = table
+    worker = BlackjackSimulation(shoe.nb_decks, shoe.penetration, seed=rng, history_columns=history_columns)
+    worker.game_rules = rules
+    reseed_players(players, rng)
+    for name, player in players.items():
+        worker.register_player(name, player.betting_strategy, player.playing_strategy)
+    worker.aggregate = aggregate
+    if not aggregate:
+        for history in worker.players_history.values():
+            history.reserve(nb_rounds)
+    worker.shoe.shuffle()
+    for _ in range(nb_rounds):
+        worker.play_round()
+    return worker.players_statistics if aggregate else worker.players_history
+
+
+def reseed_players(players, rng):
+    """ Re-seeds the strategies of the players, and the global random generators, from a spawn of rng. """
+    betting_rng, playing_rng, global_rng = rng.spawn(3)
+    for player in players.values():
+        player.betting_strategy.reseed(betting_rng.spawn(1)[0])
+        player.playing_strategy.reseed(playing_rng.spawn(1)[0])
+    # strategies relying on the global random generators are made reproducible as well
+    state = global_rng.integers(2 ** 32, size=4)
+    random.seed(int(state[0]))
+    np.random.seed(state)
@@ -1,6 +1,5 @@
-
-card_values = {'A': 11, '2': 2, '3': 3, '4': 4, '5': 5, '6': 6, '7': 7,
-               '8': 8, '9': 9, '10': 10, 'J': 10, 'Q': 10, 'K': 10}
+# card_values is still importable from this module, for compatibility
+from blackjack_engine.simulation.cards import Card, hard_values, card_values, to_card  # noqa: F401
 
 
 class Hand:
@@ -8,10 +7,13 @@ class Hand:
 
     This class represents a set of cards hold by the player or the dealer.
 
+    The value of the hand is updated in constant time when a card is added, from a running total (Aces counted as 1)
+    and a number of Aces.
+
     Attributes
     ----------
 
-        cards: list of string
+        cards: list of Card
             Set of cards hold by the player / dealer.
 
         nb_hands: int
@@ -27,24 +29,37 @@ class Hand:
         bet: float
             Amount of money bet on the hand (None if it is a dealer's hand)
 
+        final_state: int or None
+            Final state of a hand ended by the player without playing it out (surrendered, or paid even money), see
+            rules.hand_state. None if the hand is settled on its cards.
+
     """
+    __slots__ = ('cards', 'nb_hands', 'value', 'is_soft', 'bet', 'final_state', '_total', '_nb_aces')
+
     def __init__(self, cards, bet=None, nb_hands=1):
-        self.cards = cards
+        self.cards = [card if type(card) is Card else to_card(card) for card in cards]
         self.nb_hands = nb_hands
         self.value, self.is_soft = self.compute_value()
         self.bet = bet
+        self.final_state = None
 
     def add_card(self, card):
+        if type(card) is not Card:
+            card = to_card(card)
         self.cards.append(card)
-        self.value, self.is_soft = self.compute_value()
+        card_value = hard_values[card]
+        self._total += card_value
+        if card_value == 1:
+            self._nb_aces += 1
+        self.is_soft = self._nb_aces > 0 and self._total <= 11
+        self.value = self._total + 10 if self.is_soft else self._total
 
     def compute_value(self):
-        value = sum([card_values[card] for card in self.cards])
-        soft_aces = self.cards.count('A')
-        while value > 21 and soft_aces > 0:
-            value -= 10
-            soft_aces -= 1
-        is_soft = soft_aces > 0
+        values = [hard_values[card] for card in self.cards]
+        self._total = sum(values)
+        self._nb_aces = values.count(1)
+        is_soft = self._nb_aces > 0 and self._total <= 11
+        value = self._total + 10 if is_soft else self._total
         return value, is_soft
 
     @property
@@ -65,5 +80,5 @@ class Hand:
         return self.cards[0]
 
     def __repr__(self):
-        string = f"[{', '.join(self.cards)}]"
+        string = f"[{', '.join([str(card) for card in self.cards])}]"
         return string
@@ -0,0 +1,124 @@
+import numpy as np
+
+
+# type of each column which can be recorded in a player's history
+columns_dtypes = {
+    'bets': np.float64,         # total amount bet during the round
+    'gains': np.float64,        # total gains of the round (negative in case of a loss)
+    'true_count': np.float64,   # hi-low true count of the shoe when the bet was declared
+    'nb_hands': np.int8,        # number of hands played, after splits
+    'doubled': np.bool_,        # whether at least one hand was doubled down
+}
+
+
+class PlayerHistory:
+    """
+
+    Round by round history of one player, stored column by column in typed numpy arrays.
+
+    The arrays are preallocated (see 'reserve') and grown by chunks when full, instead of appending boxed Python
+    floats to lists. Reading a column returns a view on the rounds played so far.
+
+    Parameters
+    ----------
+
+        extra_columns: list of str
+            Columns recorded in addition to 'bets' and 'gains', among 'true_count', 'nb_hands' and 'doubled'.
+
+        capacity: int
+            Number of rounds preallocated.
+
+    Attributes
+    ----------
+
+        columns: list of str
+            Recorded columns.
+
+        nb_rounds: int
+            Number of rounds recorded.
+
+    """
+    chunk_size = 2 ** 16
+
+    def __init__(self, extra_columns=(), capacity=0):
+        for column in extra_columns:
+            if column not in columns_dtypes:
+                raise ValueError(f"Unknown history column '{column}', expected one of {list(columns_dtypes)}.")
+        self.columns = ['bets', 'gains'] + [column for column in extra_columns if column not in ['bets', 'gains']]
+        self.extra_columns = self.columns[2:]
+        self._arrays = {column: np.zeros(capacity, dtype=columns_dtypes[column]) for column in self.columns}
+        self._bets, self._gains = self._arrays['bets'], self._arrays['gains']
+        self.nb_rounds = 0
+
+    @property
+    def capacity(self):
+        return len(self._bets)
+
+    def reserve(self, nb_rounds):
+        """ Makes sure that nb_rounds more rounds can be recorded without growing the arrays. """
+        capacity = self.nb_rounds + nb_rounds
+        if capacity > self.capacity:
+            for column, array in self._arrays.items():
+                self._arrays[column] = np.zeros(capacity, dtype=array.dtype)
+                self._arrays[column][:self.nb_rounds] = array[:self.nb_rounds]
+            self._bets, self._gains = self._arrays['bets'], self._arrays['gains']
+
+    def append(self, bets, gains, **extra_values):
+        """ Records one round. """
+        if self.nb_rounds == self.capacity:
+            self.reserve(self.chunk_size)
+        self._bets[self.nb_rounds] = bets
+        self._gains[self.nb_rounds] = gains
+        for column, value in extra_values.items():
+            self._arrays[column][self.nb_rounds] = value
+        self.nb_rounds += 1
+
+    def extend(self, other):
+        """ Appends all the rounds recorded in another history with the same columns. """
+        assert other.columns == self.columns, "Histories must have the same columns."
+        self.reserve(other.nb_rounds)
+        for column in self.columns:
+            self._arrays[column][self.nb_rounds:self.nb_rounds + other.nb_rounds] = other[column]
+        self.nb_rounds += other.nb_rounds
+
+    def snapshot(self):
+        """
+
+        History of the rounds recorded so far, sharing their arrays instead of copying them: rounds recorded later
+        are written after them, and do not change the snapshot.
+
+        """
+        snapshot = PlayerHistory(self.extra_columns)
+        snapshot._arrays = {column: self[column] for column in self.columns}
+        snapshot._bets, snapshot._gains = snapshot._arrays['bets'], snapshot._arrays['gains']
+        snapshot.nb_rounds = self.nb_rounds
+        return snapshot
+
+    def to_records(self):
+        """ History as a numpy structured array, with one record per round. """
+        records = np.zeros(self.nb_rounds, dtype=[(column, columns_dtypes[column]) for column in self.columns])
+        for column in self.columns:
+            records[column] = self[column]
+        return records
+
+    def keys(self):
+        return list(self.columns)
+
+    def __getitem__(self, column):
+        return self._arrays[column][:self.nb_rounds]
+
+    def __len__(self):
+        return self.nb_rounds
+
+    def __getstate__(self):
+        # only the recorded rounds are pickled (e.g. when sent back by a parallel worker)
+        return {'columns': self.columns, 'arrays': {column: self[column] for column in self.columns}}
+
+    def __setstate__(self, state):
+        self.__init__(state['columns'][2:])
+        self._arrays = {column: np.array(array) for column, array in state['arrays'].items()}
+        self._bets, self._gains = self._arrays['bets'], self._arrays['gains']
+        self.nb_rounds = len(self._bets)
+
+    def __repr__(self):
+        return f"PlayerHistory(columns={self.columns}, nb_rounds={self.nb_rounds})"
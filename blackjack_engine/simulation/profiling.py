@@ -0,0 +1,81 @@
+from time import perf_counter
+
+
+class PhaseProfiler:
+    """
+
+    Accumulates the wall time and number of calls of the phases of a simulation's rounds.
+
+    Phases are timed by wrapping the corresponding methods (see 'wrap') for the duration of a profiled run only, so
+    that runs without profiling execute no timing code at all. Phases can be nested: the time of 'player_turn/Bob'
+    includes the time of 'declare_action/Bob', and the time of 'betting_round' includes the bets of every player.
+
+    Attributes
+    ----------
+
+        times: dict<str, float>
+            Total wall time spent in each phase, in seconds.
+
+        calls: dict<str, int>
+            Number of calls of each phase.
+
+        total_time: float
+            Wall time of the whole profiled run, in seconds.
+
+    """
+    def __init__(self):
+        self.times = {}
+        self.calls = {}
+        self.total_time = 0.
+        self._start = None
+
+    def wrap(self, phase, function):
+        """
+
+        Wraps a function so that its calls are timed.
+
+        Parameters
+        ----------
+
+            phase: str or callable
+                Name of the phase, or a function returning it from the arguments of the call.
+
+            function: callable
+                Function to time.
+
+        """
+        times, calls = self.times, self.calls
+
+        def timed(*args, **kwargs):
+            name = phase if isinstance(phase, str) else phase(*args, **kwargs)
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                times[name] = times.get(name, 0.) + perf_counter() - start
+                calls[name] = calls.get(name, 0) + 1
+
+        return timed
+
+    def start(self):
+        self._start = perf_counter()
+
+    def stop(self):
+        self.total_time += perf_counter() - self._start
+        self._start = None
+
+    def report(self):
+        """ Calls, total time, time per call and share of the total time of each phase, as a dict. """
+        return {phase: {'calls': self.calls[phase],
+                        'time': time,
+                        'time_per_call': time / self.calls[phase],
+                        'share': time / self.total_time if self.total_time else float('nan')}
+                for phase, time in self.times.items()}
+
+    def __str__(self):
+        lines = [f"{'phase':<32}{'calls':>12}{'time (s)':>12}{'per call (us)':>16}{'share':>9}"]
+        for phase, values in self.report().items():
+            lines.append(f"{phase:<32}{values['calls']:>12}{values['time']:>12.3f}"
+                         f"{values['time_per_call'] * 1e6:>16.2f}{values['share']:>9.1%}")
+        lines.append(f"{'total':<32}{'':>12}{self.total_time:>12.3f}")
+        return '\n'.join(lines)
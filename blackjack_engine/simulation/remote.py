@@ -0,0 +1,322 @@
+"""
+
+Playing strategies served by another process (e.g. a neural policy server), with decisions batched across tables.
+
+AsyncTables plays many tables at once as asyncio tasks. A table waiting for the decision of a RemotePolicy player is
+suspended, and as soon as every table is waiting, all their pending decisions are sent to the policy server in a
+single request over a Unix socket. Each table resumes when the answer arrives, so the throughput comes from the size
+of the batches rather than from the latency of a round trip.
+
+Wire protocol: a request is the number of decisions (uint32, little-endian) followed by the decisions as records of
+'decision_dtype', and the answer is one action code (int8) per decision.
+
+"""
+import asyncio
+import copy
+import os
+import tempfile
+import time
+from multiprocessing import Process
+
+import numpy as np
+
+from blackjack_engine.strategy import BasePlayingStrategy
+from blackjack_engine.strategy.actions import STAND, DOUBLE, NO_ACTION
+from blackjack_engine.strategy.tables import NO_PAIR
+
+from blackjack_engine.simulation.game import BlackjackSimulation
+from blackjack_engine.simulation.history import PlayerHistory
+
+
+# state of the player's hand and table in a decision request
+decision_dtype = np.dtype([
+    ('value', np.int8),             # value of the hand
+    ('soft', np.bool_),             # whether the hand is soft
+    ('pair', np.int8),              # rank of the paired cards, -1 if the hand is not a pair
+    ('nb_cards', np.int8),          # number of cards of the hand
+    ('nb_hands', np.int8),          # number of hands of the player, after splits
+    ('dealer_card', np.int8),       # rank of the dealer's visible card
+    ('available', np.int8),         # available actions bitmask
+    ('true_count', np.float32),     # true count of the player's counting system (0 if he has none)
+])
+
+
+class RemotePolicy(BasePlayingStrategy):
+    """
+
+    Playing strategy whose decisions are taken by a policy server (see serve_policy), only playable by AsyncTables.
+
+    Parameters
+    ----------
+
+        counting_system: str, CountingSystem or None
+            If given, the true count of this counting system is sent with each decision.
+
+    """
+    uses_action_codes = True
+
+    def __init__(self, counting_system=None):
+        self.counting_system = counting_system
+
+    def declare_action(self, player_hand, dealer_card, remaining_cards, available_actions, **counts):
+        raise TypeError("The decisions of a RemotePolicy are taken by a policy server, through AsyncTables.")
+
+    def declare_action_code(self, player_hand, dealer_card, remaining_cards, available_mask, **counts):
+        raise TypeError("The decisions of a RemotePolicy are taken by a policy server, through AsyncTables.")
+
+
+class TablePolicy:
+    """
+
+    Vectorized policy reading the decisions of a whole batch in a strategy table (see TableStrategy), with a single
+    gather. Actions which are not available fall back to 'stand'.
+
+    """
+    def __init__(self, table):
+        self.table = np.asarray(table, dtype=np.int8)
+
+    def __call__(self, decisions):
+        pair_idx = np.where(decisions['pair'] >= 0, decisions['pair'], NO_PAIR)
+        mask = decisions['available'] >> DOUBLE & 3
+        codes = self.table[pair_idx, decisions['soft'].astype(np.intp), decisions['value'], decisions['dealer_card'],
+                           mask]
+        return np.where(decisions['available'] >> codes & 1, codes, STAND)
+
+
+async def serve_policy(policy, path):
+    """
+
+    Serves a vectorized policy on a Unix socket, until cancelled.
+
+    Parameters
+    ----------
+
+        policy: callable
+            Takes an array of decisions (of dtype decision_dtype) and returns their actions codes.
+
+        path: str
+            Path of the Unix socket.
+
+    """
+    async def handle(reader, writer):
+        try:
+            while True:
+                nb_decisions = int.from_bytes(await reader.readexactly(4), 'little')
+                data = await reader.readexactly(nb_decisions * decision_dtype.itemsize)
+                codes = policy(np.frombuffer(data, dtype=decision_dtype))
+                writer.write(np.asarray(codes, dtype=np.int8).tobytes())
+                await writer.drain()
+        except asyncio.IncompleteReadError:
+            # the client closed the connection
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_unix_server(handle, path)
+    async with server:
+        await server.serve_forever()
+
+
+def run_policy_server(policy, path):
+    """ Runs serve_policy in a new event loop (e.g. in another process). """
+    asyncio.run(serve_policy(policy, path))
+
+
+class LocalPolicyServer:
+    """
+
+    Policy server running in a child process, as a context manager: a local stand-in for an external server.
+
+    Parameters
+    ----------
+
+        policy: callable
+            Vectorized policy (see serve_policy), which must be picklable.
+
+        path: str or None
+            Path of the Unix socket (a temporary file if None).
+
+        timeout: float
+            Maximum time to wait for the server to listen, in seconds.
+
+    """
+    def __init__(self, policy, path=None, timeout=10.):
+        self.policy = policy
+        self.path = path if path is not None else os.path.join(tempfile.mkdtemp(), 'policy.sock')
+        self.timeout = timeout
+        self._process = None
+
+    def __enter__(self):
+        self._process = Process(target=run_policy_server, args=(self.policy, self.path), daemon=True)
+        self._process.start()
+        deadline = time.monotonic() + self.timeout
+        while not os.path.exists(self.path):
+            if time.monotonic() > deadline or not self._process.is_alive():
+                self.__exit__(None, None, None)
+                raise RuntimeError(f"The policy server did not start listening on {self.path}.")
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._process.terminate()
+        self._process.join()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class AsyncTables:
+    """
+
+    Many tables played at once, whose RemotePolicy players' decisions are sent to a policy server by batches.
+
+    Each table is a BlackjackSimulation with the same rules and players, played by its own asyncio task and seeded
+    from a spawn of the generator. Players with local strategies play as in BlackjackSimulation, and the histories of
+    all the tables are concatenated at the end of a run (table by table).
+
+    Parameters
+    ----------
+
+        path: str
+            Path of the policy server's Unix socket.
+
+        nb_tables: int
+            Number of tables played at once, i.e. maximum number of decisions of a batch.
+
+        seed: int, numpy.random.SeedSequence, numpy.random.Generator or None
+            Seed of the tables' generators.
+
+        **rules:
+            Parameters of the tables, see BlackjackSimulation.
+
+    Attributes
+    ----------
+
+        tables: list of BlackjackSimulation
+            The tables.
+
+        nb_requests, nb_decisions: int
+            Number of requests sent to the server, and of decisions they contained, during the last run.
+
+    """
+    def __init__(self, path, nb_tables=64, seed=None, **rules):
+        self.path = path
+        rng = np.random.default_rng(seed)
+        self.tables = [BlackjackSimulation(seed=table_rng, **rules) for table_rng in rng.spawn(nb_tables)]
+        game_rules = self.tables[0].game_rules
+        if game_rules.dealer_peek and game_rules.surrender == 'early':
+            raise ValueError("Early surrenders are declared synchronously, and are not supported by AsyncTables.")
+        self.nb_requests = 0
+        self.nb_decisions = 0
+        self._pending = []
+        self._requests = set()
+        self._nb_active = 0
+        self._connection = None
+
+    def register_player(self, name, betting_strategy, playing_strategy):
+        """ Adds a player to every table (each table gets its own copy of the strategies). """
+        for table in self.tables:
+            table.register_player(name, copy.deepcopy(betting_strategy), copy.deepcopy(playing_strategy))
+
+    def run(self, nb_rounds):
+        """
+
+        Plays nb_rounds rounds on each table.
+
+        Returns
+        -------
+
+            players_history: dict<str, PlayerHistory>
+                History of each player, concatenated over the tables.
+
+        """
+        asyncio.run(self._run(nb_rounds))
+        players_history = {}
+        for name in self.tables[0].players:
+            players_history[name] = PlayerHistory(self.tables[0].history_columns)
+            for table in self.tables:
+                players_history[name].extend(table.players_history[name])
+        return players_history
+
+    async def _run(self, nb_rounds):
+        self.nb_requests = self.nb_decisions = 0
+        self._connection = await asyncio.open_unix_connection(self.path)
+        self._nb_active = len(self.tables)
+        try:
+            await asyncio.gather(*[self._play_table(table, nb_rounds) for table in self.tables])
+        finally:
+            self._connection[1].close()
+            self._connection = None
+
+    async def _play_table(self, table, nb_rounds):
+        for history in table.players_history.values():
+            history.reserve(nb_rounds)
+        remote = {name: isinstance(player.playing_strategy, RemotePolicy) for name, player in table.players.items()}
+        table.shoe.shuffle()
+        try:
+            for _ in range(nb_rounds):
+                # same as BlackjackSimulation.play_round, awaiting the remote players' turns
+                if table.start_round():
+                    for name, player in table.players.items():
+                        if remote[name]:
+                            await self._remote_player_turn(table, player)
+                        else:
+                            table.player_turn(name, player)
+                    table.dealer_turn()
+                table.end_round()
+                table.nb_rounds_played += 1
+        finally:
+            self._nb_active -= 1
+            self._flush_if_blocked()
+
+    async def _remote_player_turn(self, table, player):
+        """ Same as BlackjackSimulation.player_turn, with the decisions taken by the policy server. """
+        dealer_card = int(table.dealer_hand.visible_card)
+        counting_system = player.playing_strategy.counting_system
+        available_mask = table.game_rules.available_mask
+        hand_idx = 0
+        while hand_idx < len(player.hands):
+            player_hand = player.hands[hand_idx]
+            mask = available_mask(player_hand, NO_ACTION)
+            while mask:
+                cards = player_hand.cards
+                pair = int(cards[0]) if len(cards) == 2 and int(cards[0]) == int(cards[1]) else -1
+                true_count = table.shoe.true_count(counting_system) if counting_system is not None else 0.
+                action = await self._decide((player_hand.value, player_hand.is_soft, pair, len(cards),
+                                             len(player.hands), dealer_card, mask, true_count))
+                if not mask >> action & 1:
+                    raise ValueError(f"The policy server answered action {action}, which is not available.")
+                player_hand = table.apply_action(player, hand_idx, action)
+                mask = available_mask(player_hand, action)
+            hand_idx += 1
+
+    def _decide(self, decision):
+        """ Queues a decision, and returns a future of its action code. """
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((decision, future))
+        self._flush_if_blocked()
+        return future
+
+    def _flush_if_blocked(self):
+        """ Sends the pending decisions once every active table is waiting for one. """
+        if self._pending and len(self._pending) >= self._nb_active:
+            pending, self._pending = self._pending, []
+            request = asyncio.get_running_loop().create_task(self._request(pending))
+            # the event loop only keeps a weak reference to its tasks: requests in flight are kept until done
+            self._requests.add(request)
+            request.add_done_callback(self._requests.discard)
+
+    async def _request(self, pending):
+        reader, writer = self._connection
+        decisions = np.array([decision for decision, _ in pending], dtype=decision_dtype)
+        writer.write(len(decisions).to_bytes(4, 'little') + decisions.tobytes())
+        try:
+            await writer.drain()
+            codes = np.frombuffer(await reader.readexactly(len(decisions)), dtype=np.int8).tolist()
+        except Exception as error:
+            for _, future in pending:
+                future.set_exception(error)
+            return
+        self.nb_requests += 1
+        self.nb_decisions += len(decisions)
+        for (_, future), code in zip(pending, codes):
+            future.set_result(code)
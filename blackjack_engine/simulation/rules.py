@@ -1,3 +1,31 @@
+import itertools
+
+import numpy as np
+
+from blackjack_engine.strategy.actions import (STAND, HIT, DOUBLE, SPLIT, SURRENDER, NO_ACTION, actions_names,
+                                               action_codes, bitmasks_actions)
+
+
+# final states of a hand, in addition to its values (0 to 21): busted, blackjack, and for players surrendered or
+# paid even money
+BUST, BLACKJACK, SURRENDERED, EVEN_MONEY = 22, 23, 24, 25
+NB_STATES = 26
+
+# options of the surrender and double rules
+surrender_rules = ['none', 'late', 'early']
+double_rules = {'any': range(22), '9-11': range(9, 12), '10-11': range(10, 12)}
+
+
+def hand_state(hand):
+    """ Final state of a hand: its value, BUST, BLACKJACK or the final state set by the player (see Hand). """
+    value = hand.value
+    if value > 21:
+        return BUST
+    elif hand.final_state is not None:
+        return hand.final_state
+    elif value == 21 and hand.nb_hands == 1 and len(hand.cards) == 2:
+        return BLACKJACK
+    return value
 
 
 class BlackJackRules:
@@ -7,10 +35,15 @@ class BlackJackRules:
 
     Fixed rules:
         * An Ace + 10 after a split is not considered a blackjack.
-        * After spliting Aces, a single card is delt on each Ace.
+        * After spliting Aces, a single card is delt on each Ace (which can only be split again if resplit_aces).
+        * Surrender is only allowed on the first two cards, before splitting.
+        * Insurance costs half the bet.
 
     Implementation details:
         * the 'split' action consist in spliting + getting a card delt for the two new hands.
+        * the rules are compiled at construction into a table of the available actions of every state of a hand
+          (see 'available_mask') and a table of the payouts of every pair of final states (see 'payouts'), so they
+          must not be modified afterwards. Optional rules only change these tables, and cost nothing per decision.
 
     Attributes
     ----------
@@ -24,11 +57,148 @@ class BlackJackRules:
         hit_soft_17: bool
             If True, the dealer hits on a soft 17 hand (i.e. a with an Ace valued 11).
 
+        blackjack_payout: float
+            Gains of a blackjack for a unit bet, e.g. 1.5 for 3:2 or 1.2 for 6:5.
+
+        surrender_refund: float
+            Fraction of the bet returned to a player who surrenders.
+
+        insurance_payout: float
+            Gains of an insurance side bet for a unit bet when the dealer has a blackjack (it is lost otherwise).
+
+        surrender: str
+            'none', 'late' (the first two cards can be surrendered after the dealer checked for a blackjack, and
+            the whole bet is lost to a dealer's blackjack without peek) or 'early' (before the dealer checks for a
+            blackjack, the refund is always paid).
+
+        dealer_peek: bool
+            If True, the dealer checks his hole card when his visible card is an Ace or a ten, and a blackjack ends
+            the round before the players' turns: only the initial bets are lost. Otherwise (no hole card), doubled
+            and split bets are lost too.
+
+        insurance: bool
+            If True, players are offered insurance when the dealer shows an Ace, or even money (a blackjack paid
+            1:1 whatever the dealer's hand) if they hold a blackjack.
+
+        resplit_aces: bool
+            If True, split Aces receiving another Ace can be split again, up to max_hands.
+
+        double_on: str
+            Values of the two cards hands which can be doubled: 'any', '9-11' or '10-11'.
+
+        hole_card_checks: bool
+            Whether anything happens before the players' turns (insurance or dealer's peek).
+
+        available_masks: array of shape (22, 2, 2, 2, max(max_hands, 2), 6)
+            Available actions bitmask of every state of a hand, indexed by (value (21 for 21 or more), holds 2 cards,
+            is a pair, first card is an Ace and the hand was split, number of hands (up to max_hands or 2) - 1, last
+            action + 1), see 'available_mask'.
+
+        payouts: array of shape (NB_STATES, NB_STATES)
+            Player's gains for a unit bet, indexed by the final states of the player's hand and of the dealer's
+            hand (see hand_state).
+
+        insurance_payouts: array of size NB_STATES
+            Gains of an insurance side bet for a unit bet, indexed by the final state of the dealer's hand.
+
     """
-    def __init__(self, max_hands=4, double_after_split=True, hit_soft_17=True):
+    def __init__(self, max_hands=4, double_after_split=True, hit_soft_17=True, blackjack_payout=1.5,
+                 surrender_refund=0.5, insurance_payout=2., surrender='none', dealer_peek=False, insurance=False,
+                 resplit_aces=False, double_on='any'):
+        if surrender not in surrender_rules:
+            raise ValueError(f"Unknown surrender rule '{surrender}', expected one of {surrender_rules}.")
+        if double_on not in double_rules:
+            raise ValueError(f"Unknown double rule '{double_on}', expected one of {list(double_rules)}.")
         self.max_hands = max_hands
         self.double_after_split = double_after_split
         self.hit_soft_17 = hit_soft_17
+        self.blackjack_payout = blackjack_payout
+        self.surrender_refund = surrender_refund
+        self.insurance_payout = insurance_payout
+        self.surrender = surrender
+        self.dealer_peek = dealer_peek
+        self.insurance = insurance
+        self.resplit_aces = resplit_aces
+        self.double_on = double_on
+        self.hole_card_checks = insurance or dealer_peek
+        # sizes of the last two axes of the compiled table: numbers of hands above max_hands (and 2) behave the same
+        self._nb_hands_states = max(max_hands, 2)
+        self._nb_last_actions = len(actions_names) + 1
+        self._available_masks = self._compile_actions()
+        self.available_masks = np.array(self._available_masks, dtype=np.int8).reshape(
+            22, 2, 2, 2, self._nb_hands_states, self._nb_last_actions)
+        self.available_masks.setflags(write=False)
+        self.payouts, self.insurance_payouts = self._compile_payouts()
+        # flat tuple of the payouts, faster to index than the array
+        self._payouts = tuple(self.payouts.reshape(-1).tolist())
+        self._insurance_payouts = tuple(self.insurance_payouts.tolist())
+
+    def _compile_payouts(self):
+        """ Payouts of the main bet and of the insurance bet, for every pair of final states. """
+        payouts = np.zeros((NB_STATES, NB_STATES))
+        for player_state, dealer_state in itertools.product(range(NB_STATES), range(NB_STATES)):
+            if player_state == SURRENDERED:
+                # without peek, a late surrender is only refunded if the dealer doesn't have a blackjack
+                late = self.surrender == 'late' and dealer_state == BLACKJACK
+                gains = -1 if late else self.surrender_refund - 1
+            elif player_state == EVEN_MONEY:
+                gains = 1
+            elif player_state == BUST:
+                # the player is busted
+                gains = -1
+            elif player_state == BLACKJACK:
+                # the player has a blackjack: push if the dealer has one too
+                gains = 0 if dealer_state == BLACKJACK else self.blackjack_payout
+            elif dealer_state == BUST:
+                # the dealer is busted and the player not, and the player doesn't have a blackjack
+                gains = 1
+            elif dealer_state == BLACKJACK:
+                # the dealer has a blackjack and the player don't
+                gains = -1
+            else:
+                # highest score wins
+                gains = np.sign(player_state - dealer_state)
+            payouts[player_state, dealer_state] = gains
+        insurance_payouts = np.full(NB_STATES, -1.)
+        insurance_payouts[BLACKJACK] = self.insurance_payout
+        payouts.setflags(write=False)
+        insurance_payouts.setflags(write=False)
+        return payouts, insurance_payouts
+
+    def _compile_actions(self):
+        """
+
+        Available actions bitmask of every state of a hand, as a flat tuple indexed by (value (21 for 21 or more),
+        holds 2 cards, is a pair, first card is an Ace, number of hands (up to max_hands or 2), last action + 1).
+
+        """
+        masks = []
+        for value, two_cards, is_pair, first_ace, nb_hands, last_action in itertools.product(
+                range(22), [False, True], [False, True], [False, True], range(1, self._nb_hands_states + 1),
+                range(NO_ACTION, len(actions_names))):
+            if value >= 21 or last_action in [STAND, DOUBLE, SURRENDER]:
+                # After busting / standing / doubling down / surrendering, no action is allowed
+                mask = 0
+            elif nb_hands > 1 and first_ace:
+                # After splitting aces, a single card is delt for each ace and the only other action allowed is
+                # splitting them again
+                mask = 0
+                if self.resplit_aces and two_cards and is_pair and nb_hands < self.max_hands:
+                    mask = 1 << STAND | 1 << SPLIT
+            else:
+                # not busted, previously split or hit.
+                mask = 1 << STAND | 1 << HIT
+                if two_cards and (nb_hands == 1 or self.double_after_split) and value in double_rules[self.double_on]:
+                    # if the player holds 2 cards and didn't split / double after split is allowed
+                    mask |= 1 << DOUBLE
+                if two_cards and is_pair and nb_hands < self.max_hands:
+                    # if the hand is a pair & didn't split too many times
+                    mask |= 1 << SPLIT
+                if two_cards and nb_hands == 1 and last_action == NO_ACTION and self.surrender != 'none':
+                    # first decision on the initial hand
+                    mask |= 1 << SURRENDER
+            masks.append(mask)
+        return tuple(masks)
 
     def dealer_action(self, dealer_hand):
         """
@@ -52,7 +222,7 @@ class BlackJackRules:
     def available_actions(self, player_hand, last_action):
         """
 
-        Subset of ['hit', 'stand', 'double', 'split']
+        Subset of ['stand', 'hit', 'double', 'split', 'surrender']
 
         Parameters
         ----------
@@ -60,34 +230,49 @@ class BlackJackRules:
             player_hand: Hand
                 player's current hand.
 
-            last_action: int or None
+            last_action: str or None
                 last action of the player on the current hand.
                 None if it's his first action.
 
         """
+        return list(bitmasks_actions[self.available_mask(player_hand, action_codes.get(last_action, NO_ACTION))])
+
+    def available_mask(self, player_hand, last_action=NO_ACTION):
+        """
+
+        Available actions as a bitmask, in which the bit n°code of each available action is set (0 if the hand is
+        over), read in the compiled rules.
+
+        Parameters
+        ----------
+
+            player_hand: Hand
+                player's current hand.
+
+            last_action: int
+                code of the last action of the player on the current hand, NO_ACTION if it's his first action.
+
+        """
+        cards = player_hand.cards
         value = player_hand.value
-        if value >= 21 or last_action in ['stand', 'double']:
-            # After busting / standing / doubling down, no action is allowed
-            available_actions = []
-        elif player_hand.nb_hands > 1 and player_hand.cards[0] == 0:
-            # After splitting aces, a single card is delt for each ace and no other action is allowed
-            available_actions = []
-        else:
-            # not busted, previously split or hit.
-            available_actions = ['stand', 'hit']
-            if len(player_hand.cards) == 2 and (player_hand.nb_hands == 1 or self.double_after_split):
-                # if the player holds 2 cards and didn't split / double after split is allowed: double down is allowed
-                available_actions.append('double')
-            if player_hand.is_pair and player_hand.nb_hands < self.max_hands:
-                # if the hand is a pair & didn't split too many times: split is allowed
-                available_actions.append('split')
-        return available_actions
-
-    @staticmethod
-    def evaluate_hand(player_hand, dealer_hand):
+        if value > 21:
+            value = 21
+        # cards are compared as plain integers, which is faster than through Card.__eq__
+        two_cards = len(cards) == 2
+        is_pair = two_cards and int(cards[0]) == int(cards[1])
+        nb_hands_states = self._nb_hands_states
+        nb_hands = player_hand.nb_hands
+        # whether the first card is an Ace only matters for split hands
+        first_ace = nb_hands > 1 and int(cards[0]) == 0
+        if nb_hands > nb_hands_states:
+            nb_hands = nb_hands_states
+        index = (((value * 2 + two_cards) * 2 + is_pair) * 2 + first_ace) * nb_hands_states + nb_hands - 1
+        return self._available_masks[index * self._nb_last_actions + last_action + 1]
+
+    def evaluate_hand(self, player_hand, dealer_hand):
         """
 
-        Compute the player's gains given his hand and the dealer's hand.
+        Compute the player's gains given his hand and the dealer's hand, read in the payouts table.
 
         Parameters
         ----------
@@ -105,30 +290,47 @@ class BlackJackRules:
              The player's gains for a unit bet. (negative in case of a loss)
 
         """
-        if player_hand.is_busted:
-            # the player is busted
-            return -1
-        elif player_hand.is_blackjack:
-            if dealer_hand.is_blackjack:
-                # the player and the dealer both have a blackjack
-                return 0
-            else:
-                # the player has a blackjack and the dealer doesn't
-                return 1.5
-        else:
-            if dealer_hand.value > 21:
-                # the dealer is busted and the player not, and the player doesn't have a blackjack
-                return 1
-            elif dealer_hand.is_blackjack:
-                # the dealer has a blackjack and the player don't
-                return -1
-            else:
-                if player_hand.value > dealer_hand.value:
-                    # the player has a higher score than the dealer
-                    return 1
-                elif player_hand.value < dealer_hand.value:
-                    # the dealer has a higher score than the player
-                    return -1
-                else:
-                    # the player and the dealer have the same score
-                    return 0
+        return self._payouts[hand_state(player_hand) * NB_STATES + hand_state(dealer_hand)]
+
+    def evaluate_insurance(self, dealer_hand):
+        """ Gains of an insurance side bet for a unit bet, given the dealer's hand. """
+        return self._insurance_payouts[hand_state(dealer_hand)]
+
+    def settle(self, players_hands, dealer_hand):
+        """
+
+        Settles all the hands of a round at once against the dealer's final hand.
+
+        Parameters
+        ----------
+
+            players_hands: list of list of Hand
+                Hands of each player.
+
+            dealer_hand: Hand
+                cards hold by the dealer
+
+        Return
+        ------
+
+            results: list of list of float
+                Gains of each hand of each player for a unit bet.
+
+        """
+        payouts = self._payouts
+        dealer_state = hand_state(dealer_hand)
+        results = []
+        for hands in players_hands:
+            hands_results = []
+            for hand in hands:
+                # same as hand_state, inlined
+                value = hand.value
+                if value > 21:
+                    value = BUST
+                elif hand.final_state is not None:
+                    value = hand.final_state
+                elif value == 21 and hand.nb_hands == 1 and len(hand.cards) == 2:
+                    value = BLACKJACK
+                hands_results.append(payouts[value * NB_STATES + dealer_state])
+            results.append(hands_results)
+        return results
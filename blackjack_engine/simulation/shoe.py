@@ -1,5 +1,8 @@
 import numpy as np
 
+from blackjack_engine.simulation.cards import CARDS, CardCounts, cards_names
+from blackjack_engine.simulation.counts import to_counting_system
+
 
 class Shoe:
     """
@@ -15,17 +18,28 @@ class Shoe:
         penetration: float, between 0 and 1
             fraction of the decks dealt before re-shuffling.
 
+        seed: int, numpy.random.SeedSequence, numpy.random.Generator or None
+            Seed of the random generator used to shuffle the shoe (or the generator itself).
+
+        counting_systems: list of str or CountingSystem, or None
+            Counting systems whose running counts are updated each time a card is delt (see 'running_count' and
+            'true_count'). Others can be added later with 'add_counting_system'. None by default: a simulation adds
+            the systems of its strategies (and hi-lo if its history records the true count).
+
     Attributes
     ----------
 
         cards_order: array of size (nb_decks * 52,)
-            Order of the cards in the shoe.
+            Ranks of the cards in the shoe, in dealing order. It is shuffled in place, and the cards are delt from a
+            bytes copy of it refilled when the shoe is shuffled, so re-shuffling allocates nothing.
 
-        remaining_cards: dict<str, int>
-            Number of cards remaining for each value (Ace, 2, ...)
+        remaining_cards: CardCounts
+            Number of cards remaining for each rank (Ace, 2, ...)
 
-        delt_cards: dict<str, int>
-            Number of cards delt for each value (Ace, 2, ...)
+        delt_cards: CardCounts
+            Number of cards delt for each rank (Ace, 2, ...)
+
+        The counts are kept in Python lists while dealing, and only copied to these arrays when they are read.
 
         max_cards_delt: int
             Maximum number of cards to deal before re-shuffling the deck.
@@ -33,22 +47,58 @@ class Shoe:
         nb_cards_delt: int
             Number of cards delt since the last shuffling of the shoe.
 
+        total_cards_delt, nb_shuffles: int
+            Number of cards delt and of shuffles since the shoe was created.
+
         nb_decks: int
             Number of decks used in the shoe.
 
+        penetration: float
+            Fraction of the decks dealt before re-shuffling.
+
+        rng: numpy.random.Generator
+            Random generator used to shuffle the shoe.
+
+        counting_systems: dict<str, CountingSystem>
+            Counting systems tracked by the shoe.
+
     """
 
-    cards_names = ['A', '2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K']
+    cards_names = cards_names
+
+    def __init__(self, nb_decks, penetration, seed=None, counting_systems=None):
+        self.rng = np.random.default_rng(seed)
+        self.cards_order = np.repeat(np.arange(13, dtype=np.int8), 4 * nb_decks)
+        self.rng.shuffle(self.cards_order)
+        self._setup(nb_decks, penetration, counting_systems)
 
-    def __init__(self, nb_decks, penetration):
+    def _setup(self, nb_decks, penetration, counting_systems):
+        """ Initialises the counts of a shoe whose cards_order is set, without shuffling it. """
         assert 0 <= penetration <= 1, "penetration must be between 0 and 1."
-        self.cards = np.repeat(np.arange(13), 4 * nb_decks)
-        self.cards_order = np.random.permutation(self.cards.shape[0])
-        self.remaining_cards = {i: 4 * nb_decks for i in self.cards_names}
-        self.delt_cards = {i: 0 for i in self.cards_names}
+        self.cards = np.repeat(np.arange(13, dtype=np.int8), 4 * nb_decks)
+        # ranks in dealing order (indexing bytes is much faster than indexing the array), refilled by each shuffle
+        self._order = bytearray(len(self.cards))
+        np.frombuffer(self._order, dtype=np.int8)[:] = self.cards_order
+        # counts updated for each card, and arrays exposing them (with the number of cards delt they were copied at)
+        self._remaining = [4 * nb_decks] * 13
+        self._delt = [0] * 13
+        self._remaining_array, self._delt_array = np.full(13, 4 * nb_decks), np.zeros(13, dtype=int)
+        self._remaining_cards = self._remaining_array.view(CardCounts)
+        self._delt_cards = self._delt_array.view(CardCounts)
+        self._remaining_copied = self._delt_copied = 0
         self.max_cards_delt = penetration * len(self.cards)
         self.nb_cards_delt = 0
+        self.nb_shuffles = 0
+        self._previous_cards_delt = 0
         self.nb_decks = nb_decks
+        self.penetration = penetration
+        self.counting_systems = {}
+        self._count_indexes = {}
+        # running counts of the tracked systems, and weights of each rank for each system, as Python floats
+        self._running_counts = []
+        self._count_weights = tuple(() for _ in range(13))
+        for system in counting_systems or ():
+            self.add_counting_system(system)
 
     def deal_card(self):
         """
@@ -58,25 +108,118 @@ class Shoe:
         Returns
         -------
 
-            card: string
-                Card among ['A', '2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K']
+            card: Card
+                Rank of the card, between 0 (Ace) and 12 (King)
 
         """
-        if self.nb_cards_delt >= len(self.cards_order):
+        if self.nb_cards_delt >= len(self._order):
             self.shuffle()
-        card_idx = self.cards[self.cards_order[self.nb_cards_delt]]
-        self.remaining_cards[self.cards_names[card_idx]] -= 1
-        self.delt_cards[self.cards_names[card_idx]] += 1
+        rank = self._order[self.nb_cards_delt]
+        self._remaining[rank] -= 1
+        self._delt[rank] += 1
         self.nb_cards_delt += 1
-        return self.cards_names[card_idx]
+        if self._running_counts:
+            running_counts = self._running_counts
+            for i, weight in enumerate(self._count_weights[rank]):
+                running_counts[i] += weight
+        return CARDS[rank]
+
+    def deal_cards(self, nb_cards):
+        """
+
+        Deal several cards from the shoe, in the same order as successive calls to deal_card, but updating the counts
+        once for all the cards.
+
+        Returns
+        -------
+
+            cards: list of Card
+
+        """
+        start = self.nb_cards_delt
+        if start + nb_cards > len(self._order):
+            return [self.deal_card() for _ in range(nb_cards)]
+        ranks = self._order[start:start + nb_cards]
+        remaining, delt = self._remaining, self._delt
+        for rank in ranks:
+            remaining[rank] -= 1
+            delt[rank] += 1
+        self.nb_cards_delt = start + nb_cards
+        running_counts = self._running_counts
+        if running_counts:
+            count_weights = self._count_weights
+            for rank in ranks:
+                for i, weight in enumerate(count_weights[rank]):
+                    running_counts[i] += weight
+        return [CARDS[rank] for rank in ranks]
 
     def shuffle(self):
         """ Re-shuffle all cards into the shoe. """
-        self.remaining_cards = {i: 4 * self.nb_decks for i in self.cards_names}
-        self.delt_cards = {i: 0 for i in self.cards_names}
-        self.cards_order = np.random.permutation(self.cards.shape[0])
+        self.rng.shuffle(self.cards_order)
+        self._reset()
+
+    def _reset(self):
+        """ Puts all the cards back into the shoe, for a new cards order. """
+        np.frombuffer(self._order, dtype=np.int8)[:] = self.cards_order
+        remaining, delt = self._remaining, self._delt
+        for rank in range(13):
+            remaining[rank] = 4 * self.nb_decks
+            delt[rank] = 0
+        self._remaining_copied = self._delt_copied = -1
+        self._previous_cards_delt += self.nb_cards_delt
         self.nb_cards_delt = 0
+        self.nb_shuffles += 1
+        for i, system in enumerate(self.counting_systems.values()):
+            self._running_counts[i] = system.initial_running_count(self.nb_decks)
+
+    @property
+    def remaining_cards(self):
+        if self._remaining_copied != self.nb_cards_delt:
+            self._remaining_array[:] = self._remaining
+            self._remaining_copied = self.nb_cards_delt
+        return self._remaining_cards
+
+    @property
+    def delt_cards(self):
+        if self._delt_copied != self.nb_cards_delt:
+            self._delt_array[:] = self._delt
+            self._delt_copied = self.nb_cards_delt
+        return self._delt_cards
+
+    @property
+    def total_cards_delt(self):
+        return self._previous_cards_delt + self.nb_cards_delt
 
     def needs_shuffling(self):
         """ Whether the shoe needs to be shuffled. """
         return self.nb_cards_delt >= self.max_cards_delt
+
+    def add_counting_system(self, system):
+        """ Starts tracking a counting system (given by name or as a CountingSystem), from the cards already delt. """
+        system = to_counting_system(system)
+        if system.name in self.counting_systems:
+            return
+        self.counting_systems[system.name] = system
+        self._count_indexes[system.name] = len(self._running_counts)
+        self._running_counts.append(system.running_count(self._delt, self.nb_decks))
+        self._count_weights = tuple(weights + (weight,) for weights, weight in zip(self._count_weights, system.weights))
+
+    def running_count(self, system='hi-lo'):
+        """ Running count of a tracked counting system. """
+        return self._running_counts[self._count_index(system)]
+
+    def true_count(self, system='hi-lo'):
+        """
+
+        Running count of a tracked counting system, divided by the number of remaining decks (at least one card, once
+        the last card of the shoe is delt in the middle of a round).
+
+        """
+        remaining_decks = max(len(self.cards) - self.nb_cards_delt, 1) / 52
+        return self._running_counts[self._count_index(system)] / remaining_decks
+
+    def _count_index(self, system):
+        name = getattr(system, 'name', system)
+        if name in self._count_indexes:
+            return self._count_indexes[name]
+        raise KeyError(f"Counting system '{name}' is not tracked by the shoe, see 'add_counting_system'.")
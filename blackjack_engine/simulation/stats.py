@@ -0,0 +1,201 @@
+import math
+from statistics import NormalDist
+
+import numpy as np
+
+
+class PlayerStatistics:
+    """
+
+    Online accumulator of a player's results, using constant memory whatever the number of rounds.
+
+    Means, variances and the covariance of the bets and gains per round are updated with Welford's algorithm, which
+    is numerically stable, and accumulators can be merged (e.g. from parallel workers) with Chan's formulas.
+
+    Attributes
+    ----------
+
+        nb_rounds: int
+            Number of rounds played.
+
+        nb_hands, nb_wins, nb_losses, nb_pushes, nb_blackjacks, nb_busts: int
+            Number of hands played, won, lost, pushed, won with a blackjack and busted.
+
+        total_bets, total_gains: float
+            Sum of the bets and gains over all rounds.
+
+    """
+    def __init__(self):
+        self.nb_rounds = 0
+        self.nb_hands = 0
+        self.nb_wins = 0
+        self.nb_losses = 0
+        self.nb_pushes = 0
+        self.nb_blackjacks = 0
+        self.nb_busts = 0
+        self.total_bets = 0.
+        self.total_gains = 0.
+        self._mean_bets = 0.
+        self._mean_gains = 0.
+        self._m2_bets = 0.
+        self._m2_gains = 0.
+        self._co_moment = 0.
+
+    def append(self, bets, gains, hands=(), results=()):
+        """
+
+        Records one round.
+
+        Parameters
+        ----------
+
+            bets, gains: float
+                Total amount bet and won by the player during the round.
+
+            hands: list of Hand
+                Hands played by the player.
+
+            results: list of float
+                Gains of each hand for a unit bet, as returned by BlackJackRules.settle.
+
+        """
+        self.nb_rounds += 1
+        self.total_bets += bets
+        self.total_gains += gains
+        delta_bets = bets - self._mean_bets
+        delta_gains = gains - self._mean_gains
+        self._mean_bets += delta_bets / self.nb_rounds
+        self._mean_gains += delta_gains / self.nb_rounds
+        self._m2_bets += delta_bets * (bets - self._mean_bets)
+        self._m2_gains += delta_gains * (gains - self._mean_gains)
+        self._co_moment += delta_bets * (gains - self._mean_gains)
+        for hand, result in zip(hands, results):
+            self.nb_hands += 1
+            if result > 0:
+                self.nb_wins += 1
+                if hand.is_blackjack:
+                    self.nb_blackjacks += 1
+            elif result < 0:
+                self.nb_losses += 1
+                if hand.is_busted:
+                    self.nb_busts += 1
+            else:
+                self.nb_pushes += 1
+
+    @classmethod
+    def from_arrays(cls, bets, gains):
+        """ Statistics of rounds given as arrays of bets and gains (hand counters are left to 0). """
+        statistics = cls()
+        if len(bets):
+            bets, gains = np.asarray(bets, dtype=float), np.asarray(gains, dtype=float)
+            statistics.nb_rounds = len(bets)
+            statistics.total_bets, statistics.total_gains = float(bets.sum()), float(gains.sum())
+            statistics._mean_bets, statistics._mean_gains = float(bets.mean()), float(gains.mean())
+            statistics._m2_bets = float(np.sum((bets - statistics._mean_bets) ** 2))
+            statistics._m2_gains = float(np.sum((gains - statistics._mean_gains) ** 2))
+            statistics._co_moment = float(np.sum((bets - statistics._mean_bets) * (gains - statistics._mean_gains)))
+        return statistics
+
+    def to_dict(self):
+        """ Counters and moments of the accumulator, from which it can be rebuilt with 'from_dict'. """
+        return dict(vars(self))
+
+    @classmethod
+    def from_dict(cls, values):
+        """ Accumulator with the counters and moments returned by 'to_dict'. """
+        statistics = cls()
+        for key in vars(statistics):
+            setattr(statistics, key, type(getattr(statistics, key))(values[key]))
+        return statistics
+
+    def merge(self, other):
+        """ Adds the rounds accumulated by another PlayerStatistics. """
+        nb_rounds = self.nb_rounds + other.nb_rounds
+        if nb_rounds == 0:
+            return
+        delta_bets = other._mean_bets - self._mean_bets
+        delta_gains = other._mean_gains - self._mean_gains
+        weight = self.nb_rounds * other.nb_rounds / nb_rounds
+        self._m2_bets += other._m2_bets + delta_bets ** 2 * weight
+        self._m2_gains += other._m2_gains + delta_gains ** 2 * weight
+        self._co_moment += other._co_moment + delta_bets * delta_gains * weight
+        self._mean_bets += delta_bets * other.nb_rounds / nb_rounds
+        self._mean_gains += delta_gains * other.nb_rounds / nb_rounds
+        self.nb_rounds = nb_rounds
+        for counter in ['nb_hands', 'nb_wins', 'nb_losses', 'nb_pushes', 'nb_blackjacks', 'nb_busts',
+                        'total_bets', 'total_gains']:
+            setattr(self, counter, getattr(self, counter) + getattr(other, counter))
+
+    @property
+    def mean_gains(self):
+        """ Average gains per round. """
+        return self._mean_gains
+
+    @property
+    def variance(self):
+        """ Variance of the gains per round. """
+        return self._m2_gains / (self.nb_rounds - 1) if self.nb_rounds > 1 else math.nan
+
+    @property
+    def std(self):
+        """ Standard deviation of the gains per round. """
+        return math.sqrt(self.variance)
+
+    @property
+    def ev(self):
+        """ Expected value for a unit bet: total gains divided by total bets. """
+        return self.total_gains / self.total_bets if self.total_bets else math.nan
+
+    @property
+    def ev_standard_error(self):
+        """ Standard error of the EV, computed with the delta method for a ratio of means. """
+        if self.nb_rounds < 2 or not self._mean_bets:
+            return math.nan
+        ev = self.ev
+        variance = (self._m2_gains - 2 * ev * self._co_moment + ev ** 2 * self._m2_bets) / (self.nb_rounds - 1)
+        return math.sqrt(max(variance, 0.) / self.nb_rounds) / self._mean_bets
+
+    def confidence_interval(self, confidence=0.95):
+        """ Confidence interval of the EV for a unit bet, based on the normal approximation. """
+        half_width = NormalDist().inv_cdf(0.5 + confidence / 2) * self.ev_standard_error
+        return self.ev - half_width, self.ev + half_width
+
+    def mean_confidence_interval(self, confidence=0.95):
+        """ Confidence interval of the average gains per round, based on the normal approximation. """
+        half_width = NormalDist().inv_cdf(0.5 + confidence / 2) * self.std / math.sqrt(self.nb_rounds)
+        return self.mean_gains - half_width, self.mean_gains + half_width
+
+    def risk_of_ruin(self, bankroll):
+        """ Probability of ever losing the bankroll, with the diffusion approximation exp(-2 * mean * B / var). """
+        if self.mean_gains <= 0:
+            return 1.
+        return math.exp(-2 * self.mean_gains * bankroll / self.variance)
+
+    @property
+    def n0(self):
+        """ N0: number of rounds after which the expected gains equal one standard deviation of the total gains. """
+        if not self.mean_gains:
+            return math.inf
+        return self.variance / self.mean_gains ** 2
+
+    def summary(self, confidence=0.95):
+        """ Main statistics, as a dict. """
+        return {
+            'nb_rounds': self.nb_rounds,
+            'nb_hands': self.nb_hands,
+            'total_bets': self.total_bets,
+            'total_gains': self.total_gains,
+            'ev': self.ev,
+            'ev_confidence_interval': self.confidence_interval(confidence),
+            'mean_gains': self.mean_gains,
+            'std': self.std,
+            'win_rate': self.nb_wins / self.nb_hands if self.nb_hands else math.nan,
+            'loss_rate': self.nb_losses / self.nb_hands if self.nb_hands else math.nan,
+            'push_rate': self.nb_pushes / self.nb_hands if self.nb_hands else math.nan,
+            'blackjack_rate': self.nb_blackjacks / self.nb_hands if self.nb_hands else math.nan,
+            'bust_rate': self.nb_busts / self.nb_hands if self.nb_hands else math.nan,
+        }
+
+    def __repr__(self):
+        low, high = self.confidence_interval()
+        return f"PlayerStatistics(nb_rounds={self.nb_rounds}, ev={self.ev:.5f}, 95% CI=[{low:.5f}, {high:.5f}])"
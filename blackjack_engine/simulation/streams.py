@@ -0,0 +1,151 @@
+"""
+
+Pregenerated streams of shuffled shoes, stored as uint8 arrays in .npy files which can be memory-mapped.
+
+Usage: blackjack-shoes <path> --nb-shoes 1000000 --nb-decks 6 [--seed 0]
+
+"""
+import argparse
+import copy
+
+import numpy as np
+
+from blackjack_engine.simulation.shoe import Shoe
+
+
+def generate_shoe_stream(path, nb_shoes, nb_decks, seed=None, chunk_size=2 ** 14):
+    """
+
+    Writes nb_shoes shuffled shoes to a .npy file, one shoe per row.
+
+    Shoes are shuffled by chunks directly in the memory-mapped file, so that streams larger than the memory can be
+    generated.
+
+    Parameters
+    ----------
+
+        path: str
+            Path of the .npy file.
+
+        nb_shoes: int
+            Number of shoes in the stream.
+
+        nb_decks: int
+            Number of decks of each shoe.
+
+        seed: int, numpy.random.SeedSequence, numpy.random.Generator or None
+            Seed of the random generator shuffling the shoes.
+
+        chunk_size: int
+            Number of shoes shuffled at once.
+
+    Returns
+    -------
+
+        stream: numpy.memmap of shape (nb_shoes, nb_decks * 52)
+            Ranks of the cards of each shoe, in dealing order.
+
+    """
+    rng = np.random.default_rng(seed)
+    ranks = np.repeat(np.arange(13, dtype=np.uint8), 4 * nb_decks)
+    stream = np.lib.format.open_memmap(path, mode='w+', dtype=np.uint8, shape=(nb_shoes, len(ranks)))
+    for start in range(0, nb_shoes, chunk_size):
+        chunk = stream[start:start + chunk_size].view(np.ndarray)
+        chunk[:] = ranks
+        rng.permuted(chunk, axis=1, out=chunk)
+    stream.flush()
+    return stream
+
+
+def load_shoe_stream(path):
+    """ Memory-maps a stream written by generate_shoe_stream, read-only. """
+    return np.load(path, mmap_mode='r')
+
+
+class StreamShoe(Shoe):
+    """
+
+    Shoe dealing the shoes of a pregenerated stream in order, instead of shuffling its cards.
+
+    Cards are read straight from the stream (usually memory-mapped, so that many processes share it through the page
+    cache) without being copied, and a "shuffle" only moves to the next shoe of the stream (or does nothing if no
+    card of the current shoe has been delt yet). After the last shoe, the stream starts over from its first shoe.
+
+    Parameters
+    ----------
+
+        stream: str or array of shape (nb_shoes, nb_decks * 52)
+            Path of a stream written by generate_shoe_stream, or the stream itself.
+
+        penetration: float, between 0 and 1
+            fraction of the decks dealt before moving to the next shoe.
+
+        start: int
+            Index of the first shoe to deal.
+
+        counting_systems: list of str or CountingSystem
+            Counting systems tracked by the shoe, see Shoe.
+
+    Attributes
+    ----------
+
+        shoe_idx: int
+            Index of the shoe currently delt in the stream.
+
+        rng: None
+            A stream shoe is never shuffled.
+
+    Copies of the shoe (e.g. the initial state kept by BlackjackSimulation.run) share its stream, and pickling a shoe
+    reading a file only saves the path and position in the stream: checkpointed runs need a stream file.
+
+    """
+    def __init__(self, stream, penetration, start=0, counting_systems=None):
+        self.path = stream if isinstance(stream, str) else None
+        self.stream = load_shoe_stream(stream) if self.path is not None else stream
+        nb_decks, remainder = divmod(self.stream.shape[1], 52)
+        assert remainder == 0 and nb_decks > 0, "Each shoe of the stream must hold nb_decks * 52 cards."
+        self.rng = None
+        self.shoe_idx = start % len(self.stream)
+        self.cards_order = self.stream[self.shoe_idx].view(np.ndarray)
+        self._setup(nb_decks, penetration, counting_systems)
+
+    def shuffle(self):
+        """ Moves to the next shoe of the stream. """
+        if self.nb_cards_delt:
+            self.shoe_idx = (self.shoe_idx + 1) % len(self.stream)
+            self.cards_order = self.stream[self.shoe_idx].view(np.ndarray)
+        self._reset()
+
+    def __deepcopy__(self, memo):
+        # the stream is only read, so copies share it instead of copying it (even if it is not memory-mapped)
+        memo[id(self.stream)], memo[id(self.cards_order)] = self.stream, self.cards_order
+        shoe = memo[id(self)] = self.__class__.__new__(self.__class__)
+        shoe.__dict__.update(copy.deepcopy(self.__dict__, memo))
+        return shoe
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if self.path is not None:
+            # the stream is memory-mapped again when unpickled, instead of being copied
+            del state['stream'], state['cards_order']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.path is not None:
+            self.stream = load_shoe_stream(self.path)
+            self.cards_order = self.stream[self.shoe_idx].view(np.ndarray)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Pregenerates a stream of shuffled shoes.")
+    parser.add_argument('path', help="Path of the .npy file.")
+    parser.add_argument('--nb-shoes', type=int, required=True)
+    parser.add_argument('--nb-decks', type=int, required=True)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(args)
+    generate_shoe_stream(args.path, args.nb_shoes, args.nb_decks, args.seed)
+
+
+if __name__ == '__main__':
+    main()
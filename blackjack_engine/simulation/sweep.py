@@ -0,0 +1,218 @@
+import copy
+import itertools
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from tqdm import tqdm
+
+from blackjack_engine.simulation.game import BlackjackSimulation, Player, reseed_players
+from blackjack_engine.simulation.stats import PlayerStatistics
+from blackjack_engine.simulation.streams import StreamShoe, load_shoe_stream
+
+
+# parameters of BlackjackSimulation a sweep can vary, with their default values
+rules_parameters = {
+    'nb_decks': 4,
+    'penetration': 0.75,
+    'max_hands': 3,
+    'double_after_split': True,
+    'hit_soft_17': True,
+    'blackjack_payout': 1.5,
+    'surrender': 'none',
+    'dealer_peek': False,
+    'insurance': False,
+    'resplit_aces': False,
+    'double_on': 'any',
+}
+
+# columns of the sweep results, in addition to the rules parameters and the players' statistics
+key_columns = ['cell', 'replication', 'player']
+
+
+class Sweep:
+    """
+
+    Evaluates strategies over a grid of rules, with common random numbers.
+
+    Each cell of the grid is played nb_replications times for nb_rounds rounds. Replication n°r of every cell is
+    seeded with the same seed, so that cells with the same number of decks are played on the same sequence of
+    shuffled shoes (and strategies get the same random streams): differences between cells are then estimated
+    from paired replications, with a much lower variance than independent runs (see 'compare').
+
+    Replications are run in parallel over a process pool, and the results are written to a single columnar .npz
+    file (one array per column, one row per cell, replication and player) each time a replication completes. Running
+    a sweep whose file already exists resumes it, skipping the replications already recorded.
+
+    Parameters
+    ----------
+
+        grid: dict<str, list>
+            Values of the rules parameters to combine, among the keys of 'rules_parameters' ('nb_decks', 'penetration'
+            and the rules of BlackjackSimulation). Other parameters keep their default value.
+
+        players: dict<str, tuple>
+            (betting strategy, playing strategy) of each player. All the players sit at the same table. Strategies
+            must be picklable.
+
+        nb_rounds: int
+            Number of rounds of each replication.
+
+        nb_replications: int
+            Number of independent replications of each cell.
+
+        seed: int or None
+            Seed from which the seeds of the replications are spawned.
+
+        path: str or None
+            Path of the .npz results file. Results are only kept in memory if None.
+
+        shoe_stream: str or None
+            Path of a pregenerated stream of shoes (see generate_shoe_stream). If given, every cell deals the shoes of
+            the stream, replication n°r starting from shoe n°r * nb_shoes / nb_replications, and the grid's number
+            of decks must be the stream's.
+
+    """
+    def __init__(self, grid, players, nb_rounds, nb_replications=10, seed=None, path=None, shoe_stream=None):
+        for parameter in grid:
+            if parameter not in rules_parameters:
+                raise ValueError(f"Unknown rules parameter '{parameter}', expected one of {list(rules_parameters)}.")
+        self.grid = grid
+        self.players = {name: Player(*strategies) for name, strategies in players.items()}
+        self.nb_rounds = nb_rounds
+        self.nb_replications = nb_replications
+        self.seed_sequence = np.random.SeedSequence(seed)
+        self.path = path
+        self.cells = [{**rules_parameters, **dict(zip(grid, values))}
+                      for values in itertools.product(*grid.values())]
+        self.shoe_stream = shoe_stream
+        if shoe_stream is not None:
+            nb_shoes, nb_cards = load_shoe_stream(shoe_stream).shape
+            if any(cell['nb_decks'] * 52 != nb_cards for cell in self.cells):
+                raise ValueError(f"The shoes of {shoe_stream} have {nb_cards // 52} decks, the grid's must match.")
+            self._stream_offset = nb_shoes // nb_replications
+        self.columns = key_columns + list(rules_parameters) + list(PlayerStatistics().to_dict())
+        self.results = {column: [] for column in self.columns}
+        if path is not None and os.path.exists(path):
+            self._load()
+
+    def run(self, nb_workers=None, verbose=True):
+        """
+
+        Plays the replications which are not recorded yet.
+
+        Parameters
+        ----------
+
+            nb_workers: int or None
+                Number of processes (all CPU cores if None).
+
+            verbose: bool
+                If True, displays a progress bar.
+
+        Returns
+        -------
+
+            results: dict<str, array>
+                Columns of the results.
+
+        """
+        done = set(zip(self.results['cell'], self.results['replication']))
+        seeds = self.seed_sequence.spawn(self.nb_replications)
+        units = [(cell, replication) for cell in range(len(self.cells)) for replication in range(self.nb_replications)
+                 if (cell, replication) not in done]
+        with ProcessPoolExecutor(max_workers=nb_workers) as executor:
+            futures = {executor.submit(_run_replication, self.cells[cell], self.players, self.nb_rounds,
+                                       seeds[replication], self._stream_start(replication)): (cell, replication)
+                       for cell, replication in units}
+            for future in tqdm(as_completed(futures), total=len(futures), disable=not verbose):
+                cell, replication = futures[future]
+                self._record(cell, replication, future.result())
+                self.save()
+        return self.to_arrays()
+
+    def to_arrays(self):
+        """ Columns of the results, as numpy arrays. """
+        return {column: np.array(values) for column, values in self.results.items()}
+
+    def save(self):
+        """ Writes the results, replacing the previous file atomically so that an interrupted sweep can resume. """
+        if self.path is None:
+            return
+        temporary_path = self.path + '.tmp.npz'
+        np.savez(temporary_path, **self.to_arrays())
+        os.replace(temporary_path, self.path)
+
+    def statistics(self):
+        """ Statistics of each player in each cell, merged over the replications, as a dict indexed by (cell, name). """
+        statistics = {}
+        for row in self._rows():
+            key = (row['cell'], row['player'])
+            statistics.setdefault(key, PlayerStatistics()).merge(PlayerStatistics.from_dict(row))
+        return statistics
+
+    def compare(self, cell, other_cell, player):
+        """
+
+        Difference of a player's EV between two cells, estimated from paired replications.
+
+        Returns
+        -------
+
+            difference, standard_error: float
+                Mean over the replications of EV(cell) - EV(other_cell), and its standard error.
+
+        """
+        evs = {}
+        for row in self._rows():
+            if row['player'] == player and row['cell'] in (cell, other_cell):
+                evs.setdefault(row['replication'], {})[row['cell']] = row['total_gains'] / row['total_bets']
+        differences = np.array([ev[cell] - ev[other_cell] for ev in evs.values() if len(ev) == 2])
+        if len(differences) < 2:
+            return float(differences.mean()) if len(differences) else math.nan, math.nan
+        return float(differences.mean()), float(differences.std(ddof=1) / math.sqrt(len(differences)))
+
+    def _stream_start(self, replication):
+        if self.shoe_stream is None:
+            return None
+        return self.shoe_stream, replication * self._stream_offset
+
+    def _record(self, cell, replication, statistics):
+        for name, player_statistics in statistics.items():
+            row = {'cell': cell, 'replication': replication, 'player': name, **self.cells[cell],
+                   **player_statistics.to_dict()}
+            for column in self.columns:
+                self.results[column].append(row[column])
+
+    def _rows(self):
+        return [dict(zip(self.columns, values)) for values in zip(*self.results.values())]
+
+    def _load(self):
+        with np.load(self.path) as arrays:
+            if sorted(arrays.files) != sorted(self.columns):
+                raise ValueError(f"{self.path} was not written by a sweep with the same columns.")
+            self.results = {column: arrays[column].tolist() for column in self.columns}
+        for row in self._rows():
+            cell = row['cell']
+            if cell >= len(self.cells) or any(row[key] != value for key, value in self.cells[cell].items()):
+                raise ValueError(f"{self.path} was written by a sweep with a different grid.")
+
+
+def _run_replication(rules, players, nb_rounds, seed_sequence, stream_start=None):
+    """ Plays one replication of a cell, and returns the statistics of each player. """
+    rng = np.random.default_rng(seed_sequence)
+    shoe = None
+    if stream_start is not None:
+        path, start = stream_start
+        shoe = StreamShoe(path, rules['penetration'], start=start)
+    simulation = BlackjackSimulation(**rules, seed=rng, shoe=shoe)
+    players = copy.deepcopy(players)
+    reseed_players(players, rng)
+    for name, player in players.items():
+        simulation.register_player(name, player.betting_strategy, player.playing_strategy)
+    simulation.aggregate = True
+    simulation.shoe.shuffle()
+    for _ in range(nb_rounds):
+        simulation.play_round()
+    return simulation.players_statistics
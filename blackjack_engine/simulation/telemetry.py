@@ -0,0 +1,265 @@
+"""
+
+Live progress of long runs: counters updated once per chunk of rounds, instead of once per round, and sent to
+reporters (a callback, a JSON status file, a local HTTP endpoint, or a progress bar).
+
+"""
+import json
+import os
+import socket
+import threading
+import time
+from abc import ABC, abstractmethod
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from tqdm import tqdm
+
+
+class Telemetry:
+    """
+
+    Progress of a simulation's run, computed every 'every' rounds and sent to each reporter as a status dict:
+
+        * nb_rounds: number of rounds played so far in the run
+        * nb_rounds_target: number of rounds requested
+        * elapsed: wall time since the run (or its resumption) started, in seconds
+        * rounds_per_second: rounds played per second during the last chunk
+        * eta: estimated time left, in seconds, at the average speed since the start
+        * cards_delt, nb_shuffles: cards delt and shuffles of the shoe since the simulation was created (None in
+          parallel runs, whose shoes are in the workers)
+        * ev: running EV of each player, for a unit bet (None before the first round)
+        * finished: whether the run is over
+
+    The rounds are played by chunks between two updates, so the round loop itself pays nothing for the telemetry.
+
+    Parameters
+    ----------
+
+        reporters: list of BaseReporter or callable
+            Receivers of the status, a callable is wrapped in a CallbackReporter.
+
+        every: int
+            Number of rounds between two updates (per wave in parallel runs, which are updated after each wave).
+
+    Attributes
+    ----------
+
+        status: dict
+            Last status sent to the reporters.
+
+    """
+    def __init__(self, reporters=(), every=10000):
+        self.reporters = [reporter if isinstance(reporter, BaseReporter) else CallbackReporter(reporter)
+                          for reporter in reporters]
+        self.every = every
+        self.status = {}
+        self._start = None
+
+    def start(self, simulation, nb_rounds, parallel=False):
+        """ Starts following a run of nb_rounds rounds, from the rounds already played (when resuming). """
+        now = time.perf_counter()
+        self._start = (now, simulation.nb_rounds_played)
+        self._last = (now, simulation.nb_rounds_played)
+        self._nb_rounds_target = nb_rounds
+        # bets, gains and number of rounds summed so far in each player's history
+        self._totals = {name: (0., 0., 0) for name in simulation.players}
+        self.update(simulation, parallel=parallel)
+
+    def update(self, simulation, finished=False, parallel=False):
+        """ Computes the status of the run, and sends it to the reporters. """
+        now, nb_rounds = time.perf_counter(), simulation.nb_rounds_played
+        start_time, start_rounds = self._start
+        last_time, last_rounds = self._last
+        self._last = (now, nb_rounds)
+        elapsed = now - start_time
+        speed = (nb_rounds - start_rounds) / elapsed if elapsed > 0 else 0.
+        self.status = {
+            'nb_rounds': nb_rounds,
+            'nb_rounds_target': self._nb_rounds_target,
+            'elapsed': elapsed,
+            'rounds_per_second': (nb_rounds - last_rounds) / (now - last_time) if now > last_time else 0.,
+            'eta': 0. if finished else (self._nb_rounds_target - nb_rounds) / speed if speed else None,
+            'cards_delt': None if parallel else simulation.shoe.total_cards_delt,
+            'nb_shuffles': None if parallel else simulation.shoe.nb_shuffles,
+            'ev': self._running_evs(simulation),
+            'finished': finished,
+        }
+        for reporter in self.reporters:
+            reporter.report(self.status)
+
+    def close(self):
+        """ Called at the end of each run (see BaseReporter.close). """
+        for reporter in self.reporters:
+            reporter.close()
+
+    def _running_evs(self, simulation):
+        evs = {}
+        for name in simulation.players:
+            if simulation.aggregate:
+                statistics = simulation.players_statistics[name]
+                total_bets, total_gains = statistics.total_bets, statistics.total_gains
+            else:
+                # only the rounds recorded since the last update are summed
+                history = simulation.players_history[name]
+                total_bets, total_gains, nb_summed = self._totals[name]
+                total_bets += float(history['bets'][nb_summed:].sum())
+                total_gains += float(history['gains'][nb_summed:].sum())
+                self._totals[name] = (total_bets, total_gains, len(history))
+            evs[name] = total_gains / total_bets if total_bets else None
+        return evs
+
+
+class BaseReporter(ABC):
+    """ Receives the status of a run from its Telemetry, once per chunk of rounds. """
+
+    @abstractmethod
+    def report(self, status):
+        pass
+
+    def close(self):
+        """ Releases the resources of the reporter, called at the end of each run. """
+        pass
+
+
+class CallbackReporter(BaseReporter):
+    """ Calls a function with each status. """
+    def __init__(self, callback):
+        self.callback = callback
+
+    def report(self, status):
+        self.callback(status)
+
+
+class JSONStatusFile(BaseReporter):
+    """
+
+    Writes the last status to a JSON file, replaced atomically, e.g. to be polled by a batch scheduler.
+
+    Parameters
+    ----------
+
+        path: str
+            Path of the file.
+
+        interval: float
+            Minimum time between two writes, in seconds (the final status of a run is always written).
+
+    """
+    def __init__(self, path, interval=1.):
+        self.path = path
+        self.interval = interval
+        self._last_write = -float('inf')
+
+    def report(self, status):
+        now = time.perf_counter()
+        if status['finished'] or now - self._last_write >= self.interval:
+            self._last_write = now
+            temporary_path = self.path + '.tmp'
+            with open(temporary_path, 'w') as file:
+                json.dump(status, file)
+            os.replace(temporary_path, self.path)
+
+
+class StatusServer(BaseReporter):
+    """
+
+    Serves the last status as JSON over HTTP (GET on any path), from a background thread.
+
+    The server starts listening when created, and keeps serving the last status after the end of a run, until
+    'shutdown' is called.
+
+    Parameters
+    ----------
+
+        address: tuple or str
+            (host, port) to listen on, e.g. ('127.0.0.1', 0) for a free port, or path of a Unix socket (e.g. for
+            'curl --unix-socket <path> http://localhost/').
+
+    Attributes
+    ----------
+
+        address: tuple or str
+            Address the server listens on, with the actual port if 0 was given.
+
+    """
+    def __init__(self, address=('127.0.0.1', 0)):
+        self.status = {}
+        server_class = _UnixHTTPServer if isinstance(address, str) else ThreadingHTTPServer
+        self._server = server_class(address, _status_handler(self))
+        self.address = self._server.server_address
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def report(self, status):
+        self.status = status
+
+    def shutdown(self):
+        """ Stops the server. """
+        self._server.shutdown()
+        self._server.server_close()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.remove(self.address)
+
+
+class TqdmReporter(BaseReporter):
+    """
+
+    Progress bar, moved once per update, showing the players' running EV.
+
+    Parameters
+    ----------
+
+        **kwargs:
+            Parameters of the tqdm bar.
+
+    """
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self._bar = None
+
+    def report(self, status):
+        if self._bar is None:
+            self._bar = tqdm(total=status['nb_rounds_target'], initial=status['nb_rounds'], unit='rounds',
+                             **self.kwargs)
+        self._bar.set_postfix({name: f"{ev:+.4f}" for name, ev in status['ev'].items() if ev is not None},
+                              refresh=False)
+        self._bar.update(status['nb_rounds'] - self._bar.n)
+
+    def close(self):
+        if self._bar is not None:
+            self._bar.close()
+            self._bar = None
+
+
+def _status_handler(server):
+    """ Request handler answering the last status of a StatusServer. """
+    class StatusHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            body = json.dumps(server.status).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StatusHandler
+
+
+class _UnixHTTPServer(ThreadingHTTPServer):
+    """ HTTP server listening on a Unix socket. """
+    address_family = socket.AF_UNIX
+
+    def server_bind(self):
+        # HTTPServer.server_bind expects a (host, port) address
+        self.socket.bind(self.server_address)
+        self.server_address = self.socket.getsockname()
+        self.server_name, self.server_port = 'localhost', 0
+
+    def get_request(self):
+        request, _ = self.socket.accept()
+        # the client of a Unix socket has no address, the handler expects a (host, port)
+        return request, ('localhost', 0)
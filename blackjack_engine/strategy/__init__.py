@@ -1,2 +1,4 @@
+from .actions import *
 from .betting import *
 from .playing import *
+from .tables import *
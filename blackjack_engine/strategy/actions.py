@@ -0,0 +1,20 @@
+# integer codes of the players' actions
+STAND, HIT, DOUBLE, SPLIT, SURRENDER = 0, 1, 2, 3, 4
+actions_names = ['stand', 'hit', 'double', 'split', 'surrender']
+action_codes = {name: code for code, name in enumerate(actions_names)}
+
+# code of the last action of a hand on which the player has not decided anything yet
+NO_ACTION = -1
+
+
+def actions_bitmask(available_actions):
+    """ Bitmask of a list of actions names, in which the bit n°code of each available action is set. """
+    bitmask = 0
+    for action in available_actions:
+        bitmask |= 1 << action_codes[action]
+    return bitmask
+
+
+# available actions names of each bitmask, in the order of their codes
+bitmasks_actions = tuple(tuple(name for code, name in enumerate(actions_names) if bitmask >> code & 1)
+                         for bitmask in range(2 ** len(actions_names)))
@@ -11,11 +11,31 @@ class BaseBettingStrategy(ABC):
     Betting strategies must implement the abstact method 'declare_bet', which takes as arguments
     some information about the game (cards delt, remaining cards) and returns the player's bet for the turn.
 
+    Strategies can also override 'declare_bets', which receives the cards delt and remaining in many shoes at once
+    (arrays of shape (nb_shoes, 13)) and returns one bet per shoe. By default it calls 'declare_bet' on each shoe.
+    BatchSimulation bets through 'declare_bets', and so does BlackjackSimulation for the seats of a table sharing the
+    same strategy (with one row per seat) when it is overridden.
+
+    Strategies based on a card counting system can set 'counting_system' to its name (or to a CountingSystem): the
+    shoe then updates the count each time a card is delt, and 'declare_bet' receives the current true count as a
+    'true_count' keyword argument instead of having to compute it from the cards delt.
+
     """
+    counting_system = None
+
     @abstractmethod
     def declare_bet(self, cards_delt, remaining_cards):
         pass
 
+    def declare_bets(self, cards_delt, remaining_cards, **counts):
+        rows = zip(cards_delt, remaining_cards, *counts.values())
+        return np.array([self.declare_bet(delt, remaining, **dict(zip(counts, values)))
+                         for delt, remaining, *values in rows], dtype=float)
+
+    def reseed(self, seed):
+        """ Re-seeds the random generator of the strategy, if it has one. """
+        pass
+
 
 class ConstantBetting(BaseBettingStrategy):
     """
@@ -27,6 +47,9 @@ class ConstantBetting(BaseBettingStrategy):
     def declare_bet(self, cards_delt, remaining_cards):
         return self.betting_unit
 
+    def declare_bets(self, cards_delt, remaining_cards, **counts):
+        return np.full(len(cards_delt), self.betting_unit, dtype=float)
+
 
 class HiLowBetting(BaseBettingStrategy):
     """
@@ -36,15 +59,26 @@ class HiLowBetting(BaseBettingStrategy):
     Source: https://www.instructables.com/id/Card-Counting-and-Ranging-Bet-Sizes/
 
     """
+    counting_system = 'hi-lo'
+
     def __init__(self, betting_unit=1, max_spread=10):
         self.betting_unit = betting_unit
         self.max_spread = max_spread
 
-    def declare_bet(self, cards_delt, remaining_cards):
-        remaining_decks = np.sum(remaining_cards) / 52
-        running_count = cards_delt[1:6].sum() - cards_delt[0] - cards_delt[9:].sum()
-        true_count = running_count / remaining_decks
+    def declare_bet(self, cards_delt, remaining_cards, true_count=None):
+        if true_count is None:
+            remaining_decks = np.sum(remaining_cards) / 52
+            running_count = cards_delt[1:6].sum() - cards_delt[0] - cards_delt[9:].sum()
+            true_count = running_count / remaining_decks
         if true_count >= 2:
             return min(self.betting_unit * self.max_spread, self.betting_unit * (true_count - 1))
         else:
             return self.betting_unit
+
+    def declare_bets(self, cards_delt, remaining_cards, true_count=None):
+        if true_count is None:
+            remaining_decks = np.sum(remaining_cards, axis=1) / 52
+            running_count = cards_delt[:, 1:6].sum(axis=1) - cards_delt[:, 0] - cards_delt[:, 9:].sum(axis=1)
+            true_count = running_count / remaining_decks
+        ramp = np.minimum(self.betting_unit * self.max_spread, self.betting_unit * (true_count - 1))
+        return np.where(true_count >= 2, ramp, self.betting_unit)
@@ -1,5 +1,8 @@
 from abc import ABC, abstractmethod
-import random
+
+import numpy as np
+
+from blackjack_engine.strategy.actions import action_codes, bitmasks_actions
 
 
 class BasePlayingStrategy(ABC):
@@ -10,18 +13,81 @@ class BasePlayingStrategy(ABC):
     Playing strategies must implement the abstact method 'declare_action', which takes as arguments some information
     about the game (player hand, dealer card, remaining cards and available actions) and returns the player's action.
 
+    Strategies whose action only depends on the player's hand, the dealer's card and the available actions (and not
+    on the remaining cards, nor on any randomness) can set 'table_driven' to True, so that they can be played by the
+    vectorized BatchSimulation.
+
+    Strategies deviating from their play according to a card counting system can set 'counting_system' to its name
+    (or to a CountingSystem): 'declare_action' then receives the current true count as a 'true_count' keyword
+    argument.
+
+    Table-driven strategies can also override 'declare_actions', which takes the hands of several seats (and their
+    available actions) at once and returns one action per hand. BlackjackSimulation then declares the first action
+    of every seat sharing the strategy with a single call, instead of one call per seat.
+
+    The engine handles actions as integer codes (see the actions module). Strategies which can work with these codes
+    directly can set 'uses_action_codes' to True and override 'declare_action_code', which receives the available
+    actions as a bitmask and returns an action code, so that no list of actions names is built for them.
+
+    When the rules offer insurance, 'declare_insurance' is called with the player's first hand whenever the dealer
+    shows an Ace, and returns whether the player takes insurance (even money if the hand is a blackjack). Insurance
+    is declined by default.
+
     """
+    table_driven = False
+    counting_system = None
+    uses_action_codes = False
+
     @abstractmethod
     def declare_action(self, player_hand, dealer_card, remaining_cards, available_actions):
         return 'stand'
 
+    def declare_action_code(self, player_hand, dealer_card, remaining_cards, available_mask, **counts):
+        """ Same as declare_action, with the available actions as a bitmask, returning the code of the action. """
+        action = self.declare_action(player_hand, dealer_card, remaining_cards, bitmasks_actions[available_mask],
+                                     **counts)
+        return action_codes[action]
+
+    def declare_insurance(self, player_hand, remaining_cards, **counts):
+        return False
+
+    def declare_actions(self, player_hands, dealer_card, remaining_cards, available_actions):
+        return [self.declare_action(player_hand, dealer_card, remaining_cards, actions)
+                for player_hand, actions in zip(player_hands, available_actions)]
+
+    def reseed(self, seed):
+        """ Re-seeds the random generator of the strategy, if it has one. """
+        pass
+
 
 class RandomPlay(BasePlayingStrategy):
     """
+
     This strategy returns a random available action.
+
+    Parameters
+    ----------
+
+        seed: int, numpy.random.SeedSequence, numpy.random.Generator or None
+            Seed of the random generator used to pick actions (or the generator itself).
+
     """
+    def __init__(self, seed=None):
+        self.reseed(seed)
+
     def declare_action(self, player_hand, dealer_card, remaining_cards, available_actions):
-        return random.choice(available_actions)
+        # uniform draws are generated by blocks, to avoid calling the generator for each action
+        if self._next_draw == len(self._draws):
+            self.rng.random(out=self._draws)
+            self._next_draw = 0
+        draw = self._draws[self._next_draw]
+        self._next_draw += 1
+        return available_actions[int(draw * len(available_actions))]
+
+    def reseed(self, seed):
+        self.rng = np.random.default_rng(seed)
+        self._draws = np.empty(1024)
+        self._next_draw = len(self._draws)
 
 
 class BasicStrategy(BasePlayingStrategy):
@@ -33,14 +99,18 @@ class BasicStrategy(BasePlayingStrategy):
     Source: https://www.blackjackapprenticeship.com/blackjack-strategy-charts/
 
     """
+    table_driven = True
+
     def __init__(self, double_after_split=True):
         self.double_after_split = double_after_split
 
     def declare_action(self, player_hand, dealer_card, remaining_cards, available_actions):
+        # cards are compared as plain integers, which is faster than through Card.__eq__
+        dealer_card = int(dealer_card)
 
         # 3rd table: split or not
         if 'split' in available_actions:
-            player_card = player_hand.cards[0]
+            player_card = int(player_hand.cards[0])
 
             if player_card in [0, 7]:
                 return 'split'
@@ -0,0 +1,209 @@
+import itertools
+
+import numpy as np
+from tqdm import tqdm
+
+from blackjack_engine.strategy.actions import STAND, HIT, DOUBLE, SPLIT, actions_names  # noqa: F401
+from blackjack_engine.strategy.playing import BasePlayingStrategy
+
+
+# index of the first axis of a strategy table for hands that are not a pair
+NO_PAIR = 13
+
+# strategy tables are indexed by (pair index, is_soft, hand value, dealer's card, available actions mask)
+TABLE_SHAPE = (14, 2, 22, 13, 4)
+
+
+def representative_hands():
+    """
+
+    One representative hand for each state a table-driven strategy can be asked about.
+
+    Returns
+    -------
+
+        hands: dict<(int, bool, int), list of int>
+            Maps (pair index, is_soft, value) to a list of card ranks. The pair index is the rank of the paired
+            cards, or NO_PAIR.
+
+    """
+    # imported here, since the simulation package depends on the strategy package
+    from blackjack_engine.simulation.hand import Hand
+
+    hands = {}
+    for rank in range(13):
+        hand = Hand([rank, rank])
+        hands[(rank, hand.is_soft, hand.value)] = [rank, rank]
+    for nb_cards in [2, 3]:
+        for cards in itertools.combinations_with_replacement(range(13), nb_cards):
+            if nb_cards == 2 and cards[0] == cards[1]:
+                continue
+            hand = Hand(cards)
+            if hand.value < 21:
+                hands.setdefault((NO_PAIR, hand.is_soft, hand.value), list(cards))
+    return hands
+
+
+def masks_actions(mask):
+    """ Available actions corresponding to an available actions mask (1 if double is allowed, + 2 for split). """
+    available_actions = ['stand', 'hit']
+    if mask & 1:
+        available_actions.append('double')
+    if mask & 2:
+        available_actions.append('split')
+    return available_actions
+
+
+def tabulate_strategy(playing_strategy):
+    """
+
+    Query a table-driven playing strategy on every reachable decision, and store its answers in a dense table.
+
+    Parameters
+    ----------
+
+        playing_strategy: instance of BasePlayingStrategy
+            Strategy whose decisions only depend on the player's hand, the dealer's card and the available actions.
+
+    Returns
+    -------
+
+        table: array of shape (14, 2, 22, 13, 4)
+            Action code, indexed by (pair index, is_soft, hand value, dealer's card, available actions mask), where
+            the mask is 1 if the player can double down, plus 2 if he can split.
+
+    """
+    from blackjack_engine.simulation.cards import CARDS
+    from blackjack_engine.simulation.hand import Hand
+
+    if isinstance(playing_strategy, TableStrategy):
+        return playing_strategy.table.copy()
+    table = np.full(TABLE_SHAPE, STAND, dtype=np.int8)
+    for (pair_idx, is_soft, value), cards in representative_hands().items():
+        masks = range(4) if pair_idx != NO_PAIR else range(2)
+        for dealer_card, mask in itertools.product(range(13), masks):
+            available_actions = masks_actions(mask)
+            hand = Hand(cards, bet=1)
+            action = playing_strategy.declare_action(hand, CARDS[dealer_card], None, available_actions)
+            if action not in available_actions:
+                raise ValueError(f"{type(playing_strategy).__name__} declared '{action}' on {hand} against "
+                                 f"{dealer_card}, available actions were {available_actions}.")
+            table[pair_idx, int(is_soft), value, dealer_card, mask] = actions_names.index(action)
+    return table
+
+
+def generate_basic_strategy(game_rules=None, nb_decks=4, verbose=False):
+    """
+
+    Derive the optimal basic strategy for a set of rules and a number of decks.
+
+    For each hand (hard, soft or pair) and dealer's card, the expected value of each action is computed exactly by
+    CompositionAnalyzer, for a full shoe from which the dealer's card is removed. The player's initial cards are
+    drawn from that same composition, so that the analyses of all the hands share the dealer distributions cached by
+    the analyzer: generating a table takes a few minutes, and it can be saved with 'TableStrategy.save'.
+
+    Parameters
+    ----------
+
+        game_rules: BlackJackRules
+            Rules of the game (default rules if None).
+
+        nb_decks: int
+            Number of decks in the shoe.
+
+        verbose: bool
+            If True, displays a progress bar over the dealer's cards.
+
+    Returns
+    -------
+
+        strategy: TableStrategy
+            The optimal basic strategy, compiled into a table.
+
+    """
+    from blackjack_engine.simulation.analysis import CompositionAnalyzer
+    from blackjack_engine.simulation.hand import Hand
+    from blackjack_engine.simulation.rules import BlackJackRules
+
+    game_rules = game_rules if game_rules is not None else BlackJackRules()
+    analyzer = CompositionAnalyzer(game_rules)
+    hands = representative_hands()
+    table = np.full(TABLE_SHAPE, STAND, dtype=np.int8)
+    # ten-valued cards (10, J, Q, K) lead to the same expected values, which are computed once
+    for dealer_card in tqdm(range(10), disable=not verbose):
+        composition = np.full(13, 4 * nb_decks)
+        composition[dealer_card] -= 1
+        expected_values_cache = {}
+        for (pair_idx, is_soft, value), cards in hands.items():
+            key = tuple(min(card, 9) for card in cards)
+            if key not in expected_values_cache:
+                expected_values_cache[key] = analyzer.expected_values(Hand(cards), dealer_card, composition)
+            expected_values = expected_values_cache[key]
+            for mask in range(4) if pair_idx != NO_PAIR else range(2):
+                actions = [action for action in masks_actions(mask) if action in expected_values]
+                best_action = max(actions, key=expected_values.get)
+                table[pair_idx, int(is_soft), value, dealer_card:dealer_card + 1 if dealer_card < 9 else 13, mask] = \
+                    actions_names.index(best_action)
+    return TableStrategy(table)
+
+
+class TableStrategy(BasePlayingStrategy):
+    """
+
+    Playing strategy reading its decisions in a table, with a single indexed read per decision.
+
+    Tables can be generated for any rules with 'generate_basic_strategy', compiled from any table-driven strategy
+    with 'tabulate_strategy', and saved to / loaded from disk.
+
+    Parameters
+    ----------
+
+        table: array of shape (14, 2, 22, 13, 4)
+            Action code, indexed by (pair index, is_soft, hand value, dealer's card, available actions mask).
+            The pair index is the rank of the paired cards (or 13 if the hand is not a pair), and the mask is 1 if the
+            player can double down, plus 2 if he can split.
+
+    """
+    table_driven = True
+    uses_action_codes = True
+
+    def __init__(self, table):
+        table = np.asarray(table, dtype=np.int8)
+        assert table.shape == TABLE_SHAPE, f"The table must have a shape {TABLE_SHAPE}."
+        self.table = table
+        # flat tuples of actions codes and names, faster to index than the numpy table
+        self._codes = tuple(table.reshape(-1).tolist())
+        self._actions = tuple(actions_names[action] for action in self._codes)
+
+    def declare_action(self, player_hand, dealer_card, remaining_cards, available_actions):
+        cards = player_hand.cards
+        pair_idx = int(cards[0]) if player_hand.is_pair else NO_PAIR
+        mask = ('double' in available_actions) + 2 * ('split' in available_actions)
+        index = (((pair_idx * 2 + player_hand.is_soft) * 22 + player_hand.value) * 13 + int(dealer_card)) * 4 + mask
+        return self._actions[index]
+
+    def declare_action_code(self, player_hand, dealer_card, remaining_cards, available_mask):
+        pair_idx = int(player_hand.cards[0]) if player_hand.is_pair else NO_PAIR
+        # the double and split bits of the available actions give the mask of the table
+        mask = available_mask >> DOUBLE & 3
+        index = (((pair_idx * 2 + player_hand.is_soft) * 22 + player_hand.value) * 13 + int(dealer_card)) * 4 + mask
+        return self._codes[index]
+
+    def declare_actions(self, player_hands, dealer_card, remaining_cards, available_actions):
+        table_actions, dealer_card = self._actions, int(dealer_card)
+        actions = []
+        for player_hand, available in zip(player_hands, available_actions):
+            pair_idx = int(player_hand.cards[0]) if player_hand.is_pair else NO_PAIR
+            mask = ('double' in available) + 2 * ('split' in available)
+            index = (((pair_idx * 2 + player_hand.is_soft) * 22 + player_hand.value) * 13 + dealer_card) * 4 + mask
+            actions.append(table_actions[index])
+        return actions
+
+    def save(self, path):
+        """ Saves the table in a .npy file. """
+        np.save(path, self.table)
+
+    @classmethod
+    def load(cls, path):
+        """ Loads a strategy saved with 'save'. """
+        return cls(np.load(path))
@@ -18,9 +18,15 @@ setup(
     packages=['blackjack_engine', 'blackjack_engine.simulation', 'blackjack_engine.strategy'],
     python_requires='>=3.3',
     install_requires=[
-        "numpy >= 1.0",
+        "numpy >= 1.25",
         "tqdm >= 4.0"
     ],
+    entry_points={
+        "console_scripts": [
+            "blackjack-benchmark = blackjack_engine.benchmark:main",
+            "blackjack-shoes = blackjack_engine.simulation.streams:main"
+        ]
+    },
     extra_requires={
         "dev": [
             "pytest >= 3.7"
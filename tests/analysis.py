@@ -0,0 +1,68 @@
+import unittest
+import numpy as np
+
+from blackjack_engine.simulation.analysis import CompositionAnalyzer, BUST, BLACKJACK
+from blackjack_engine.simulation.hand import Hand
+from blackjack_engine.simulation.rules import BlackJackRules
+
+
+class TestCompositionAnalyzer(unittest.TestCase):
+
+    def setUp(self):
+        self.analyzer = CompositionAnalyzer(BlackJackRules(max_hands=2))
+        self.composition = np.full(13, 4)
+
+    def test_dealer_distribution(self):
+        for up_card in range(10):
+            distribution = self.analyzer.dealer_distribution(self.composition, [up_card])
+            self.assertAlmostEqual(distribution.sum(), 1)
+
+    def test_only_tens(self):
+        # only ten-valued cards are left: the dealer busts on 6 + 10 + 10, and the player busts if he hits 16
+        composition = [0] * 9 + [4, 4, 4, 4]
+        expected_values = self.analyzer.expected_values(Hand([9, 5]), 5, composition)
+        self.assertEqual(expected_values['stand'], 1)
+        self.assertEqual(expected_values['hit'], -1)
+        self.assertEqual(expected_values['double'], -2)
+
+    def test_stand_value(self):
+        # with a 16, the player only wins if the dealer busts
+        expected_values = self.analyzer.expected_values(Hand([9, 5]), 8, self.composition)
+        distribution = self.analyzer.dealer_distribution(self.composition, [8])
+        self.assertAlmostEqual(expected_values['stand'], 2 * distribution[BUST] - 1)
+
+    def test_blackjack(self):
+        expected_values = self.analyzer.expected_values(Hand([0, 12]), 9, self.composition)
+        self.assertEqual(list(expected_values), ['stand'])
+        self.assertLess(expected_values['stand'], 1.5)
+
+    def test_split(self):
+        action, _ = self.analyzer.best_action(Hand([7, 7]), 5, self.composition)
+        self.assertEqual(action, 'split')
+
+    def test_dealer_peek(self):
+        # decisions are taken once the dealer has no blackjack
+        analyzer = CompositionAnalyzer(BlackJackRules(max_hands=2, dealer_peek=True))
+        for up_card in [0, 9]:
+            distribution = self.analyzer.dealer_distribution(self.composition, [up_card])
+            peeked = analyzer.dealer_distribution(self.composition, [up_card])
+            self.assertEqual(peeked[BLACKJACK], 0)
+            self.assertTrue(np.allclose(peeked[:BLACKJACK], distribution[:BLACKJACK] / (1 - distribution[BLACKJACK])))
+        self.assertEqual(analyzer.expected_values(Hand([0, 12]), 9, self.composition)['stand'], 1.5)
+
+    def test_double_on_after_split(self):
+        # after splitting 2s against a 6, the split hands can be doubled on fewer totals
+        values = [CompositionAnalyzer(BlackJackRules(max_hands=2, double_on=double_on)).expected_values(
+            Hand([1, 1]), 5, self.composition)['split'] for double_on in ['any', '9-11', '10-11']]
+        self.assertGreater(values[0], values[1])
+        self.assertGreater(values[1], values[2])
+
+    def test_unsupported_rules(self):
+        with self.assertRaises(ValueError):
+            CompositionAnalyzer(BlackJackRules(max_hands=3, resplit_aces=True))
+        with self.assertRaises(ValueError):
+            CompositionAnalyzer(BlackJackRules(surrender='early', dealer_peek=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+
+from blackjack_engine.simulation import BlackjackSimulation
+from blackjack_engine.simulation.bankroll import BankrollTracker, analyze_bankroll, bootstrap_bankroll, load_stream
+from blackjack_engine.strategy import BasicStrategy, HiLowBetting
+
+
+def naive_metrics(gains, bankroll):
+    capital, peak, max_drawdown, ruin_round, double_round = bankroll, bankroll, 0, -1, -1
+    for i, gain in enumerate(gains):
+        capital += gain
+        peak = max(peak, capital)
+        max_drawdown = max(max_drawdown, peak - capital)
+        if capital <= 0 and ruin_round < 0:
+            ruin_round = i + 1
+        if capital >= 2 * bankroll and double_round < 0 and ruin_round < 0:
+            double_round = i + 1
+    return max_drawdown, ruin_round, double_round
+
+
+class TestBankrollTracker(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.bets = rng.integers(1, 5, size=5000).astype(float)
+        self.gains = self.bets * rng.choice([-1, 0, 1, 1.5], size=5000, p=[0.48, 0.08, 0.4, 0.04])
+
+    def test_metrics(self):
+        for bankroll in [20, 100, 1000]:
+            tracker = analyze_bankroll({'bets': self.bets, 'gains': self.gains}, bankroll, chunk_size=333)
+            max_drawdown, ruin_round, double_round = naive_metrics(self.gains, bankroll)
+            self.assertAlmostEqual(tracker.max_drawdown[0], max_drawdown)
+            self.assertEqual(tracker.ruin_round[0], ruin_round)
+            self.assertEqual(tracker.double_round[0], double_round)
+            self.assertAlmostEqual(tracker.capital[0], bankroll + self.gains.sum())
+            self.assertAlmostEqual(tracker.statistics.n0, np.var(self.gains, ddof=1) / np.mean(self.gains) ** 2)
+
+    def test_trajectories(self):
+        gains = self.gains.reshape(-1, 10)
+        tracker = BankrollTracker(50, nb_trajectories=10)
+        tracker.update(self.bets.reshape(-1, 10), gains)
+        for trajectory in range(10):
+            max_drawdown, ruin_round, double_round = naive_metrics(gains[:, trajectory], 50)
+            self.assertAlmostEqual(tracker.max_drawdown[trajectory], max_drawdown)
+            self.assertEqual(tracker.ruin_round[trajectory], ruin_round)
+            self.assertEqual(tracker.double_round[trajectory], double_round)
+
+    def test_live(self):
+        simulation = BlackjackSimulation(nb_decks=2, seed=0)
+        simulation.register_player("Bob", HiLowBetting(), BasicStrategy())
+        tracker = BankrollTracker(100)
+        for _ in range(3):
+            history = simulation.run(nb_rounds=500)
+            tracker.update_from(history["Bob"])
+        self.assertEqual(tracker.nb_rounds, 1500)
+        self.assertAlmostEqual(tracker.capital[0], 100 + history["Bob"]["gains"].sum())
+
+
+class TestBootstrap(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.stream = {'bets': np.ones(1000), 'gains': rng.choice([-1., 1.], size=1000)}
+
+    def test_reproducible(self):
+        tracker = bootstrap_bankroll(self.stream, 20, nb_trajectories=200, nb_rounds=500, block_size=8, seed=0)
+        other = bootstrap_bankroll(self.stream, 20, nb_trajectories=200, nb_rounds=500, block_size=8, seed=0)
+        self.assertEqual(tracker.nb_rounds, 500)
+        self.assertEqual(len(tracker.max_drawdown), 200)
+        self.assertTrue(np.array_equal(tracker.capital, other.capital))
+        self.assertTrue(0 < tracker.risk_of_ruin < 1)
+
+    def test_parallel(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'stream.npz')
+            np.savez(path, **self.stream)
+            self.assertTrue(np.array_equal(load_stream(path)[1], self.stream['gains']))
+            tracker = bootstrap_bankroll(path, 20, nb_trajectories=101, nb_rounds=300, seed=0, nb_workers=2)
+        self.assertEqual(tracker.nb_trajectories, 101)
+        self.assertEqual(tracker.statistics.nb_rounds, 101 * 300)
+
+
+if __name__ == '__main__':
+    unittest.main()
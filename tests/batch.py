@@ -0,0 +1,73 @@
+import unittest
+import numpy as np
+
+from blackjack_engine.simulation import BatchSimulation, BlackjackSimulation
+from blackjack_engine.strategy.tables import tabulate_strategy, actions_names
+from blackjack_engine.strategy import BasicStrategy, RandomPlay, ConstantBetting, HiLowBetting
+
+
+class TestBatchSimulation(unittest.TestCase):
+
+    def setUp(self):
+        self.simulation = BatchSimulation(nb_shoes=100, nb_decks=1, penetration=0.5, seed=0)
+        self.simulation.register_player("Bob", ConstantBetting(), BasicStrategy())
+
+    def test_history(self):
+        history = self.simulation.run(nb_rounds=1050)
+        self.assertEqual(history["Bob"]["bets"].shape, (1050,))
+        self.assertEqual(history["Bob"]["gains"].shape, (1050,))
+        self.assertTrue(np.all(history["Bob"]["bets"] >= 1))
+
+    def test_seed(self):
+        simulation = BatchSimulation(nb_shoes=100, nb_decks=1, penetration=0.5, seed=0)
+        simulation.register_player("Bob", ConstantBetting(), BasicStrategy())
+        gains = simulation.run(nb_rounds=1000)["Bob"]["gains"]
+        self.assertTrue(np.all(gains == self.simulation.run(nb_rounds=1000)["Bob"]["gains"]))
+
+    def test_cards_delt(self):
+        self.simulation.run(nb_rounds=500)
+        self.assertTrue(np.all(self.simulation.delt_cards.sum(axis=1) == self.simulation.nb_cards_delt))
+        self.assertTrue(np.all(self.simulation.nb_cards_delt < 52))
+
+    def test_not_table_driven(self):
+        with self.assertRaises(ValueError):
+            self.simulation.register_player("Patrick", ConstantBetting(), RandomPlay())
+
+    def test_same_as_simulation(self):
+        for seed in range(10):
+            rules = dict(nb_decks=2, penetration=1, max_hands=4, double_after_split=seed % 2 == 0,
+                         hit_soft_17=seed % 3 == 0, seed=seed)
+            simulation = BlackjackSimulation(**rules)
+            batch = BatchSimulation(nb_shoes=1, **rules)
+            for name in ["Bob", "Patrick"]:
+                simulation.register_player(name, HiLowBetting(), BasicStrategy())
+                batch.register_player(name, HiLowBetting(), BasicStrategy())
+            batch.cards_order[0] = simulation.shoe.cards_order
+            while simulation.shoe.nb_cards_delt < 70:
+                simulation.play_round()
+                bets, gains = batch.play_round()
+                for i, name in enumerate(["Bob", "Patrick"]):
+                    self.assertAlmostEqual(simulation.players_history[name]["bets"][-1], bets[i, 0])
+                    self.assertAlmostEqual(simulation.players_history[name]["gains"][-1], gains[i, 0])
+
+
+class TestTabulation(unittest.TestCase):
+
+    def test_basic_strategy(self):
+        table = tabulate_strategy(BasicStrategy())
+        # hard 11 vs 6 -> double, soft 18 vs 10 -> hit, pair of 8 vs Ace -> split
+        self.assertEqual(actions_names[table[13, 0, 11, 5, 1]], 'double')
+        self.assertEqual(actions_names[table[13, 1, 18, 9, 1]], 'hit')
+        self.assertEqual(actions_names[table[7, 0, 16, 0, 3]], 'split')
+        self.assertEqual(actions_names[table[7, 0, 16, 0, 1]], 'hit')
+
+    def test_hi_low_bets(self):
+        betting_strategy = HiLowBetting(max_spread=8)
+        cards_delt = np.random.randint(0, 4, size=(50, 13))
+        remaining_cards = 8 - cards_delt
+        bets = [betting_strategy.declare_bet(delt, remaining) for delt, remaining in zip(cards_delt, remaining_cards)]
+        self.assertTrue(np.allclose(bets, betting_strategy.declare_bets(cards_delt, remaining_cards)))
+
+
+if __name__ == '__main__':
+    unittest.main()
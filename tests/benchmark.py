@@ -0,0 +1,25 @@
+import unittest
+
+from blackjack_engine.benchmark import compare, micro_benchmarks, simulation_benchmark
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_simulation_benchmark(self):
+        self.assertGreater(simulation_benchmark(1, 2, 'basic', 'hilo', nb_rounds=100, repeat=1), 0)
+
+    def test_micro_benchmarks(self):
+        results = micro_benchmarks(number=100, repeat=1)
+        self.assertIn('micro/shoe.deal_card', results)
+        self.assertTrue(all(value > 0 for value in results.values()))
+
+    def test_compare(self):
+        baseline = {'results': {'a': 100., 'b': 100., 'c': 100.}}
+        results = {'results': {'a': 95., 'b': 80., 'd': 10.}}
+        comparison, regressions = compare(results, baseline, tolerance=0.1)
+        self.assertEqual(comparison, {'a': 0.95, 'b': 0.8})
+        self.assertEqual(regressions, ['b'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+import numpy as np
+
+from blackjack_engine.simulation.analysis import CompositionAnalyzer
+from blackjack_engine.simulation.dealer import DealerOutcomeCache
+from blackjack_engine.simulation.rules import BlackJackRules
+
+
+class TestDealerOutcomeCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = DealerOutcomeCache()
+        self.analyzer = CompositionAnalyzer()
+
+    def test_exact(self):
+        composition = np.full(13, 4)
+        composition[[2, 9]] = 2
+        for up_card in range(13):
+            self.assertTrue(np.allclose(self.cache.distribution(up_card, composition),
+                                        self.analyzer.dealer_distribution(composition, [up_card])))
+
+    def test_buckets(self):
+        composition = np.full(13, 24)
+        composition[[3, 4, 11]] = [20, 21, 15]
+        for up_card in range(10):
+            distribution = self.cache.distribution(up_card, composition)
+            self.assertAlmostEqual(distribution.sum(), 1)
+            self.assertTrue(np.allclose(distribution, self.analyzer.dealer_distribution(composition, [up_card]),
+                                        atol=0.01))
+        # ten-valued up-cards, and compositions with the same proportions share their distribution
+        self.cache.distribution(12, composition)
+        self.cache.distribution(9, 2 * composition)
+        self.assertEqual(self.cache.cache_info().hits, 2)
+
+    def test_hit_soft_17(self):
+        composition = np.full(13, 24)
+        stand_soft_17 = DealerOutcomeCache(BlackJackRules(hit_soft_17=False)).outcomes(0, composition)
+        hit_soft_17 = self.cache.outcomes(0, composition)
+        self.assertGreater(stand_soft_17['17'], hit_soft_17['17'])
+
+    def test_shared(self):
+        self.assertIs(DealerOutcomeCache.shared(BlackJackRules()), DealerOutcomeCache.shared())
+        self.assertIsNot(DealerOutcomeCache.shared(BlackJackRules(hit_soft_17=False)), DealerOutcomeCache.shared())
+        with self.assertRaises(ValueError):
+            self.cache.distribution(5, np.full(13, 4))[0] = 1
+
+
+if __name__ == '__main__':
+    unittest.main()
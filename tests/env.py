@@ -0,0 +1,95 @@
+import unittest
+import numpy as np
+
+from blackjack_engine.simulation import BlackjackSimulation
+from blackjack_engine.simulation.env import VectorEnv
+from blackjack_engine.strategy import BasicStrategy, ConstantBetting, TableStrategy, tabulate_strategy
+from blackjack_engine.strategy.actions import DOUBLE, SURRENDER
+from blackjack_engine.strategy.tables import NO_PAIR
+
+
+class SurrenderingStrategy(TableStrategy):
+    """ Reads its decisions in a table, but surrenders hard 15 and 16 whenever possible. """
+
+    def declare_action_code(self, player_hand, dealer_card, remaining_cards, available_mask):
+        if available_mask >> SURRENDER & 1 and not player_hand.is_soft and player_hand.value in (15, 16):
+            return SURRENDER
+        return super().declare_action_code(player_hand, dealer_card, remaining_cards, available_mask)
+
+
+class TestVectorEnv(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.table = tabulate_strategy(BasicStrategy())
+
+    def policy(self, observations, masks):
+        """ Same decisions as SurrenderingStrategy, for every table at once. """
+        value, soft, pair, dealer_card = observations[:, :4].astype(np.intp).T
+        actions = self.table[np.where(pair >= 0, pair, NO_PAIR), soft, value, dealer_card, masks >> DOUBLE & 3]
+        surrender = (masks >> SURRENDER & 1 == 1) & (soft == 0) & ((value == 15) | (value == 16))
+        return np.where(surrender, SURRENDER, actions)
+
+    def test_same_as_simulation(self):
+        for seed in range(10):
+            rules = dict(nb_decks=2, penetration=1, max_hands=2 + seed % 3, double_after_split=seed % 2 == 0,
+                         hit_soft_17=seed % 3 == 0, dealer_peek=seed % 4 == 1, resplit_aces=seed % 5 == 0,
+                         surrender=['none', 'late'][seed % 2])
+            simulation = BlackjackSimulation(seed=seed, **rules)
+            simulation.register_player("Bob", ConstantBetting(), SurrenderingStrategy(self.table))
+            env = VectorEnv(nb_tables=1, **rules)
+            env.cards_order[0] = simulation.shoe.cards_order
+            observations, masks = env.reset(shuffle=False)
+            total_rewards = env.rewards.sum()
+            while simulation.shoe.nb_cards_delt < 70:
+                observations, masks, rewards, dones, infos = env.step(self.policy(observations, masks))
+                total_rewards += rewards.sum()
+                while len(simulation.players_history["Bob"]) < env.nb_rounds_played:
+                    simulation.play_round()
+                if dones[0]:
+                    self.assertAlmostEqual(simulation.players_history["Bob"]["gains"].sum(), total_rewards)
+
+    def test_step(self):
+        env = VectorEnv(nb_tables=100, nb_decks=1, penetration=0.5, seed=0)
+        observations, masks = env.reset()
+        nb_rounds = env.infos['nb_rounds'].sum()
+        for _ in range(500):
+            outputs = env.step(self.policy(observations, masks))
+            # outputs are preallocated, and updated in place
+            self.assertIs(outputs[0], observations)
+            self.assertTrue(np.all(masks != 0))
+            self.assertTrue(np.all(outputs[3] == (outputs[4]['nb_rounds'] > 0)))
+            nb_rounds += outputs[4]['nb_rounds'].sum()
+        self.assertEqual(nb_rounds, env.nb_rounds_played)
+        self.assertTrue(np.all(env.delt_cards.sum(axis=1) == env.nb_cards_delt))
+        self.assertTrue(np.all(env.nb_cards_delt < 52))
+        # hi-lo true counts, from the cards delt
+        hi_lo = np.array([-1, 1, 1, 1, 1, 1, 0, 0, 0, -1, -1, -1, -1])
+        true_counts = env.delt_cards @ hi_lo / ((52 - env.nb_cards_delt) / 52)
+        self.assertTrue(np.allclose(observations[:, env.observation_names.index('true_count_hi-lo')], true_counts))
+
+    def test_exhausted_shoes(self):
+        env = VectorEnv(nb_tables=20, nb_decks=1, penetration=1, seed=0)
+        observations, masks = env.reset()
+        nb_exhausted = 0
+        for _ in range(300):
+            observations, masks, *_ = env.step(self.policy(observations, masks))
+            nb_exhausted += (env.nb_cards_delt == 52).sum()
+            self.assertTrue(np.all(np.isfinite(observations)))
+        self.assertGreater(nb_exhausted, 0)
+
+    def test_unavailable_action(self):
+        env = VectorEnv(nb_tables=10, surrender='none', seed=0)
+        env.reset()
+        with self.assertRaises(ValueError):
+            env.step(np.full(10, SURRENDER))
+        with self.assertRaises(ValueError):
+            env.step(np.zeros(5, dtype=int))
+
+    def test_early_surrender_with_peek(self):
+        with self.assertRaises(ValueError):
+            VectorEnv(surrender='early', dealer_peek=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,238 @@
+import json
+import os
+import tempfile
+import unittest
+import numpy as np
+
+from blackjack_engine.simulation import BlackjackSimulation
+from blackjack_engine.simulation.events import JSONLinesSink, RingBufferSink
+from blackjack_engine.strategy import (RandomPlay, ConstantBetting, HiLowBetting, BasicStrategy, TableStrategy,
+                                       tabulate_strategy)
+
+
+def make_simulation(seed, **kwargs):
+    simulation = BlackjackSimulation(nb_decks=1, penetration=0.5, seed=seed, **kwargs)
+    simulation.register_player("Bob", ConstantBetting(), RandomPlay(seed=seed))
+    simulation.register_player("Patrick", ConstantBetting(2), RandomPlay(seed=seed))
+    return simulation
+
+
+def same_histories(history, other):
+    return all(np.array_equal(history[name][column], other[name][column])
+               for name in history for column in history[name].keys())
+
+
+class TestParallelRun(unittest.TestCase):
+
+    def test_history(self):
+        history = make_simulation(seed=0).run(nb_rounds=101, nb_workers=3)
+        for name in ["Bob", "Patrick"]:
+            self.assertEqual(len(history[name]["bets"]), 101)
+            self.assertEqual(len(history[name]["gains"]), 101)
+
+    def test_reproducible(self):
+        history = make_simulation(seed=0).run(nb_rounds=300, nb_workers=3)
+        self.assertTrue(same_histories(history, make_simulation(seed=0).run(nb_rounds=300, nb_workers=3)))
+        self.assertFalse(same_histories(history, make_simulation(seed=1).run(nb_rounds=300, nb_workers=3)))
+
+    def test_history_columns(self):
+        columns = ['nb_hands', 'doubled']
+        history = make_simulation(seed=0, history_columns=columns).run(nb_rounds=100, nb_workers=2)
+        self.assertEqual(len(history["Bob"]["nb_hands"]), 100)
+
+
+class TestSeed(unittest.TestCase):
+
+    def test_reproducible(self):
+        history = make_simulation(seed=0).run(nb_rounds=300)
+        self.assertTrue(same_histories(history, make_simulation(seed=0).run(nb_rounds=300)))
+
+    def test_replay_round(self):
+        simulation = make_simulation(seed=0)
+        history = simulation.run(nb_rounds=50)
+        for round_idx in [0, 17, 49]:
+            bets, gains = simulation.replay_round(round_idx, verbose=False)
+            for name in ["Bob", "Patrick"]:
+                self.assertEqual(bets[name], history[name]["bets"][round_idx])
+                self.assertEqual(gains[name], history[name]["gains"][round_idx])
+        self.assertEqual(len(history["Bob"]["bets"]), 50)
+
+
+class TestEvents(unittest.TestCase):
+
+    def test_same_as_quiet_run(self):
+        sink = RingBufferSink(capacity=100)
+        history = make_simulation(seed=0).run(nb_rounds=500, event_sink=sink)
+        self.assertTrue(same_histories(history, make_simulation(seed=0).run(nb_rounds=500)))
+        self.assertEqual(len(sink), 100)
+        self.assertEqual(sink.events[-1]['round'], 499)
+
+    def test_payouts(self):
+        sink = RingBufferSink(capacity=None)
+        history = make_simulation(seed=0).run(nb_rounds=200, event_sink=sink)
+        gains = np.zeros(200)
+        for event in sink:
+            if event['event'] == 'payout' and event['player'] == 'Bob':
+                gains[event['round']] += event['gains']
+        self.assertTrue(np.array_equal(gains, history['Bob']['gains']))
+
+    def test_jsonl(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'events.jsonl')
+            make_simulation(seed=0).run(nb_rounds=10, event_sink=JSONLinesSink(path))
+            with open(path) as file:
+                events = [json.loads(line) for line in file]
+        self.assertEqual({event['round'] for event in events}, set(range(10)))
+        self.assertEqual(sum(event['event'] == 'bet' for event in events), 20)
+
+
+class TestSharedStrategies(unittest.TestCase):
+
+    def make_table(self, shared):
+        simulation = BlackjackSimulation(nb_decks=2, seed=0)
+        table = tabulate_strategy(BasicStrategy())
+        betting_strategy, playing_strategy = HiLowBetting(), TableStrategy(table)
+        for i in range(7):
+            if not shared:
+                betting_strategy, playing_strategy = HiLowBetting(), TableStrategy(table)
+            simulation.register_player(f"seat_{i}", betting_strategy, playing_strategy)
+        return simulation
+
+    def test_batches(self):
+        simulation = self.make_table(shared=True)
+        self.assertEqual([len(names) for _, names in simulation._betting_batches], [7])
+        self.assertEqual([len(names) for _, names in simulation._playing_batches], [7])
+        self.assertEqual(simulation._single_bettors, [])
+        simulation = self.make_table(shared=False)
+        self.assertEqual(simulation._betting_batches + simulation._playing_batches, [])
+        # strategies without batched methods, or depending on the cards delt, are called seat by seat
+        simulation = BlackjackSimulation(seed=0)
+        betting_strategy, playing_strategy = HiLowBetting(), RandomPlay()
+        simulation.register_player("Bob", betting_strategy, playing_strategy)
+        simulation.register_player("Patrick", betting_strategy, playing_strategy)
+        self.assertEqual(simulation._playing_batches, [])
+
+    def test_same_as_per_seat(self):
+        history = self.make_table(shared=True).run(nb_rounds=2000)
+        self.assertTrue(same_histories(history, self.make_table(shared=False).run(nb_rounds=2000)))
+        sink = RingBufferSink(capacity=None)
+        self.assertTrue(same_histories(history, self.make_table(shared=True).run(nb_rounds=2000, event_sink=sink)))
+
+
+class TestProfiling(unittest.TestCase):
+
+    def test_profile(self):
+        simulation = make_simulation(seed=0)
+        history = simulation.run(nb_rounds=300, profile=True)
+        self.assertTrue(same_histories(history, make_simulation(seed=0).run(nb_rounds=300)))
+        report = simulation.profiler.report()
+        for phase in ['betting_round', 'deal_cards', 'player_turn/Bob', 'declare_bet/Patrick', 'dealer_turn',
+                      'evaluate_gains']:
+            self.assertIn(phase, report)
+        self.assertEqual(report['player_turn/Bob']['calls'], 300)
+        self.assertGreaterEqual(report['declare_action/Bob']['calls'], 300)
+        self.assertNotIn('player_turn', vars(simulation))
+        self.assertNotIn('declare_action_code', vars(simulation.players['Bob']))
+
+
+class Preempted(Exception):
+    pass
+
+
+class PreemptedBetting(ConstantBetting):
+    """ Interrupts the first run reaching its n°preempt_at bet, as a preemption would. """
+    preempt_at = None
+
+    def __init__(self):
+        super().__init__()
+        self.nb_bets = 0
+
+    def declare_bet(self, cards_delt, remaining_cards):
+        self.nb_bets += 1
+        if self.nb_bets == PreemptedBetting.preempt_at:
+            PreemptedBetting.preempt_at = None
+            raise Preempted
+        return super().declare_bet(cards_delt, remaining_cards)
+
+
+class TestCheckpoints(unittest.TestCase):
+
+    def make_table(self, seed=0):
+        simulation = make_simulation(seed, history_columns=['true_count', 'doubled'])
+        simulation.register_player("Stan", PreemptedBetting(), RandomPlay(seed=seed))
+        return simulation
+
+    def test_resume(self):
+        path = os.path.join(tempfile.mkdtemp(), 'run.ckpt')
+        for aggregate in [False, True]:
+            PreemptedBetting.preempt_at = 750
+            with self.assertRaises(Preempted):
+                self.make_table().run(nb_rounds=1000, aggregate=aggregate, checkpoint=path, checkpoint_every=300)
+            simulation = BlackjackSimulation.from_checkpoint(path)
+            self.assertEqual(simulation.nb_rounds_played, 600)
+            results = simulation.resume()
+            expected = self.make_table().run(nb_rounds=1000, aggregate=aggregate)
+            if aggregate:
+                self.assertEqual(results["Stan"].to_dict(), expected["Stan"].to_dict())
+            else:
+                self.assertTrue(same_histories(results, expected))
+            # a finished run is not played again
+            self.assertEqual(BlackjackSimulation.from_checkpoint(path).resume()["Bob"].nb_rounds, 1000)
+
+    def test_replay_round(self):
+        path = os.path.join(tempfile.mkdtemp(), 'run.ckpt')
+        history = self.make_table().run(nb_rounds=100, checkpoint=path, checkpoint_every=30)
+        simulation = BlackjackSimulation.from_checkpoint(path)
+        self.assertEqual(simulation.replay_round(42, verbose=False)[1]["Bob"], history["Bob"]["gains"][42])
+
+    def test_parallel(self):
+        with self.assertRaises(ValueError):
+            make_simulation(seed=0).run(nb_rounds=100, nb_workers=2, checkpoint="run.ckpt")
+
+
+class InsuredRandomPlay(RandomPlay):
+
+    def declare_insurance(self, player_hand, remaining_cards):
+        return True
+
+
+class TestOptionalRules(unittest.TestCase):
+
+    rules = {'surrender': 'early', 'dealer_peek': True, 'insurance': True, 'resplit_aces': True, 'double_on': '9-11'}
+
+    def make_table(self, seed=0):
+        simulation = BlackjackSimulation(nb_decks=1, penetration=0.5, max_hands=4, seed=seed, **self.rules)
+        simulation.register_player("Bob", ConstantBetting(), InsuredRandomPlay(seed=seed))
+        simulation.register_player("Patrick", ConstantBetting(2), RandomPlay(seed=seed))
+        return simulation
+
+    def test_events(self):
+        sink = RingBufferSink(capacity=None)
+        history = self.make_table().run(nb_rounds=2000, event_sink=sink)
+        self.assertTrue(same_histories(history, self.make_table().run(nb_rounds=2000)))
+        kinds = {event['event'] for event in sink}
+        self.assertTrue({'insurance', 'even_money', 'peek', 'insurance_payout'} <= kinds)
+        actions = {event['action'] for event in sink if event['event'] == 'action'}
+        self.assertIn('surrender', actions)
+
+    def test_gains(self):
+        sink = RingBufferSink(capacity=None)
+        history = self.make_table().run(nb_rounds=2000, event_sink=sink)
+        # insurance bets are added to the bets of the round, even money is paid 1:1
+        bets, gains = np.zeros(2000), np.zeros(2000)
+        for event in sink:
+            if event['event'] in ['payout', 'insurance_payout'] and event['player'] == 'Bob':
+                bets[event['round']] += event['bet']
+                gains[event['round']] += event['gains']
+            elif event['event'] == 'even_money':
+                self.assertEqual(history[event['player']]['gains'][event['round']], 1)
+        self.assertTrue(np.array_equal(bets, history['Bob']['bets']))
+        self.assertTrue(np.allclose(gains, history['Bob']['gains']))
+
+    def test_parallel(self):
+        history = self.make_table().run(nb_rounds=300, nb_workers=2)
+        self.assertTrue(same_histories(history, self.make_table().run(nb_rounds=300, nb_workers=2)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+
+from blackjack_engine.simulation.hand import Hand
+from blackjack_engine.simulation.cards import CARDS
+
+
+class TestHand(unittest.TestCase):
+
+    def test_value(self):
+        hand = Hand([0, 5])
+        self.assertEqual((hand.value, hand.is_soft), (17, True))
+        hand.add_card(CARDS[9])
+        self.assertEqual((hand.value, hand.is_soft), (17, False))
+        hand.add_card(CARDS[0])
+        self.assertEqual((hand.value, hand.is_soft), (18, False))
+        hand.add_card(CARDS[3])
+        self.assertTrue(hand.is_busted)
+
+    def test_blackjack(self):
+        self.assertTrue(Hand([0, 12]).is_blackjack)
+        self.assertFalse(Hand([0, 12], nb_hands=2).is_blackjack)
+        self.assertFalse(Hand([0, 5, 4]).is_blackjack)
+
+    def test_names(self):
+        hand = Hand(['A', 'A'])
+        self.assertEqual(hand.cards[0], 0)
+        self.assertEqual(hand.cards[0], 'A')
+        self.assertNotEqual(hand.cards[0], 'K')
+        self.assertTrue(hand.is_pair)
+        self.assertEqual((hand.value, hand.is_soft), (12, True))
+        self.assertEqual(repr(hand), "[A, A]")
+        hand.add_card('K')
+        self.assertEqual((hand.value, hand.is_soft), (12, False))
+        hand.add_card(8)
+        self.assertEqual(repr(hand), "[A, A, K, 9]")
+        self.assertEqual(hand.value, 21)
+
+
+if __name__ == '__main__':
+    unittest.main()
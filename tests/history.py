@@ -0,0 +1,45 @@
+import unittest
+import numpy as np
+
+from blackjack_engine.simulation import BlackjackSimulation
+from blackjack_engine.simulation.history import PlayerHistory
+from blackjack_engine.strategy import BasicStrategy, ConstantBetting
+
+
+class TestPlayerHistory(unittest.TestCase):
+
+    def test_growth(self):
+        history = PlayerHistory(capacity=10)
+        history.chunk_size = 7
+        for i in range(30):
+            history.append(1, i)
+        self.assertEqual(len(history), 30)
+        self.assertTrue(np.all(history["gains"] == np.arange(30)))
+        self.assertEqual(history["bets"].dtype, np.float64)
+
+    def test_extend(self):
+        history, other = PlayerHistory(['nb_hands']), PlayerHistory(['nb_hands'])
+        history.append(1, -1, nb_hands=1)
+        other.append(2, 4, nb_hands=2)
+        history.extend(other)
+        self.assertEqual(history["nb_hands"].tolist(), [1, 2])
+        self.assertEqual(history.to_records()["gains"].tolist(), [-1, 4])
+
+    def test_unknown_column(self):
+        with self.assertRaises(ValueError):
+            PlayerHistory(['unknown'])
+
+    def test_simulation_columns(self):
+        simulation = BlackjackSimulation(nb_decks=2, seed=0, history_columns=['true_count', 'nb_hands', 'doubled'])
+        simulation.register_player("Bob", ConstantBetting(), BasicStrategy())
+        records = simulation.run(nb_rounds=2000)["Bob"].to_records()
+        self.assertEqual(len(records), 2000)
+        doubled = records["doubled"]
+        self.assertTrue(np.all(records["bets"][~doubled] == records["nb_hands"][~doubled]))
+        self.assertTrue(np.all(records["bets"][doubled] > records["nb_hands"][doubled]))
+        self.assertTrue(np.any(records["doubled"]))
+        self.assertTrue(np.any(records["nb_hands"] > 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+
+from blackjack_engine.simulation.remote import AsyncTables, LocalPolicyServer, RemotePolicy, TablePolicy
+from blackjack_engine.strategy import BasicStrategy, ConstantBetting, HiLowBetting, TableStrategy, tabulate_strategy
+
+
+class TestAsyncTables(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.table = tabulate_strategy(BasicStrategy())
+
+    def make_tables(self, path, remote, **rules):
+        tables = AsyncTables(path, nb_tables=16, seed=0, nb_decks=2, **rules)
+        tables.register_player("Bob", HiLowBetting(), RemotePolicy() if remote else TableStrategy(self.table))
+        tables.register_player("Patrick", ConstantBetting(), BasicStrategy())
+        return tables
+
+    def test_same_as_local(self):
+        with LocalPolicyServer(TablePolicy(self.table)) as server:
+            tables = self.make_tables(server.path, remote=True)
+            history = tables.run(nb_rounds=200)
+            # local players do not need the server
+            local_history = self.make_tables(server.path, remote=False).run(nb_rounds=200)
+        self.assertEqual(len(history["Bob"]), 16 * 200)
+        for name in ["Bob", "Patrick"]:
+            for column in ["bets", "gains"]:
+                self.assertTrue((history[name][column] == local_history[name][column]).all())
+        # decisions are sent by batches of up to one decision per table
+        self.assertGreater(tables.nb_decisions / tables.nb_requests, 4)
+
+    def test_history_columns(self):
+        columns = ['true_count', 'nb_hands', 'doubled']
+        with LocalPolicyServer(TablePolicy(self.table)) as server:
+            history = self.make_tables(server.path, remote=True, history_columns=columns).run(nb_rounds=50)
+            local_history = self.make_tables(server.path, remote=False, history_columns=columns).run(nb_rounds=50)
+        for name in ["Bob", "Patrick"]:
+            self.assertEqual(history[name].columns, ['bets', 'gains'] + columns)
+            for column in history[name].columns:
+                self.assertTrue((history[name][column] == local_history[name][column]).all())
+
+    def test_remote_policy(self):
+        with self.assertRaises(TypeError):
+            RemotePolicy().declare_action(None, 0, None, ['stand'])
+
+
+if __name__ == '__main__':
+    unittest.main()
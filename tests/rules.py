@@ -0,0 +1,93 @@
+import unittest
+
+from blackjack_engine.simulation.hand import Hand
+from blackjack_engine.simulation.rules import BlackJackRules, BUST, BLACKJACK, SURRENDERED
+from blackjack_engine.strategy.actions import HIT, STAND, NO_ACTION, actions_bitmask, bitmasks_actions
+
+
+class TestAvailableActions(unittest.TestCase):
+
+    def setUp(self):
+        self.rules = BlackJackRules(max_hands=3, double_after_split=False)
+
+    def test_first_decision(self):
+        self.assertEqual(self.rules.available_actions(Hand([9, 5]), None), ['stand', 'hit', 'double'])
+        self.assertEqual(self.rules.available_actions(Hand([7, 7]), None), ['stand', 'hit', 'double', 'split'])
+        self.assertEqual(self.rules.available_actions(Hand([0, 9]), None), [])
+
+    def test_after_action(self):
+        hand = Hand([2, 3, 4])
+        self.assertEqual(self.rules.available_actions(hand, 'hit'), ['stand', 'hit'])
+        self.assertEqual(self.rules.available_actions(hand, 'stand'), [])
+        self.assertEqual(self.rules.available_actions(Hand([9, 9, 5]), 'hit'), [])
+
+    def test_split_hands(self):
+        # no double after split, no split above max_hands, a single card on split aces
+        self.assertEqual(self.rules.available_actions(Hand([7, 7], nb_hands=2), 'split'), ['stand', 'hit', 'split'])
+        self.assertEqual(self.rules.available_actions(Hand([7, 7], nb_hands=3), 'split'), ['stand', 'hit'])
+        self.assertEqual(self.rules.available_actions(Hand([0, 0], nb_hands=2), 'split'), [])
+        self.assertEqual(BlackJackRules(max_hands=1).available_actions(Hand([0, 0]), None), ['stand', 'hit', 'double'])
+
+    def test_bitmask(self):
+        mask = self.rules.available_mask(Hand([2, 3, 4]), HIT)
+        self.assertEqual(mask, 1 << STAND | 1 << HIT)
+        self.assertEqual(mask, self.rules.available_mask(Hand([2, 3, 4]), NO_ACTION))
+        for actions in [['stand', 'hit'], ['stand', 'hit', 'double', 'split'], []]:
+            self.assertEqual(list(bitmasks_actions[actions_bitmask(actions)]), actions)
+
+    def test_optional_rules(self):
+        rules = BlackJackRules(max_hands=4, surrender='late', resplit_aces=True, double_on='10-11')
+        self.assertEqual(rules.available_actions(Hand([3, 4]), None), ['stand', 'hit', 'surrender'])
+        self.assertEqual(rules.available_actions(Hand([3, 5]), None), ['stand', 'hit', 'double', 'surrender'])
+        self.assertEqual(rules.available_actions(Hand([3, 5], nb_hands=2), 'split'), ['stand', 'hit', 'double'])
+        self.assertEqual(rules.available_actions(Hand([2, 3, 4]), 'hit'), ['stand', 'hit'])
+        self.assertEqual(rules.available_actions(Hand([0, 0], nb_hands=2), 'split'), ['stand', 'split'])
+        self.assertEqual(rules.available_actions(Hand([0, 0], nb_hands=4), 'split'), [])
+        self.assertEqual(rules.available_actions(Hand([0, 4], nb_hands=2), 'split'), [])
+        with self.assertRaises(ValueError):
+            BlackJackRules(surrender='always')
+
+
+class TestPayouts(unittest.TestCase):
+
+    def setUp(self):
+        self.rules = BlackJackRules()
+
+    def test_evaluate_hand(self):
+        self.assertEqual(self.rules.evaluate_hand(Hand([0, 9]), Hand([9, 7])), 1.5)
+        self.assertEqual(self.rules.evaluate_hand(Hand([0, 9]), Hand([9, 0])), 0)
+        self.assertEqual(self.rules.evaluate_hand(Hand([0, 9], nb_hands=2), Hand([9, 0])), -1)
+        self.assertEqual(self.rules.evaluate_hand(Hand([9, 7]), Hand([9, 5, 9])), 1)
+        self.assertEqual(self.rules.evaluate_hand(Hand([9, 7, 9]), Hand([9, 5, 9])), -1)
+        self.assertEqual(self.rules.evaluate_hand(Hand([9, 7]), Hand([9, 8])), -1)
+        self.assertEqual(self.rules.evaluate_hand(Hand([9, 7]), Hand([9, 5, 1])), 0)
+
+    def test_payouts_table(self):
+        rules = BlackJackRules(blackjack_payout=1.2, surrender_refund=0.5, insurance_payout=2)
+        self.assertEqual(rules.payouts[BLACKJACK, 20], 1.2)
+        self.assertEqual(rules.payouts[BLACKJACK, BLACKJACK], 0)
+        self.assertEqual(rules.payouts[BUST, BUST], -1)
+        self.assertTrue((rules.payouts[SURRENDERED] == -0.5).all())
+        self.assertEqual(rules.insurance_payouts[BLACKJACK], 2)
+        self.assertEqual(rules.insurance_payouts[21], -1)
+        self.assertEqual(rules.evaluate_hand(Hand([0, 9]), Hand([9, 7])), 1.2)
+
+    def test_surrender(self):
+        hand = Hand([9, 5])
+        hand.final_state = SURRENDERED
+        for surrender, against_blackjack in [('late', -1), ('early', -0.5)]:
+            rules = BlackJackRules(surrender=surrender)
+            self.assertEqual(rules.evaluate_hand(hand, Hand([9, 7])), -0.5)
+            self.assertEqual(rules.evaluate_hand(hand, Hand([9, 0])), against_blackjack)
+        self.assertEqual(BlackJackRules().evaluate_insurance(Hand([0, 9])), 2)
+
+    def test_settle(self):
+        players_hands = [[Hand([0, 9])], [Hand([9, 7], nb_hands=2), Hand([9, 9, 9], nb_hands=2)], [Hand([8, 9])]]
+        dealer_hand = Hand([9, 8])
+        self.assertEqual(self.rules.settle(players_hands, dealer_hand),
+                         [[self.rules.evaluate_hand(hand, dealer_hand) for hand in hands] for hands in players_hands])
+        self.assertEqual(self.rules.settle(players_hands, dealer_hand), [[1.5], [-1, -1], [0]])
+
+
+if __name__ == '__main__':
+    unittest.main()
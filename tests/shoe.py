@@ -1,7 +1,11 @@
+import tracemalloc
 import unittest
 import numpy as np
 
+from blackjack_engine.simulation import BlackjackSimulation
 from blackjack_engine.simulation.shoe import Shoe
+from blackjack_engine.simulation.counts import CountingSystem, counting_systems
+from blackjack_engine.strategy import BasicStrategy, ConstantBetting, HiLowBetting
 
 
 class TestShoe(unittest.TestCase):
@@ -31,6 +35,116 @@ class TestShoe(unittest.TestCase):
         self.shoe.shuffle()
         self.assertFalse(np.all(order == self.shoe.cards_order))
 
+    def test_seed(self):
+        shoe = Shoe(nb_decks=1, penetration=0.5, seed=1)
+        self.assertTrue(np.all(shoe.cards_order == Shoe(nb_decks=1, penetration=0.5, seed=1).cards_order))
+        shoe = Shoe(nb_decks=1, penetration=0.5, seed=np.random.default_rng(1))
+        self.assertTrue(np.all(shoe.cards_order == Shoe(nb_decks=1, penetration=0.5, seed=1).cards_order))
+
+    def test_shuffle_in_place(self):
+        buffer = self.shoe.cards_order
+        self.shoe.shuffle()
+        self.assertIs(buffer, self.shoe.cards_order)
+        self.assertTrue(np.all(np.sort(buffer) == self.shoe.cards))
+
+    def test_shuffle_allocations(self):
+        # once warmed up, re-shuffling allocates nothing besides a few temporaries, whatever the size of the shoe
+        peaks = []
+        for nb_decks in [1, 8]:
+            shoe = Shoe(nb_decks=nb_decks, penetration=0.5, seed=0, counting_systems=['hi-lo'])
+            for _ in range(3):
+                shoe.deal_cards(20)
+                shoe.shuffle()
+            shoe.deal_cards(20)
+            tracemalloc.start()
+            try:
+                start = tracemalloc.get_traced_memory()[0]
+                shoe.shuffle()
+                current, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            self.assertEqual(current, start)
+            peaks.append(peak - start)
+            self.assertEqual(shoe.deal_cards(10), list(shoe.cards_order[:10]))
+        self.assertEqual(peaks[0], peaks[1])
+
+
+class TestCounts(unittest.TestCase):
+
+    def setUp(self):
+        self.shoe = Shoe(nb_decks=2, penetration=0.5, seed=0, counting_systems=list(counting_systems))
+
+    def test_running_counts(self):
+        for _ in range(3):
+            for _ in range(60):
+                self.shoe.deal_card()
+                for name, system in counting_systems.items():
+                    self.assertEqual(self.shoe.running_count(name), system.running_count(self.shoe.delt_cards, 2))
+            self.shoe.shuffle()
+        self.assertEqual(self.shoe.running_count('hi-lo'), 0)
+        self.assertEqual(self.shoe.running_count('ko'), -4)
+
+    def test_true_count(self):
+        for _ in range(52):
+            self.shoe.deal_card()
+        self.assertEqual(self.shoe.true_count('zen'), self.shoe.running_count('zen'))
+
+    def test_empty_shoe(self):
+        shoe = Shoe(nb_decks=1, penetration=1, seed=0, counting_systems=['ko'])
+        for _ in range(52):
+            shoe.deal_card()
+        self.assertEqual(shoe.true_count('ko'), 52 * shoe.running_count('ko'))
+
+    def test_balanced(self):
+        for _ in range(len(self.shoe.cards)):
+            self.shoe.deal_card()
+        self.assertEqual(self.shoe.running_count('hi-lo'), 0)
+        self.assertEqual(self.shoe.running_count('ko'), 4)
+
+    def test_deal_cards(self):
+        other = Shoe(nb_decks=2, penetration=0.5, seed=0, counting_systems=list(counting_systems))
+        for nb_cards in [4, 16, 7, 90]:
+            cards = self.shoe.deal_cards(nb_cards)
+            self.assertEqual(cards, [other.deal_card() for _ in range(nb_cards)])
+            self.assertTrue(np.array_equal(self.shoe.remaining_cards, other.remaining_cards))
+            for name in counting_systems:
+                self.assertEqual(self.shoe.running_count(name), other.running_count(name))
+        self.assertEqual(self.shoe.nb_cards_delt, other.nb_cards_delt)
+
+    def test_custom_system(self):
+        for _ in range(30):
+            self.shoe.deal_card()
+        halves = CountingSystem('halves', {'2': .5, '3': 1, '4': 1, '5': 1.5, '6': 1, '7': .5, '9': -.5, 'A': -1,
+                                           '10': -1, 'J': -1, 'Q': -1, 'K': -1})
+        self.shoe.add_counting_system(halves)
+        for _ in range(30):
+            self.shoe.deal_card()
+        self.assertEqual(self.shoe.running_count(halves), halves.running_count(self.shoe.delt_cards, 2))
+        with self.assertRaises(KeyError):
+            Shoe(nb_decks=1, penetration=0.5).running_count('zen')
+
+    def test_no_systems(self):
+        for systems in [None, ()]:
+            shoe = Shoe(nb_decks=2, penetration=0.5, seed=0, counting_systems=systems)
+            self.assertEqual(shoe.counting_systems, {})
+            shoe.deal_cards(10)
+            with self.assertRaises(KeyError):
+                shoe.true_count('hi-lo')
+
+    def test_tracked_systems(self):
+        # counts are only tracked for the strategies and history columns reading them
+        simulation = BlackjackSimulation(seed=0)
+        simulation.register_player("Bob", ConstantBetting(), BasicStrategy())
+        simulation.run(100, verbose=False)
+        self.assertEqual(simulation.shoe.counting_systems, {})
+        simulation.register_player("Patrick", HiLowBetting(), BasicStrategy())
+        self.assertEqual(list(simulation.shoe.counting_systems), ['hi-lo'])
+        simulation = BlackjackSimulation(seed=0, history_columns=['true_count'])
+        simulation.register_player("Bob", ConstantBetting(), BasicStrategy())
+        history = simulation.run(100, verbose=False)
+        self.assertEqual(list(simulation.shoe.counting_systems), ['hi-lo'])
+        self.assertTrue(np.any(history["Bob"]["true_count"] != 0))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+import numpy as np
+
+from blackjack_engine.simulation import BlackjackSimulation
+from blackjack_engine.simulation.stats import PlayerStatistics
+from blackjack_engine.strategy import BasicStrategy, HiLowBetting
+
+
+class TestPlayerStatistics(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.bets = rng.integers(1, 5, size=1000).astype(float)
+        self.gains = self.bets * rng.choice([-1, 0, 1, 1.5], size=1000)
+
+    def test_moments(self):
+        statistics = PlayerStatistics()
+        for bet, gains in zip(self.bets, self.gains):
+            statistics.append(bet, gains)
+        self.assertAlmostEqual(statistics.mean_gains, np.mean(self.gains))
+        self.assertAlmostEqual(statistics.variance, np.var(self.gains, ddof=1))
+        self.assertAlmostEqual(statistics.ev, self.gains.sum() / self.bets.sum())
+        low, high = statistics.confidence_interval()
+        self.assertLess(low, statistics.ev)
+        self.assertGreater(high, statistics.ev)
+
+    def test_merge(self):
+        statistics, first, second = PlayerStatistics(), PlayerStatistics(), PlayerStatistics()
+        for i, (bet, gains) in enumerate(zip(self.bets, self.gains)):
+            statistics.append(bet, gains)
+            (first if i < 300 else second).append(bet, gains)
+        first.merge(second)
+        self.assertEqual(first.nb_rounds, statistics.nb_rounds)
+        self.assertAlmostEqual(first.variance, statistics.variance)
+        self.assertAlmostEqual(first.ev_standard_error, statistics.ev_standard_error)
+
+    def test_from_arrays(self):
+        statistics = PlayerStatistics()
+        for bet, gains in zip(self.bets, self.gains):
+            statistics.append(bet, gains)
+        other = PlayerStatistics.from_arrays(self.bets, self.gains)
+        self.assertAlmostEqual(other.variance, statistics.variance)
+        self.assertAlmostEqual(other.ev_standard_error, statistics.ev_standard_error)
+
+    def test_early_stopping(self):
+        for aggregate in [False, True]:
+            simulation = BlackjackSimulation(nb_decks=2, seed=0)
+            simulation.register_player("Bob", HiLowBetting(), BasicStrategy())
+            simulation.run(nb_rounds=100000, aggregate=aggregate, precision=0.05, check_every=500)
+            self.assertLess(simulation.nb_rounds_played, 100000)
+            self.assertEqual(simulation.nb_rounds_played % 500, 0)
+            self.assertTrue(simulation.precision_reached(0.05))
+
+    def test_aggregate_run(self):
+        results = []
+        for aggregate in [False, True]:
+            simulation = BlackjackSimulation(nb_decks=2, seed=0)
+            simulation.register_player("Bob", HiLowBetting(), BasicStrategy())
+            results.append(simulation.run(nb_rounds=2000, aggregate=aggregate)["Bob"])
+        history, statistics = results
+        self.assertEqual(statistics.nb_rounds, 2000)
+        self.assertAlmostEqual(statistics.total_gains, history["gains"].sum())
+        self.assertAlmostEqual(statistics.variance, np.var(history["gains"], ddof=1))
+        self.assertEqual(statistics.nb_wins + statistics.nb_losses + statistics.nb_pushes, statistics.nb_hands)
+        self.assertEqual(len(simulation.players_history["Bob"]), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
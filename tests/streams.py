@@ -0,0 +1,96 @@
+import copy
+import os
+import pickle
+import tempfile
+import unittest
+import numpy as np
+
+from blackjack_engine.simulation import BlackjackSimulation
+from blackjack_engine.simulation.streams import StreamShoe, generate_shoe_stream, load_shoe_stream
+from blackjack_engine.simulation.sweep import Sweep
+from blackjack_engine.strategy import BasicStrategy, ConstantBetting
+
+
+class TestStreams(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'shoes.npy')
+        generate_shoe_stream(self.path, nb_shoes=50, nb_decks=2, seed=0, chunk_size=16)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_generation(self):
+        stream = load_shoe_stream(self.path)
+        self.assertEqual(stream.shape, (50, 104))
+        self.assertEqual(stream.dtype, np.uint8)
+        ranks = np.repeat(np.arange(13), 8)
+        for shoe in stream:
+            self.assertTrue(np.array_equal(np.sort(shoe), ranks))
+        self.assertFalse(np.array_equal(stream[0], stream[1]))
+        other_path = os.path.join(self.directory.name, 'other.npy')
+        generate_shoe_stream(other_path, nb_shoes=50, nb_decks=2, seed=0, chunk_size=16)
+        self.assertTrue(np.array_equal(load_shoe_stream(other_path), stream))
+
+    def test_stream_shoe(self):
+        stream = load_shoe_stream(self.path)
+        shoe = StreamShoe(self.path, penetration=0.5, start=48, counting_systems=['hi-lo'])
+        shoe.shuffle()  # no card delt yet, stays on the first shoe
+        self.assertEqual([shoe.deal_card() for _ in range(10)], stream[48, :10].tolist())
+        self.assertEqual(shoe.remaining_cards.sum(), 94)
+        shoe.shuffle()
+        self.assertEqual(shoe.shoe_idx, 49)
+        self.assertEqual(shoe.remaining_cards.sum(), 104)
+        self.assertEqual(shoe.running_count('hi-lo'), 0)
+        shoe.deal_card()
+        shoe.shuffle()
+        self.assertEqual(shoe.shoe_idx, 0)
+        self.assertEqual(shoe.deal_card(), stream[0, 0])
+
+    def test_pickle(self):
+        shoe = StreamShoe(self.path, penetration=0.5, start=3)
+        shoe.deal_card()
+        for other in (pickle.loads(pickle.dumps(shoe)), copy.deepcopy(shoe)):
+            self.assertEqual(other.shoe_idx, 3)
+            self.assertIsInstance(other.stream, np.memmap)
+            self.assertEqual(other.deal_card(), shoe.deal_card())
+            shoe.nb_cards_delt -= 1
+
+    def test_simulation(self):
+        def play():
+            simulation = BlackjackSimulation(shoe=StreamShoe(self.path, penetration=0.75), seed=0)
+            simulation.register_player("Bob", ConstantBetting(), BasicStrategy())
+            return simulation.run(500, verbose=False)["Bob"]["gains"]
+        self.assertTrue(np.array_equal(play(), play()))
+        with self.assertRaises(ValueError):
+            BlackjackSimulation(shoe=StreamShoe(self.path, penetration=0.75)).run(100, nb_workers=2)
+
+    def test_in_memory_stream(self):
+        stream = np.array(load_shoe_stream(self.path))
+        shoe = StreamShoe(stream, penetration=0.5, start=2)
+        self.assertIsNone(shoe.rng)
+        self.assertEqual(shoe.deal_card(), stream[2, 0])
+        # copies share the stream instead of copying it
+        other = copy.deepcopy(shoe)
+        self.assertIs(other.stream, stream)
+        self.assertEqual([other.deal_card() for _ in range(5)], [shoe.deal_card() for _ in range(5)])
+        simulation = BlackjackSimulation(shoe=shoe, seed=0)
+        simulation.register_player("Bob", ConstantBetting(), BasicStrategy())
+        simulation.run(100, verbose=False)
+        self.assertIs(simulation._initial_state[0].stream, stream)
+        with self.assertRaises(ValueError):
+            simulation.run(100, checkpoint=os.path.join(self.directory.name, 'run.ckpt'))
+
+    def test_sweep(self):
+        players = {"Bob": (ConstantBetting(), BasicStrategy())}
+        sweep = Sweep({'nb_decks': [2], 'hit_soft_17': [True, True]}, players, nb_rounds=200, nb_replications=2,
+                      shoe_stream=self.path)
+        sweep.run(nb_workers=2, verbose=False)
+        self.assertEqual(sweep.compare(0, 1, "Bob"), (0., 0.))
+        with self.assertRaises(ValueError):
+            Sweep({'nb_decks': [6]}, players, nb_rounds=200, shoe_stream=self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
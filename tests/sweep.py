@@ -0,0 +1,50 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+
+from blackjack_engine.simulation.sweep import Sweep
+from blackjack_engine.strategy import BasicStrategy, ConstantBetting, HiLowBetting, RandomPlay
+
+
+def make_sweep(path=None, nb_replications=2, grid=None):
+    players = {"Bob": (ConstantBetting(), BasicStrategy()), "Patrick": (HiLowBetting(), RandomPlay())}
+    grid = grid if grid is not None else {'nb_decks': [1, 2], 'hit_soft_17': [True, False]}
+    return Sweep(grid, players, nb_rounds=300, nb_replications=nb_replications, seed=0, path=path)
+
+
+class TestSweep(unittest.TestCase):
+
+    def test_results(self):
+        sweep = make_sweep()
+        results = sweep.run(nb_workers=2, verbose=False)
+        self.assertEqual(len(results['cell']), 4 * 2 * 2)
+        self.assertTrue(np.all(results['nb_rounds'] == 300))
+        statistics = sweep.statistics()
+        self.assertEqual(statistics[(3, "Bob")].nb_rounds, 600)
+        self.assertEqual(sweep.cells[3]['nb_decks'], 2)
+        self.assertFalse(results['hit_soft_17'][results['cell'] == 3].any())
+
+    def test_common_random_numbers(self):
+        # two identical cells play exactly the same rounds
+        sweep = make_sweep(grid={'nb_decks': [2, 2]}, nb_replications=3)
+        sweep.run(nb_workers=2, verbose=False)
+        self.assertEqual(sweep.compare(0, 1, "Patrick"), (0., 0.))
+
+    def test_resume(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'sweep.npz')
+            make_sweep(path, nb_replications=1).run(nb_workers=2, verbose=False)
+            sweep = make_sweep(path, nb_replications=2)
+            self.assertEqual(len(sweep.results['cell']), 4 * 2)
+            results = sweep.run(nb_workers=2, verbose=False)
+            self.assertEqual(len(results['cell']), 4 * 2 * 2)
+            complete = make_sweep(nb_replications=2).run(nb_workers=2, verbose=False)
+            order, complete_order = (np.lexsort((r['player'], r['replication'], r['cell'])) for r in [results, complete])
+            self.assertTrue(np.array_equal(results['total_gains'][order], complete['total_gains'][complete_order]))
+            with self.assertRaises(ValueError):
+                make_sweep(path, grid={'nb_decks': [6, 8]})
+
+
+if __name__ == '__main__':
+    unittest.main()
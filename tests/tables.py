@@ -0,0 +1,55 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+
+from blackjack_engine.simulation import BlackjackSimulation
+from blackjack_engine.simulation.hand import Hand
+from blackjack_engine.strategy import BasicStrategy, ConstantBetting, TableStrategy, tabulate_strategy
+
+
+class TestTableStrategy(unittest.TestCase):
+
+    def setUp(self):
+        self.strategy = TableStrategy(tabulate_strategy(BasicStrategy()))
+
+    def test_decisions(self):
+        basic_strategy = BasicStrategy()
+        for cards in [[9, 6], [0, 6], [7, 7], [0, 0], [4, 5], [1, 2, 3]]:
+            for dealer_card in range(13):
+                for available_actions in [['stand', 'hit'], ['stand', 'hit', 'double'],
+                                          ['stand', 'hit', 'double', 'split']]:
+                    if 'split' in available_actions and cards[0] != cards[1]:
+                        continue
+                    self.assertEqual(
+                        self.strategy.declare_action(Hand(cards), dealer_card, None, available_actions),
+                        basic_strategy.declare_action(Hand(cards), dealer_card, None, available_actions))
+
+    def test_declare_actions(self):
+        player_hands = [Hand(cards) for cards in [[9, 6], [0, 6], [7, 7], [4, 5]]]
+        available_actions = [['stand', 'hit', 'double'], ['stand', 'hit'], ['stand', 'hit', 'double', 'split'],
+                             ['stand', 'hit', 'double']]
+        for dealer_card in range(13):
+            self.assertEqual(
+                self.strategy.declare_actions(player_hands, dealer_card, None, available_actions),
+                [self.strategy.declare_action(hand, dealer_card, None, actions)
+                 for hand, actions in zip(player_hands, available_actions)])
+
+    def test_same_as_basic_strategy(self):
+        histories = []
+        for playing_strategy in [BasicStrategy(), self.strategy]:
+            simulation = BlackjackSimulation(nb_decks=2, seed=0)
+            simulation.register_player("Bob", ConstantBetting(), playing_strategy)
+            histories.append(simulation.run(2000)["Bob"])
+        self.assertTrue(np.all(histories[0]["gains"] == histories[1]["gains"]))
+
+    def test_save_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "basic_strategy.npy")
+            self.strategy.save(path)
+            strategy = TableStrategy.load(path)
+        self.assertTrue(np.all(strategy.table == self.strategy.table))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import json
+import os
+import socket
+import tempfile
+import unittest
+import urllib.request
+import numpy as np
+
+from blackjack_engine.simulation import BlackjackSimulation
+from blackjack_engine.simulation.telemetry import Telemetry, JSONStatusFile, StatusServer
+from blackjack_engine.strategy import ConstantBetting, RandomPlay
+
+
+def make_simulation(seed):
+    simulation = BlackjackSimulation(nb_decks=1, penetration=0.5, seed=seed)
+    simulation.register_player("Bob", ConstantBetting(), RandomPlay(seed=seed))
+    simulation.register_player("Patrick", ConstantBetting(2), RandomPlay(seed=seed))
+    return simulation
+
+
+class TestTelemetry(unittest.TestCase):
+
+    def test_callback(self):
+        statuses = []
+        simulation = make_simulation(seed=0)
+        history = simulation.run(2500, telemetry=Telemetry([statuses.append], every=1000))
+        self.assertEqual([status['nb_rounds'] for status in statuses], [0, 1000, 2000, 2500])
+        self.assertEqual([status['finished'] for status in statuses], [False, False, False, True])
+        status = statuses[-1]
+        self.assertEqual(status['nb_rounds_target'], 2500)
+        self.assertEqual(status['cards_delt'], simulation.shoe.total_cards_delt)
+        self.assertEqual(status['nb_shuffles'], simulation.shoe.nb_shuffles)
+        self.assertGreater(status['nb_shuffles'], 1)
+        for name in ["Bob", "Patrick"]:
+            self.assertAlmostEqual(status['ev'][name], history[name]['gains'].sum() / history[name]['bets'].sum())
+        # the rounds played are the same without telemetry
+        other = make_simulation(seed=0).run(2500, verbose=True)
+        self.assertTrue(all(np.array_equal(history[name]['gains'], other[name]['gains']) for name in history))
+
+    def test_precision(self):
+        statuses = []
+        simulation = make_simulation(seed=0)
+        simulation.run(100000, aggregate=True, precision=0.1, check_every=700,
+                       telemetry=Telemetry([statuses.append], every=1000))
+        self.assertEqual(statuses[-1]['nb_rounds'] % 700, 0)
+        self.assertEqual(statuses[-1]['nb_rounds'], simulation.nb_rounds_played)
+        self.assertEqual(statuses[-1]['eta'], 0)
+        self.assertEqual(statuses[-1]['ev']['Bob'], simulation.players_statistics['Bob'].ev)
+
+    def test_parallel(self):
+        statuses = []
+        make_simulation(seed=0).run(1000, nb_workers=2, telemetry=Telemetry([statuses.append]))
+        self.assertEqual(statuses[-1]['nb_rounds'], 1000)
+        self.assertIsNone(statuses[-1]['cards_delt'])
+
+    def test_status_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "status.json")
+            make_simulation(seed=0).run(1500, telemetry=Telemetry([JSONStatusFile(path)], every=500))
+            with open(path) as file:
+                status = json.load(file)
+        self.assertEqual(status['nb_rounds'], 1500)
+        self.assertTrue(status['finished'])
+
+    def test_status_server(self):
+        server = StatusServer()
+        try:
+            make_simulation(seed=0).run(1000, telemetry=Telemetry([server]))
+            with urllib.request.urlopen(f"http://{server.address[0]}:{server.address[1]}/") as response:
+                status = json.load(response)
+        finally:
+            server.shutdown()
+        self.assertEqual(status['nb_rounds'], 1000)
+
+    def test_unix_socket(self):
+        with tempfile.TemporaryDirectory() as directory:
+            server = StatusServer(os.path.join(directory, "status.sock"))
+            try:
+                make_simulation(seed=0).run(1000, telemetry=Telemetry([server]))
+                with socket.socket(socket.AF_UNIX) as client:
+                    client.connect(server.address)
+                    client.sendall(b"GET / HTTP/1.0\r\n\r\n")
+                    response = b"".join(iter(lambda: client.recv(4096), b""))
+            finally:
+                server.shutdown()
+            self.assertFalse(os.path.exists(server.address))
+        status = json.loads(response.split(b"\r\n\r\n", 1)[1])
+        self.assertEqual(status['nb_rounds'], 1000)
+
+
+if __name__ == '__main__':
+    unittest.main()